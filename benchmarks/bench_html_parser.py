@@ -0,0 +1,73 @@
+"""
+ニュースページのHTMLパース速度の比較
+
+    $ poetry run python benchmarks/bench_html_parser.py
+"""
+
+import timeit
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from opime_notify.fetch_schedule.news_extractor import (
+    extract_news_detail,
+    extract_news_url_list,
+)
+from opime_notify.fetch_schedule.session import OfficialSession, release_tree
+
+FIXTURE_DIR = Path(__file__).parent.parent / "tests" / "fixtures" / "ngt48"
+NUMBER = 200
+
+
+def parse_full_tree(htmltext: str) -> None:
+    # 以前の実装と同じく全体の木を作ってから探す
+    soup = BeautifulSoup(htmltext, "html.parser")
+    soup.find("div", "news-block-inner")
+
+
+def get_parser_list() -> list[str]:
+    parser_list = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+
+        parser_list.append("lxml")
+    except ImportError:
+        print("lxml is not installed, skip lxml benchmark")
+    return parser_list
+
+
+def main() -> None:
+    parser_list = get_parser_list()
+    for path in sorted(FIXTURE_DIR.glob("*.html")):
+        htmltext = path.read_text(encoding="utf-8")
+        print(f"{path.name} ({len(htmltext)} chars)")
+        elapsed = timeit.timeit(lambda: parse_full_tree(htmltext), number=NUMBER)
+        base = elapsed / NUMBER
+        print(f"  {'html.parser full tree':<28}{base * 1000:8.3f} ms")
+        for parser in parser_list:
+            session = OfficialSession(html_parser=parser)
+
+            def parse_strained() -> None:
+                release_tree(session._find_news_body(htmltext))
+
+            elapsed = timeit.timeit(parse_strained, number=NUMBER)
+            per_page = elapsed / NUMBER
+            name = f"{parser} strained"
+            print(f"  {name:<28}{per_page * 1000:8.3f} ms  x{base / per_page:.2f}")
+
+        link_pattern = OfficialSession()._get_link_pattern()
+
+        def parse_stream() -> None:
+            if path.name.startswith("list"):
+                extract_news_url_list(htmltext, link_pattern)
+            else:
+                extract_news_detail(htmltext)
+
+        elapsed = timeit.timeit(parse_stream, number=NUMBER)
+        per_page = elapsed / NUMBER
+        name = "stream extractor"
+        print(f"  {name:<28}{per_page * 1000:8.3f} ms  x{base / per_page:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+各パーサーと通知の生成の速度、ピークメモリの計測
+コーパスは benchmarks/corpus.py を参照
+
+    $ poetry run python benchmarks/bench_parsers.py
+"""
+
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from corpus import (
+    ROSTER,
+    get_monthly_photo_corpus,
+    get_otsale_corpus,
+    get_theater_corpus,
+    shift_to_future,
+)
+
+from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.monthly_photo_parser import (
+    MonthlyPhotoParser,
+    schedule_to_monthly_photo_schedule,
+)
+from opime_notify.fetch_schedule.otsale_parser import (
+    OTSaleNewsParser,
+    schedule_to_otsale_schedule,
+)
+from opime_notify.fetch_schedule.theater_parser import (
+    TheaterNewsParser,
+    filter_theater_schedule_list,
+    schedule_to_theater_schedule,
+)
+
+# 1ケースあたりの最低計測時間(秒)
+MIN_DURATION = 0.5
+
+
+def measure(name: str, func: Callable[[], int]) -> None:
+    """
+    funcは処理した件数を返す
+    """
+    items = func()
+    number = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        number += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_DURATION:
+            break
+    per_call = elapsed / number
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {name:<24}{items:>6} items {per_call * 1000:9.3f} ms"
+        f" {items / per_call:11.0f} items/s {peak / 1024:9.1f} KiB peak"
+    )
+
+
+def parse_all(parser_cls: Any, convert: Any, news_list: list[Schedule]) -> list:
+    # Parserは受け取ったscheduleを書き換えるので毎回複製する
+    result = []
+    for news in news_list:
+        result += parser_cls(convert(news)).parse()
+    return result
+
+
+def bench_parser(title: str, parser_cls: Any, convert: Any, corpus: dict) -> None:
+    print(title)
+    for name, news_list in corpus.items():
+        measure(name, lambda: len(parse_all(parser_cls, convert, news_list)))
+
+
+def main() -> None:
+    theater_corpus = get_theater_corpus()
+    otsale_corpus = get_otsale_corpus()
+    mp_corpus = get_monthly_photo_corpus()
+    bench_parser(
+        "TheaterNewsParser.parse",
+        TheaterNewsParser,
+        schedule_to_theater_schedule,
+        theater_corpus,
+    )
+    bench_parser(
+        "OTSaleNewsParser.parse",
+        OTSaleNewsParser,
+        schedule_to_otsale_schedule,
+        otsale_corpus,
+    )
+    bench_parser(
+        "MonthlyPhotoParser.parse",
+        MonthlyPhotoParser,
+        schedule_to_monthly_photo_schedule,
+        mp_corpus,
+    )
+
+    theater_list = parse_all(
+        TheaterNewsParser, schedule_to_theater_schedule, theater_corpus["52 weeks"]
+    )
+    print("filter_theater_schedule_list")
+    keywords_list = [["中井りか"], ["中井りか", "本間日陽", "存在しないメンバー"]]
+    keywords_list.append(ROSTER)
+    for keywords in keywords_list:
+
+        def filter_list() -> int:
+            filter_theater_schedule_list(theater_list, keywords=keywords)
+            return len(theater_list)
+
+        measure(f"{len(keywords)} keywords", filter_list)
+
+    print("get_notify_schedule_list")
+    schedule_dict = {
+        "theater": theater_list,
+        "otsale": parse_all(
+            OTSaleNewsParser, schedule_to_otsale_schedule, otsale_corpus["300 rounds"]
+        ),
+        "monthly photo": parse_all(
+            MonthlyPhotoParser,
+            schedule_to_monthly_photo_schedule,
+            mp_corpus["120 posts"],
+        ),
+    }
+    for name, schedule_list in schedule_dict.items():
+        shift_to_future(schedule_list)
+
+        def notify(schedule_list: list = schedule_list) -> int:
+            for schedule in schedule_list:
+                schedule.get_notify_schedule_list()
+            return len(schedule_list)
+
+        measure(name, notify)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+コンソールスクリプトの起動時のimport時間の計測
+python -X importtime の結果を集計し、予算を超えたら終了コード1を返す
+
+    $ poetry run python benchmarks/bench_startup.py
+"""
+
+import statistics
+import subprocess
+import sys
+
+# エントリポイント名: (モジュール, 予算(ミリ秒))
+# cronから毎分起動されるので、処理に入る前のimportを軽く保つ
+ENTRY_POINT_DICT = {
+    "opime-notify": ("opime_notify.main", 150),
+    "opime-notify-realtime": ("opime_notify.main", 150),
+    "send-line": ("opime_notify.cli.send_line", 150),
+    "fetch-schedule": ("opime_notify.cli.fetch_schedule", 400),
+}
+NUMBER = 5
+TOP_COUNT = 5
+
+
+def run_importtime(code: str) -> list[tuple[int, str, int]]:
+    """
+    (深さ, モジュール, 累積時間(マイクロ秒)) のリストを返す
+    深さ0がトップレベルでimportされたもの
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        result.append((depth, name.strip(), int(cumulative)))
+    return result
+
+
+def measure(module: str, baseline: set[str]) -> tuple[float, list[tuple[str, int]]]:
+    """
+    インタプリタの起動時に読まれるモジュールを除いた合計時間(ミリ秒)の中央値と
+    重いモジュールの一覧を返す
+    """
+    total_list = []
+    top_list: list[tuple[str, int]] = []
+    for _ in range(NUMBER):
+        total = 0
+        child_list: list[tuple[str, int]] = []
+        top_list = []
+        # 子は親より先に出力されるので、深さ0の行までに出た深さ1の行がその子
+        for depth, name, t in run_importtime(f"import {module}"):
+            if depth == 1:
+                child_list.append((name, t))
+            elif depth == 0:
+                if name not in baseline:
+                    total += t
+                    top_list += child_list
+                child_list = []
+        total_list.append(total / 1000)
+    top_list.sort(key=lambda e: e[1], reverse=True)
+    return statistics.median(total_list), top_list[:TOP_COUNT]
+
+
+def main() -> int:
+    baseline = {name for d, name, _ in run_importtime("pass") if d == 0}
+    over_budget = False
+    for name, (module, budget) in ENTRY_POINT_DICT.items():
+        total, top_list = measure(module, baseline)
+        status = "ok" if total <= budget else "OVER"
+        over_budget |= total > budget
+        print(f"{name:<24}{total:9.1f} ms / {budget:4d} ms  {status}")
+        for top_name, t in top_list:
+            print(f"    {top_name:<40}{t / 1000:9.1f} ms")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
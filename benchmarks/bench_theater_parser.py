@@ -0,0 +1,40 @@
+"""
+劇場公演スケジュールの解析速度の計測
+数週間分の公演をまとめた長い告知を想定して日付ブロックを増やして計測する
+
+    $ poetry run python benchmarks/bench_theater_parser.py
+"""
+
+import timeit
+
+from corpus import build_theater_news
+
+from opime_notify.fetch_schedule.theater_parser import (
+    TheaterNewsParser,
+    TheaterSchedule,
+)
+
+WEEK_LIST = [1, 4, 12, 52]
+NUMBER = 20
+
+
+def main() -> None:
+    for weeks in WEEK_LIST:
+        news = build_theater_news(weeks)
+
+        def parse() -> list[TheaterSchedule]:
+            schedule = TheaterSchedule(
+                news.title, news.date, news.type, news.description
+            )
+            return TheaterNewsParser(schedule).parse()
+
+        count = len(parse())
+        elapsed = timeit.timeit(parse, number=NUMBER) / NUMBER
+        print(
+            f"{weeks:>3} weeks ({len(news.description):>7} chars, {count:>4} items)"
+            f"  {elapsed * 1000:8.3f} ms  {count / elapsed:10.0f} items/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
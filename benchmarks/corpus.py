@@ -0,0 +1,196 @@
+"""
+パーサーのベンチマークで使う記事のコーパス
+tests/fixtures/ngt48 に記録した記事と、それを元に件数を増やした合成記事を作る
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.news_extractor import extract_news_detail
+
+FIXTURE_DIR = Path(__file__).parent.parent / "tests" / "fixtures" / "ngt48"
+MEMBERS = (
+    "中井りか、本間日陽、西潟茉莉奈、加藤美南、小越春花、川越紗彩、中村歩加、藤崎未夢"
+)
+WEEKDAYS = "月火水木金土日"
+# 全メンバーを監視する場合を想定したキーワード
+ROSTER = [
+    "中井りか",
+    "本間日陽",
+    "西潟茉莉奈",
+    "加藤美南",
+    "小越春花",
+    "川越紗彩",
+    "中村歩加",
+    "藤崎未夢",
+    "大塚七海",
+    "清司麗菜",
+    "日下部愛菜",
+    "奈良未遥",
+    "西村菜那子",
+    "水澤彩佳",
+    "三村妃乃",
+    "諸橋姫向",
+    "佐藤海里",
+    "高沢朋花",
+    "杉本萌",
+    "寺田晴",
+    "北村優羽",
+    "坂井妃那",
+    "古舘葵",
+    "真下華穂",
+    "曽我部優芽",
+    "大越ひなの",
+    "小見山沙空",
+    "小林亜実",
+    "富永夢有",
+    "山口真奈",
+    "相田愛美",
+    "川村早織",
+]
+
+
+def load_fixture(name: str) -> Schedule:
+    htmltext = (FIXTURE_DIR / f"{name}.html").read_text(encoding="utf-8")
+    schedule = extract_news_detail(htmltext)
+    if schedule is None:
+        raise ValueError(f"{name} is not a news page")
+    return schedule
+
+
+def _md(date: datetime) -> str:
+    return f"{date.month}月{date.day}日({WEEKDAYS[date.weekday()]})"
+
+
+def _theater_date_block(date: datetime) -> str:
+    date_str = _md(date)
+    if date.weekday() == 0:
+        return f"●{date_str}\n休館日\n"
+    if date.weekday() < 5:
+        return f"""●{date_str}
+{date_str}18:30開演
+演目:チームNIII「パジャマドライブ」公演
+出演メンバー:
+{MEMBERS}
+"""
+    return f"""●{date_str}
+昼公演 13:00開演
+演目:研究生「PARTYが始まるよ」公演
+出演メンバー:
+{MEMBERS}
+
+夜公演 17:00開演
+演目:チームG「逆上がり」公演
+出演メンバー:
+{MEMBERS}
+"""
+
+
+def build_theater_news(weeks: int, start: Optional[datetime] = None) -> Schedule:
+    """
+    weeks週間分の公演をまとめた劇場公演スケジュールの告知
+    """
+    if start is None:
+        start = datetime(2022, 12, 1)
+    end = start + timedelta(weeks=weeks) - timedelta(days=1)
+    offer_start = start - timedelta(days=6)
+    offer_end = offer_start + timedelta(days=2)
+    result_date = offer_start + timedelta(days=3)
+    title = f"{start.year}年{_md(start)}~{_md(end)}NGT48劇場公演スケジュールのご案内"
+    body = "NGT48劇場 公演スケジュールをご案内いたします。\n\n"
+    body += "\n".join(
+        _theater_date_block(start + timedelta(days=i)) for i in range(weeks * 7)
+    )
+    body += f"""
+【チケット申込について】
+申込期間:{offer_start.year}年{_md(offer_start)}12:00~{_md(offer_end)}23:59まで
+当落発表は{_md(result_date)}18:00までにメールにてお知らせいたします。
+"""
+    return Schedule(title, start, "劇場", body)
+
+
+def build_otsale_news(rounds: int, start: Optional[datetime] = None) -> Schedule:
+    """
+    rounds回分の受付日程を並べたオンラインおしゃべり会の告知
+    """
+    if start is None:
+        start = datetime(2022, 12, 3)
+    title = "NGT48 8thシングル「Awesome」劇場盤 オンラインおしゃべり会 受付のお知らせ"
+    line_list = [
+        "オンラインおしゃべり会の受付が決定いたしました!",
+        "",
+        "■ご予約受付日程",
+    ]
+    for i in range(rounds):
+        sale_start = start + timedelta(weeks=i)
+        sale_end = sale_start + timedelta(days=2)
+        target = sale_start + timedelta(days=15)
+        line_list.append(
+            f"・第{i + 1}次受付……{sale_start.month}/{sale_start.day}"
+            f"({WEEKDAYS[sale_start.weekday()]})15:00~"
+            f"{sale_end.month}/{sale_end.day}({WEEKDAYS[sale_end.weekday()]})14:00"
+        )
+        line_list.append(f"対象日程:{_md(target)}")
+    line_list += ["", "■ご予約方法", "NGT48 CD SHOPにてご予約ください。"]
+    return Schedule(title, start, "リリース", "\n".join(line_list))
+
+
+def build_monthly_photo_news(start: datetime) -> Schedule:
+    title = f"NGT48 {start.year}年{start.month}月度 個別生写真 予約販売のお知らせ"
+    body = f"""いつもNGT48を応援いただきありがとうございます。
+
+{_md(start)}12:00より、下記商品の販売を開始いたします。
+
+■商品名
+NGT48 {start.year}年{start.month}月度 個別生写真5枚セット
+"""
+    return Schedule(title, start, "グッズ", body)
+
+
+def get_theater_corpus() -> dict[str, list[Schedule]]:
+    return {
+        "fixture": [load_fixture("detail_theater")],
+        "4 weeks": [build_theater_news(4)],
+        "52 weeks": [build_theater_news(52)],
+    }
+
+
+def get_otsale_corpus() -> dict[str, list[Schedule]]:
+    return {
+        "fixture": [load_fixture("detail_otsale")],
+        "30 rounds": [build_otsale_news(30)],
+        "300 rounds": [build_otsale_news(300)],
+    }
+
+
+def get_monthly_photo_corpus() -> dict[str, list[Schedule]]:
+    start = datetime(2022, 1, 5)
+    return {
+        "fixture": [load_fixture("detail_monthly_photo")],
+        "120 posts": [
+            build_monthly_photo_news(start + timedelta(days=30 * i)) for i in range(120)
+        ],
+    }
+
+
+def shift_to_future(schedule_list: list[Any], now: Optional[datetime] = None) -> None:
+    """
+    通知の対象になるように日時の属性を全て未来にずらす
+    """
+    if now is None:
+        now = datetime.now()
+    date_list = [
+        v
+        for schedule in schedule_list
+        for v in vars(schedule).values()
+        if isinstance(v, datetime)
+    ]
+    if len(date_list) == 0:
+        return None
+    delta = now - min(date_list) + timedelta(days=1)
+    for schedule in schedule_list:
+        for key, value in vars(schedule).items():
+            if isinstance(value, datetime):
+                setattr(schedule, key, value + delta)
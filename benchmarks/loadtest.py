@@ -0,0 +1,348 @@
+"""
+通知の一連の処理の負荷試験
+Sheets, LINE, ショップのAPIを手元の代わりに置き換えて opime-notify と
+opime-notify-realtime を実行し、処理量、通知時刻から送信までの遅延、
+メモリ使用量、API呼び出し回数を表示する
+
+    $ poetry run python benchmarks/loadtest.py --rows 10 --rows 1000 --articles 100
+
+Sheetsはgspreadのスプレッドシートを置き換えるので、GsheetSessionの処理はそのまま動く
+LINEはLineBotApiを置き換え、ショップのAPIは --replay で読む合成のアーカイブを作る
+置き換えはopime_notify.standinのものに呼び出し回数の計測を足して使う
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+import click
+import requests
+
+import opime_notify.notify
+import opime_notify.standin
+from opime_notify.cache import CACHE_DIR_ENV
+from opime_notify.fetch_schedule.session import CDShopSession, ShopSession
+from opime_notify.gsheet import GsheetSession
+from opime_notify.http_archive import HttpArchive
+from opime_notify.http_client import set_default_client
+from opime_notify.main import cli, realtime
+from opime_notify.metrics import HTTP_REQUESTS
+from opime_notify.schedule import NotifySchedule
+from opime_notify.standin import (
+    SCHEDULE_HEADER,
+    MemorySpreadsheet,
+    MemoryWorksheet,
+    StandInGsheetSession,
+    StandInLineBotApi,
+)
+
+COMMON_ARGS = ["--line-access-token", "x", "--gsheet-id", "x", "--google-json-key", "x"]
+
+
+class StandInApi:
+    """
+    置き換えたAPIの呼び出し回数を数え、指定した遅延を入れる
+    """
+
+    def __init__(self, sheet_latency: float = 0.0, line_latency: float = 0.0):
+        self.latency_dict = {"sheets": sheet_latency, "line": line_latency}
+        self.call_counter: Counter[str] = Counter()
+        # LINEに送ったメッセージのタイトルと送った時刻
+        self.sent_list: list[tuple[str, datetime]] = []
+        self._lock = threading.Lock()
+
+    def call(self, name: str) -> None:
+        with self._lock:
+            self.call_counter[name] += 1
+        latency = self.latency_dict[name.split(".")[0]]
+        if latency > 0:
+            time.sleep(latency)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.call_counter.clear()
+            self.sent_list.clear()
+
+
+API = StandInApi()
+
+
+class FakeWorksheet(MemoryWorksheet):
+    def get_all_records(self) -> list[dict[str, Any]]:
+        API.call("sheets.get_all_records")
+        return super().get_all_records()
+
+    def row_values(self, row: int) -> list[Any]:
+        API.call("sheets.row_values")
+        return super().row_values(row)
+
+    def update(self, range_str: str, values: list[list[Any]], **kwargs: Any) -> None:
+        API.call("sheets.update")
+        super().update(range_str, values, **kwargs)
+
+    def append_rows(self, values: list[list[Any]], **kwargs: Any) -> None:
+        API.call("sheets.append_rows")
+        super().append_rows(values, **kwargs)
+
+    def batch_clear(self, range_list: list[str]) -> None:
+        API.call("sheets.batch_clear")
+        super().batch_clear(range_list)
+
+    def add_rows(self, rows: int) -> None:
+        API.call("sheets.add_rows")
+        super().add_rows(rows)
+
+
+class FakeSpreadsheet(MemorySpreadsheet):
+    def worksheet(self, title: str) -> MemoryWorksheet:
+        API.call("sheets.worksheet")
+        return super().worksheet(title)
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> MemoryWorksheet:
+        API.call("sheets.add_worksheet")
+        self.worksheet_dict[title] = FakeWorksheet(title, [], rows=rows)
+        return self.worksheet_dict[title]
+
+
+class FakeLineBotApi(StandInLineBotApi):
+    def __init__(self, channel_access_token: str = "", **kwargs: Any):
+        super().__init__()
+
+    def broadcast(self, messages: Any, **kwargs: Any) -> None:
+        API.call("line.broadcast")
+        title = getattr(messages, "alt_text", None)
+        if title is None:
+            title = messages.text.split("\n")[0]
+        with API._lock:
+            API.sent_list.append((title, datetime.now()))
+
+
+def install_stand_ins(spreadsheet: FakeSpreadsheet) -> None:
+    """
+    --replay ではopime_notify.standinの置き換えが使われるので、そちらも数える
+    """
+
+    def get_spreadsheets_obj(self):
+        return spreadsheet
+
+    GsheetSession.get_spreadsheets_obj = get_spreadsheets_obj  # type: ignore
+    StandInGsheetSession.get_spreadsheets_obj = get_spreadsheets_obj  # type: ignore
+    opime_notify.notify.LineBotApi = FakeLineBotApi  # type: ignore
+    opime_notify.standin.StandInLineBotApi = FakeLineBotApi  # type: ignore
+
+
+def build_schedule_sheet(rows: int, due_ratio: float, now: datetime) -> FakeWorksheet:
+    """
+    rows件の通知予定のうちdue_ratioの割合を通知時刻を過ぎたものにする
+    """
+    wsheet = FakeWorksheet("schedule_list", SCHEDULE_HEADER, rows=max(rows + 1, 100))
+    due_count = int(rows * due_ratio)
+    for index in range(rows):
+        date = now if index < due_count else now + timedelta(days=1)
+        date_str = date.strftime(NotifySchedule.date_format)
+        title = f"loadtest {index}"
+        wsheet.row_list.append([index + 1, title, date_str, "", "", "BEFORE"])
+    return wsheet
+
+
+def build_shop_archive(directory: Path, articles: int) -> None:
+    """
+    ショップのAPIがそれぞれarticles件の新着を返すアーカイブを作る
+    """
+    tag_list = []
+    for index in range(articles):
+        name = f"{2000 + index // 12}年{index % 12 + 1}月度個別生写真"
+        tag_list.append(
+            {"id": index + 1, "code": f"LT-{index}", "name": name, "name_kana": ""}
+        )
+    base_date = datetime(2020, 1, 1)
+    news_list = []
+    for index in range(articles):
+        published = (base_date + timedelta(hours=index)).isoformat() + "+09:00"
+        news_list.append({"title": f"news {index}", "date": {"published": published}})
+    archive = HttpArchive(directory, mode="record")
+    for url, data in [
+        (ShopSession.TAGLIST_URL, {"tags": tag_list}),
+        (CDShopSession.NEWS_URL, news_list),
+    ]:
+        res = requests.Response()
+        res.status_code = 200
+        res.reason = "OK"
+        res.encoding = "utf-8"
+        res.headers["Content-Type"] = "application/json"
+        res._content = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        archive.record("GET", url, res)
+
+
+def percentile(value_list: list[float], q: float) -> float:
+    if len(value_list) == 0:
+        return 0.0
+    sorted_list = sorted(value_list)
+    index = min(int(len(sorted_list) * q / 100), len(sorted_list) - 1)
+    return sorted_list[index]
+
+
+class Result(NamedTuple):
+    elapsed: float
+    # 通知時刻(実行開始より前なら実行開始)から送信までの秒数
+    latency_list: list[float]
+    memory_peak: Optional[int]
+    call_counter: Counter[str]
+    http_count: int
+
+
+def run_command(
+    command: click.Command,
+    args: list[str],
+    due_dict: dict[str, datetime],
+    memory: bool = True,
+) -> Result:
+    API.reset()
+    http_before = sum(HTTP_REQUESTS.get_all().values())
+    if memory:
+        tracemalloc.start()
+    start_date = datetime.now()
+    start = time.perf_counter()
+    try:
+        command.main(args, prog_name=command.name, standalone_mode=False)
+    finally:
+        elapsed = time.perf_counter() - start
+        memory_peak = None
+        if memory:
+            _, memory_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        set_default_client(None)
+    latency_list = []
+    for title, sent_at in API.sent_list:
+        due = max(due_dict.get(title, start_date), start_date)
+        latency_list.append((sent_at - due).total_seconds())
+    http_count = int(sum(HTTP_REQUESTS.get_all().values()) - http_before)
+    return Result(
+        elapsed, latency_list, memory_peak, Counter(API.call_counter), http_count
+    )
+
+
+def print_result(name: str, result: Result) -> None:
+    send_count = len(result.latency_list)
+    throughput = send_count / result.elapsed if result.elapsed > 0 else 0.0
+    print(name)
+    print(f"  {'elapsed':<16}{result.elapsed:10.3f} s")
+    print(f"  {'sent':<16}{send_count:10d}   {throughput:10.1f} /s")
+    p50 = percentile(result.latency_list, 50)
+    p99 = percentile(result.latency_list, 99)
+    print(f"  {'latency':<16}{p50:10.3f} s p50 {p99:10.3f} s p99")
+    if result.memory_peak is not None:
+        print(f"  {'memory peak':<16}{result.memory_peak / 1024 / 1024:10.1f} MiB")
+    sheet_count = sum(
+        v for k, v in result.call_counter.items() if k.startswith("sheets")
+    )
+    print(f"  {'sheets calls':<16}{sheet_count:10d}")
+    for key, count in sorted(result.call_counter.items()):
+        if key.startswith("sheets."):
+            print(f"    {key[7:]:<14}{count:10d}")
+    print(f"  {'line calls':<16}{result.call_counter['line.broadcast']:10d}")
+    print(f"  {'http requests':<16}{result.http_count:10d}")
+
+
+def run_notify(rows: int, due_ratio: float, memory: bool) -> None:
+    spreadsheet = FakeSpreadsheet()
+    install_stand_ins(spreadsheet)
+    # 秒より細かい時刻はシートに書けないので切り捨てる
+    now = datetime.now().replace(microsecond=0)
+    wsheet = build_schedule_sheet(rows, due_ratio, now)
+    spreadsheet.worksheet_dict[wsheet.title] = wsheet
+    due_dict = {row[1]: now for row in wsheet.row_list[1:]}
+    result = run_command(cli, COMMON_ARGS, due_dict, memory=memory)
+    print_result(f"opime-notify rows={rows} due={int(rows * due_ratio)}", result)
+    # 通知していない予定は全てシートに残っているはず
+    expected = rows - int(rows * due_ratio)
+    print(f"  {'rows left':<16}{wsheet.count_rows():10d}   expected {expected}")
+
+
+def run_realtime(
+    articles: int, archive_dir: Path, latency: float, memory: bool
+) -> None:
+    install_stand_ins(FakeSpreadsheet())
+    build_shop_archive(archive_dir, articles)
+    args = COMMON_ARGS + [
+        "--replay",
+        str(archive_dir),
+        "--replay-latency",
+        str(latency * 1000),
+    ]
+    result = run_command(realtime, args, {}, memory=memory)
+    print_result(f"opime-notify-realtime articles={articles}", result)
+
+
+@click.command()
+@click.option(
+    "--rows",
+    "rows_list",
+    help="number of schedule rows in the sheet",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[10, 1000, 10000],
+    show_default=True,
+)
+@click.option(
+    "--due-ratio",
+    help="ratio of rows that are already due",
+    type=click.FloatRange(min=0, max=1),
+    default=0.5,
+    show_default=True,
+)
+@click.option(
+    "--articles",
+    "articles_list",
+    help="number of new articles returned by each shop API",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[10, 100],
+    show_default=True,
+)
+@click.option(
+    "--sheet-latency", help="latency in milliseconds of each Sheets call", default=0.0
+)
+@click.option(
+    "--line-latency", help="latency in milliseconds of each LINE call", default=0.0
+)
+@click.option(
+    "--http-latency", help="latency in milliseconds of each shop API call", default=0.0
+)
+@click.option(
+    "--memory/--no-memory",
+    help="measure peak memory with tracemalloc (slows down the run)",
+    default=True,
+    show_default=True,
+)
+def main(
+    rows_list,
+    due_ratio,
+    articles_list,
+    sheet_latency,
+    line_latency,
+    http_latency,
+    memory,
+):
+    API.latency_dict.update(sheets=sheet_latency / 1000, line=line_latency / 1000)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # フィンガープリントなどの状態を普段のキャッシュに書かない
+        os.environ[CACHE_DIR_ENV] = tmp_dir
+        for rows in rows_list:
+            run_notify(rows, due_ratio, memory)
+        for articles in articles_list:
+            archive_dir = Path(tmp_dir) / f"archive_{articles}"
+            # 毎回新着として扱われるように状態を分ける
+            os.environ[CACHE_DIR_ENV] = str(Path(tmp_dir) / f"state_{articles}")
+            run_realtime(articles, archive_dir, http_latency / 1000, memory)
+
+
+if __name__ == "__main__":
+    main()
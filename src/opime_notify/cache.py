@@ -0,0 +1,47 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+CACHE_DIR_ENV = "OPIME_NOTIFY_CACHE_DIR"
+
+
+def get_cache_dir() -> Path:
+    """
+    実行間で保持するデータの保存先
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV, "")
+    if cache_dir != "":
+        return Path(cache_dir).expanduser()
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME", "")
+    if xdg_cache_home != "":
+        return Path(xdg_cache_home).expanduser() / "opime-notify"
+    return Path("~/.cache/opime-notify").expanduser()
+
+
+class JsonStateFile:
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> Any:
+        try:
+            with self.path.open("r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # 壊れたファイルは無かったことにする
+            return None
+
+    def save(self, data: Any) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as fp:
+            json.dump(data, fp, ensure_ascii=False, separators=(",", ":"))
+        tmp_path.replace(self.path)
+
+
+def get_state_file(name: str, cache_dir: Optional[Path] = None) -> JsonStateFile:
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    return JsonStateFile(cache_dir / name)
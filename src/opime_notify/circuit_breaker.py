@@ -0,0 +1,112 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"circuit for {name} is open, retry after {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    続けてfailure_threshold回失敗したら開き、cooldown秒の間はすぐに失敗させる
+    cooldownが過ぎたら1回だけ試し(half-open)、成功すれば閉じて失敗すれば開き直す
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        cooldown: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.failure_count = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"CircuitBreaker({self.name!r}, state={self.state!r})"
+
+    def before_call(self) -> None:
+        """
+        呼び出してよいか確認する、開いていればCircuitOpenErrorを投げる
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return None
+            retry_after = self._opened_at + self.cooldown - self.clock()
+            if self.state == OPEN and retry_after <= 0:
+                # 試しの1回だけ通し、結果が出るまで他は失敗させる
+                self.state = HALF_OPEN
+                return None
+            raise CircuitOpenError(self.name, max(retry_after, 0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failure_count = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failure_count += 1
+            if self.state == HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = self.clock()
+
+    @contextmanager
+    def guard(
+        self, is_failure: Callable[[Exception], bool] = lambda error: True
+    ) -> Iterator[None]:
+        """
+        中で出た例外がis_failureなら失敗、それ以外は成功として記録する
+        """
+        self.before_call()
+        try:
+            yield
+        except Exception as error:
+            if is_failure(error):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+
+
+_breaker_dict: dict[str, CircuitBreaker] = {}
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    HttpClientを通らないSheetsやLINEの呼び出しで共有する
+    """
+    with _breaker_lock:
+        breaker = _breaker_dict.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            _breaker_dict[name] = breaker
+        return breaker
+
+
+def reset_circuit_breaker(name: Optional[str] = None) -> None:
+    """
+    nameの状態を捨てる、Noneで全て捨てる
+    """
+    with _breaker_lock:
+        if name is None:
+            _breaker_dict.clear()
+        else:
+            _breaker_dict.pop(name, None)
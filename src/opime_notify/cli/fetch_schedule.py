@@ -1,16 +1,54 @@
-from datetime import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional
 
 import click
-from rich import print
 
-from opime_notify.fetch_schedule.session import OfficialSession
-from opime_notify.fetch_schedule.theater_parser import filter_theater_schedule_list
-from opime_notify.gsheet import GsheetSession
+from opime_notify.cli.options import (
+    EnvCommand,
+    archive_options,
+    deadline_options,
+    install_archive,
+    install_deadline,
+    install_logging,
+    install_metrics,
+    install_profiler,
+    log_options,
+    metrics_options,
+    profile_options,
+)
+from opime_notify.deadline import is_expired
+from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.crawler import IncrementalCrawler, SeenUrlIndex
+from opime_notify.fetch_schedule.parse_cache import ParseCache
+from opime_notify.fetch_schedule.pipeline import (
+    filter_news_schedule,
+    iter_notify_schedule,
+    take_until,
+    tap,
+)
+from opime_notify.fetch_schedule.session import (
+    EXTRACTOR_LIST,
+    HTML_PARSER_LIST,
+    OfficialSession,
+)
+from opime_notify.http_cache import HttpCache
 from opime_notify.schedule import NotifySchedule
 
+if TYPE_CHECKING:
+    from opime_notify.gsheet import GsheetSession
+
+KEYWORDS = ["中井りか"]
+# シートに1回のappend_rowsでまとめて追加する予定の数
+APPEND_CHUNK_SIZE = 50
 
-@click.command()
+logger = logging.getLogger(__name__)
+
+
+@click.command(cls=EnvCommand)
 @click.option("--gsheet-id", help="cache spread sheet id", envvar="GSHEET_ID")
 @click.option(
     "--google-json-key",
@@ -25,43 +63,335 @@ from opime_notify.schedule import NotifySchedule
     is_flag=True,
     default=False,
 )
-@click.option("--verbose", "-v", help="verbose output", is_flag=True, default=False)
-def cli(gsheet_id, google_json_key, no_regist, verbose):
-    print("[bold green]run script fetch_schedule[/bold green]")
-    osession = OfficialSession()
-    notify_schedule_list = []
-    notify_schedule_list += _fetch_theater_schedule_list(osession, verbose=verbose)
-
-    if len(notify_schedule_list) == 0:
-        print("notify_schedule_list is empty")
-        return
-    print("notify_schedule_list")
-    print(notify_schedule_list)
-
-    json_key_file = Path(google_json_key).expanduser()
-    gsession = GsheetSession(json_key_file, gsheet_id)
-    all_schedule = gsession.read_all_schedule()
-    all_schedule += notify_schedule_list
-    print("all_schedule")
-    print(all_schedule)
+@click.option(
+    "--max-workers",
+    help="number of news detail pages fetched in parallel",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+)
+@click.option(
+    "--cache/--no-cache",
+    help="cache news detail pages on local disk",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--cache-dir",
+    help="news detail page cache directory",
+    type=click.Path(file_okay=False),
+    default=None,
+)
+@click.option(
+    "--cache-ttl",
+    help="news detail page cache lifetime in days",
+    type=click.FloatRange(min=0),
+    default=7,
+    show_default=True,
+)
+@click.option(
+    "--cache-revalidate",
+    help="revalidate expired cache entries with conditional requests",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--incremental/--full",
+    help="only process news not seen by the previous runs",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--max-pages",
+    help="maximum number of news list pages walked by --incremental",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+)
+@click.option(
+    "--extractor",
+    help="news page extractor, stream does not build a DOM tree",
+    type=click.Choice(EXTRACTOR_LIST),
+    default="soup",
+    show_default=True,
+)
+@click.option(
+    "--html-parser",
+    help="BeautifulSoup parser for the soup extractor, lxml must be installed",
+    type=click.Choice(HTML_PARSER_LIST),
+    default="html.parser",
+    show_default=True,
+)
+@click.option(
+    "--parse-cache/--no-parse-cache",
+    help="reuse parse results of unchanged news",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--category",
+    "category_name_list",
+    help="news categories crawled concurrently",
+    type=click.Choice(list(OfficialSession.CATEGORY_DICT)),
+    multiple=True,
+    default=["theater", "all"],
+    show_default=True,
+)
+@archive_options
+@deadline_options
+@profile_options
+@metrics_options
+@log_options
+def cli(
+    gsheet_id,
+    google_json_key,
+    no_regist,
+    max_workers,
+    cache,
+    cache_dir,
+    cache_ttl,
+    cache_revalidate,
+    incremental,
+    max_pages,
+    extractor,
+    html_parser,
+    parse_cache,
+    category_name_list,
+    record_dir,
+    replay_dir,
+    replay_latency,
+    deadline,
+    profile_path,
+    profile_cpu,
+    profile_memory,
+    metrics_file,
+    verbose,
+):
+    install_logging(verbose)
+    install_deadline(deadline)
+    archive = install_archive(record_dir, replay_dir, replay_latency)
+    install_profiler(profile_path, profile_cpu, profile_memory)
+    install_metrics(metrics_file)
+    if html_parser == "lxml":
+        _check_lxml()
+    http_cache = None
+    # 記録・再生時は全てのリクエストがアーカイブを通るようにキャッシュを使わない
+    if cache and archive is None:
+        http_cache = HttpCache(
+            directory=Path(cache_dir).expanduser() if cache_dir else None,
+            ttl=timedelta(days=cache_ttl),
+            revalidate=cache_revalidate,
+        )
+    osession = OfficialSession(
+        max_workers=max_workers,
+        cache=http_cache,
+        extractor=extractor,
+        html_parser=html_parser,
+        parse_cache=ParseCache() if parse_cache else None,
+    )
+    category_list = [OfficialSession.CATEGORY_DICT[n] for n in category_name_list]
+    seen_index_dict = {}
+    if incremental:
+        seen_index_dict = {c: SeenUrlIndex(c) for c in category_list}
+
+    @lru_cache(maxsize=None)
+    def get_gsession() -> "GsheetSession":
+        # gspreadは読み込みが重いので通知対象がある時だけimportする
+        if archive is not None and archive.mode == "replay":
+            # 再生時はSheetsに接続せず手元の置き換えに書き込む
+            from opime_notify.standin import StandInGsheetSession
+
+            return StandInGsheetSession()
+        from opime_notify.gsheet import GsheetSession
+
+        json_key_file = Path(google_json_key).expanduser()
+        return GsheetSession(json_key_file, gsheet_id)
+
+    regist_news_schedule(
+        osession,
+        category_list,
+        seen_index_dict,
+        get_gsession,
+        max_pages=max_pages,
+        no_regist=no_regist,
+        verbose=verbose >= 2,
+    )
+
+
+def _check_lxml() -> None:
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        raise click.BadParameter("lxml is not installed", param_hint="--html-parser")
+
+
+def regist_news_schedule(
+    session: OfficialSession,
+    category_list: list[int],
+    seen_index_dict: dict[int, SeenUrlIndex],
+    get_gsession: Callable[[], "GsheetSession"],
+    max_pages: int = 5,
+    no_regist: bool = False,
+    verbose: bool = False,
+    on_schedule: Optional[Callable[[NotifySchedule], Any]] = None,
+) -> list[NotifySchedule]:
+    """
+    ニュースから通知する予定を作り、シートの末尾にまとめて追加する
+    新しく追加する予定はできた順にon_scheduleにも渡す
+    作った通知予定を返す
+    """
+    appender = None
     if not no_regist:
-        gsession.clear_schedule()
-        gsession.write_all_schedule(all_schedule)
+        appender = ScheduleAppender(get_gsession, on_schedule)
+    try:
+        notify_schedule_list = _fetch_news_schedule_list(
+            session,
+            category_list,
+            seen_index_dict,
+            max_pages=max_pages,
+            verbose=verbose,
+            on_schedule=None if appender is None else appender.append,
+        )
+    finally:
+        # 途中で失敗してもon_scheduleに渡した予定はシートに残す
+        if appender is not None:
+            appender.flush()
+    if session.parse_cache is not None:
+        session.parse_cache.save()
+
+    logger.info("news schedule", extra={"count": len(notify_schedule_list)})
+    logger.debug("notify_schedule_list %r", notify_schedule_list)
+    if appender is None:
+        # 登録しない時はシートにも接続しない
+        return notify_schedule_list
+    _save_seen_index(seen_index_dict)
+    if appender.count > 0:
+        logger.info("registered", extra={"count": appender.count})
+    return notify_schedule_list
+
+
+class ScheduleAppender:
+    """
+    通知予定はできた順にon_scheduleに渡し、シートにはchunk_size件ずつまとめて追加する
+    シートへの接続は最初の1件が来た時に行い、既にシートにある予定は追加しない
+    """
+
+    def __init__(
+        self,
+        get_gsession: Callable[[], "GsheetSession"],
+        on_schedule: Optional[Callable[[NotifySchedule], Any]] = None,
+        chunk_size: int = APPEND_CHUNK_SIZE,
+    ):
+        self.get_gsession = get_gsession
+        self.on_schedule = on_schedule
+        self.chunk_size = chunk_size
+        self.registered: Optional[set[NotifySchedule]] = None
+        self.buffer: list[NotifySchedule] = []
+        self.count = 0
+
+    def append(self, schedule: NotifySchedule) -> None:
+        if self.registered is None:
+            gsession = self.get_gsession()
+            with gsession.lock():
+                self.registered = set(gsession.read_all_schedule())
+        if schedule in self.registered:
+            return None
+        self.registered.add(schedule)
+        self.buffer.append(schedule)
+        self.count += 1
+        if self.on_schedule is not None:
+            self.on_schedule(schedule)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.buffer) == 0:
+            return None
+        gsession = self.get_gsession()
+        with gsession.lock():
+            gsession.append_schedule_list(self.buffer)
+        self.buffer = []
+
+
+def _save_seen_index(seen_index_dict: dict[int, SeenUrlIndex]) -> None:
+    for seen_index in seen_index_dict.values():
+        seen_index.save()
+
+
+def _crawl_url_list(
+    session: OfficialSession,
+    category_list: list[int],
+    seen_index_dict: dict[int, SeenUrlIndex],
+    max_pages: int = 5,
+    verbose: bool = False,
+) -> dict[int, list[str]]:
+    """
+    カテゴリ毎の一覧ページを並列に辿り、カテゴリ毎の記事URLを返す
+    """
+
+    def crawl(category: int) -> list[str]:
+        seen_index = seen_index_dict.get(category)
+        if seen_index is None:
+            return session.fetch_detail_url_list(category=category, verbose=verbose)
+        crawler = IncrementalCrawler(session, seen_index, max_pages=max_pages)
+        return crawler.crawl(verbose=verbose)
+
+    with ThreadPoolExecutor(max_workers=len(category_list)) as executor:
+        return dict(zip(category_list, executor.map(crawl, category_list)))
+
+
+def _iter_news_notify_schedule(
+    session: OfficialSession, url_list: Iterable[str], verbose: bool = False
+) -> Iterator[NotifySchedule]:
+    """
+    記事の取得から通知の生成までを1件ずつ流す
+    """
+    schedule_iter: Iterable[Schedule] = session.iter_news_schedule_detail(
+        url_list, verbose=verbose
+    )
+    # 1件ずつの表示はDEBUGの時だけ挟む
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        schedule_iter = tap(schedule_iter, lambda s: logger.debug("parsed %r", s))
+    target_iter = filter_news_schedule(
+        schedule_iter, keywords=KEYWORDS, start_date=datetime.now()
+    )
+    if debug:
+        target_iter = tap(target_iter, lambda s: logger.debug("target %r", s))
+    return iter_notify_schedule(target_iter)
 
 
-def _fetch_theater_schedule_list(
-    session: OfficialSession, verbose: bool = False
+def _fetch_news_schedule_list(
+    session: OfficialSession,
+    category_list: list[int],
+    seen_index_dict: dict[int, SeenUrlIndex],
+    max_pages: int = 5,
+    verbose: bool = False,
+    on_schedule: Optional[Callable[[NotifySchedule], None]] = None,
 ) -> list[NotifySchedule]:
-    theater_schedule_list = session.fetch_schedule_theater(verbose=verbose)
-    if verbose:
-        print("all theater_schedule_list")
-        print(theater_schedule_list)
-    theater_schedule_list = filter_theater_schedule_list(
-        theater_schedule_list, keywords=["中井りか"], start_date=datetime.now()
+    """
+    できた通知予定から順にon_scheduleに渡し、全て終わったら一覧を返す
+    """
+    url_list_dict = _crawl_url_list(
+        session, category_list, seen_index_dict, max_pages=max_pages, verbose=verbose
     )
-    print("theater_schedule_list")
-    print(theater_schedule_list)
-    notify_schedule_list = []
-    for theater_schedule in theater_schedule_list:
-        notify_schedule_list += theater_schedule.get_notify_schedule_list()
+    # 複数のカテゴリに載っている記事は1度だけ処理する
+    url_list = list(dict.fromkeys(u for ul in url_list_dict.values() for u in ul))
+    logger.info("crawled", extra={"count": len(url_list)})
+    # 期限を過ぎたら新しい記事の取得は始めず、取得を始めた記事だけ処理済みにする
+    done_url_list: list[str] = []
+    url_iter = tap(take_until(url_list, is_expired), done_url_list.append)
+    schedule_iter = _iter_news_notify_schedule(session, url_iter, verbose=verbose)
+    if on_schedule is not None:
+        # 残りの記事の取得を待たずに渡す
+        schedule_iter = tap(schedule_iter, on_schedule)
+    # 保持するのは通知する予定だけにする
+    notify_schedule_list = list(schedule_iter)
+    if len(done_url_list) < len(url_list):
+        skip_count = len(url_list) - len(done_url_list)
+        logger.warning("deadline exceeded", extra={"skipped": skip_count})
+    done_url_set = set(done_url_list)
+    for category, seen_index in seen_index_dict.items():
+        category_url_list = url_list_dict.get(category, [])
+        seen_index.update([u for u in category_url_list if u in done_url_set])
     return notify_schedule_list
@@ -0,0 +1,242 @@
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import click
+
+if TYPE_CHECKING:
+    from opime_notify.deadline import Deadline
+    from opime_notify.http_archive import HttpArchive
+    from opime_notify.profiling import Profiler
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def ensure_env() -> None:
+    """
+    .envの環境変数を読み込む、既に設定されている環境変数は上書きしない
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+class EnvCommand(click.Command):
+    """
+    引数とenvvarを読む前に.envを読み込むコマンド
+    """
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        ensure_env()
+        return super().parse_args(ctx, args)
+
+
+def archive_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    --record, --replay, --replay-latency を追加する
+    """
+    func = click.option(
+        "--replay-latency",
+        help="simulated latency in milliseconds for --replay",
+        type=click.FloatRange(min=0),
+        default=0,
+        show_default=True,
+    )(func)
+    func = click.option(
+        "--replay",
+        "replay_dir",
+        help="serve HTTP responses from a directory written by --record",
+        type=click.Path(exists=True, file_okay=False),
+        default=None,
+    )(func)
+    func = click.option(
+        "--record",
+        "record_dir",
+        help="record all HTTP responses to a directory",
+        type=click.Path(file_okay=False),
+        default=None,
+    )(func)
+    return func
+
+
+def install_archive(
+    record_dir: Optional[str], replay_dir: Optional[str], replay_latency: float = 0
+) -> Optional["HttpArchive"]:
+    """
+    指定があれば共有のHTTPクライアントをアーカイブ付きのものに差し替える
+    """
+    if record_dir is not None and replay_dir is not None:
+        raise click.UsageError("--record and --replay can not be used together")
+    if record_dir is not None:
+        directory, mode = record_dir, "record"
+    elif replay_dir is not None:
+        directory, mode = replay_dir, "replay"
+    else:
+        return None
+    # requestsの読み込みは重いので使う時まで遅らせる
+    from opime_notify.http_archive import HttpArchive
+    from opime_notify.http_client import HttpClient, set_default_client
+
+    # latencyはreplayの時だけ使われる
+    archive = HttpArchive(
+        Path(directory).expanduser(), mode=mode, latency=replay_latency / 1000
+    )
+    set_default_client(HttpClient(archive=archive))
+    logger.info(
+        "http archive", extra={"mode": archive.mode, "directory": archive.directory}
+    )
+    return archive
+
+
+def profile_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    --profile, --profile-cpu, --profile-memory を追加する
+    """
+    func = click.option(
+        "--profile-memory",
+        help="also record allocations with tracemalloc for --profile",
+        is_flag=True,
+        default=False,
+    )(func)
+    func = click.option(
+        "--profile-cpu",
+        help="also record the main thread with cProfile for --profile",
+        is_flag=True,
+        default=False,
+    )(func)
+    func = click.option(
+        "--profile",
+        "profile_path",
+        help="write a JSON report of time spent in each stage",
+        type=click.Path(dir_okay=False),
+        default=None,
+    )(func)
+    return func
+
+
+def install_profiler(
+    profile_path: Optional[str], profile_cpu: bool = False, profile_memory: bool = False
+) -> Optional["Profiler"]:
+    """
+    指定があれば各段階の計測を始め、コマンドの終了時にレポートを書く
+    """
+    if profile_path is None:
+        if profile_cpu or profile_memory:
+            raise click.UsageError("--profile-cpu and --profile-memory need --profile")
+        return None
+    from opime_notify.http_client import get_default_client
+    from opime_notify.profiling import Profiler, set_profiler
+
+    ctx = click.get_current_context()
+    profiler = Profiler(
+        command=ctx.info_name or "", cpu=profile_cpu, memory=profile_memory
+    )
+    path = Path(profile_path).expanduser()
+    # アーカイブで差し替えた後のクライアントに登録する
+    get_default_client().add_listener(profiler.record_http)
+    set_profiler(profiler)
+
+    def finish() -> None:
+        profiler.stop()
+        set_profiler(None)
+        profiler.write_report(path)
+        logger.info("profile report", extra={"path": path})
+
+    ctx.call_on_close(finish)
+    profiler.start()
+    return profiler
+
+
+def metrics_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    --metrics-file を追加する
+    """
+    func = click.option(
+        "--metrics-file",
+        help="write metrics in the Prometheus text format when the command exits",
+        type=click.Path(dir_okay=False),
+        envvar="OPIME_NOTIFY_METRICS_FILE",
+        default=None,
+    )(func)
+    return func
+
+
+def install_metrics(metrics_file: Optional[str]) -> None:
+    """
+    指定があればコマンドの終了時にメトリクスをファイルに書き出す
+    """
+    if metrics_file is None:
+        return None
+    from opime_notify.metrics import REGISTRY
+
+    path = Path(metrics_file).expanduser()
+    ctx = click.get_current_context()
+    ctx.call_on_close(lambda: REGISTRY.write_textfile(path))
+
+
+def log_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    --verbose を追加する
+    """
+    func = click.option(
+        "--verbose",
+        "-v",
+        help="also log full lists (-vv also prints parser details)",
+        count=True,
+    )(func)
+    return func
+
+
+def install_logging(verbose: int = 0) -> None:
+    """
+    JSONのログを出すようにし、コマンドの終了時に件数と経過時間をまとめて出す
+    """
+    from opime_notify.log import setup_logging
+    from opime_notify.metrics import ITEMS
+
+    setup_logging(verbose)
+    ctx = click.get_current_context()
+    command = ctx.info_name or ""
+    start = time.perf_counter()
+
+    def finish() -> None:
+        item_dict = {dict(k)["stage"]: v for k, v in ITEMS.get_all().items()}
+        extra = {
+            "command": command,
+            "elapsed": round(time.perf_counter() - start, 3),
+            "items": item_dict,
+        }
+        logger.info("finished", extra=extra)
+
+    ctx.call_on_close(finish)
+    logger.info("start", extra={"command": command})
+
+
+def deadline_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    --deadline を追加する
+    """
+    func = click.option(
+        "--deadline",
+        help="stop starting new work after SECONDS and save what is done",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+    )(func)
+    return func
+
+
+def install_deadline(deadline: Optional[float]) -> Optional["Deadline"]:
+    """
+    指定があれば実行全体の期限を設定し、コマンドの終了時に外す
+    """
+    if deadline is None:
+        return None
+    from opime_notify.deadline import Deadline, set_deadline
+
+    run_deadline = Deadline(deadline)
+    set_deadline(run_deadline)
+    click.get_current_context().call_on_close(lambda: set_deadline(None))
+    return run_deadline
@@ -1,21 +1,13 @@
 import click
-from dotenv import load_dotenv
-from linebot import LineBotApi
-from linebot.exceptions import LineBotApiError
-from linebot.models import (
-    ConfirmTemplate,
-    MessageAction,
-    TemplateSendMessage,
-    TextSendMessage,
-    URIAction,
-)
 from rich import print
-from rich.prompt import Prompt
 
-load_dotenv()
+from opime_notify.cli.options import EnvCommand
+
+# linebotは読み込みが重いのでcliの中でimportする
+# .envはコマンドの引数を読む前に読まれる
 
 
-@click.command()
+@click.command(cls=EnvCommand)
 @click.option(
     "--access-token",
     help="channel access token for LINE Messaging API",
@@ -30,8 +22,20 @@ load_dotenv()
 )
 @click.argument("text", type=str)
 def cli(access_token: str, type: str, text: str) -> None:
+    from linebot import LineBotApi
+    from linebot.exceptions import LineBotApiError
+    from linebot.models import (
+        ConfirmTemplate,
+        MessageAction,
+        TemplateSendMessage,
+        TextSendMessage,
+        URIAction,
+    )
+
     print("[bold green]run script send_line![/bold green]")
     if access_token is None:
+        from rich.prompt import Prompt
+
         access_token = Prompt.ask("Enter channel access token")
 
     line_bot_api = LineBotApi(access_token)
@@ -0,0 +1,234 @@
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import click
+
+from opime_notify.cli.fetch_schedule import regist_news_schedule
+from opime_notify.cli.options import (
+    EnvCommand,
+    archive_options,
+    install_archive,
+    install_logging,
+    log_options,
+    metrics_options,
+)
+from opime_notify.due_timer import DueTimer
+from opime_notify.fetch_schedule.crawler import SeenUrlIndex
+from opime_notify.fetch_schedule.parse_cache import ParseCache
+from opime_notify.fetch_schedule.session import OfficialSession
+from opime_notify.fingerprint import FingerprintStore
+from opime_notify.gsheet import GsheetSession
+from opime_notify.http_cache import HttpCache
+from opime_notify.main import get_all_adapter, notify_due_schedule, run_realtime
+from opime_notify.metrics import REGISTRY, start_http_server
+from opime_notify.notify import LineNotifiyer
+from opime_notify.realtime.poll_scheduler import AdaptivePollScheduler
+from opime_notify.service import Job, run_service
+from opime_notify.standin import StandInGsheetSession, StandInLineNotifiyer
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(cls=EnvCommand)
+@click.option(
+    "--line-access-token", help="line access token", envvar="LINE_ACCESS_TOKEN"
+)
+@click.option("--gsheet-id", help="cache spread sheet id", envvar="GSHEET_ID")
+@click.option(
+    "--google-json-key",
+    help="google json key file",
+    type=click.Path(),
+    envvar="GOOGLE_JSON_KEY_FILE",
+)
+@click.option(
+    "--notify-interval",
+    help="interval in minutes of reloading the sheet and retrying failed sends",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+)
+@click.option(
+    "--realtime-interval",
+    help="interval in minutes of polling realtime adapters",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+)
+@click.option(
+    "--fetch-interval",
+    help="interval in minutes of crawling official news",
+    type=click.IntRange(min=1),
+    default=60,
+    show_default=True,
+)
+@click.option(
+    "--adaptive",
+    help="skip adapters that are not due by the adaptive polling schedule",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--max-interval",
+    help="maximum polling interval in minutes for --adaptive",
+    type=click.IntRange(min=1),
+    default=120,
+    show_default=True,
+)
+@click.option(
+    "--dry-run",
+    help="no regist google spread sheet and no notify",
+    is_flag=True,
+    default=False,
+)
+@click.option("--once", help="run every job once and exit", is_flag=True)
+@click.option(
+    "--metrics-port",
+    help="serve metrics on http://127.0.0.1:PORT/metrics",
+    type=click.IntRange(min=1, max=65535),
+    default=None,
+)
+@archive_options
+@metrics_options
+@log_options
+def cli(
+    line_access_token,
+    gsheet_id,
+    google_json_key,
+    notify_interval,
+    realtime_interval,
+    fetch_interval,
+    adaptive,
+    max_interval,
+    dry_run,
+    once,
+    metrics_port,
+    record_dir,
+    replay_dir,
+    replay_latency,
+    metrics_file,
+    verbose,
+):
+    install_logging(verbose)
+    archive = install_archive(record_dir, replay_dir, replay_latency)
+    # 認証とシートを開くのは起動時の1回だけにして全てのジョブで共有する
+    gsession: GsheetSession
+    line_notifiyer: LineNotifiyer
+    if archive is not None and archive.mode == "replay":
+        # 再生時はSheetsとLINEに接続せず手元の置き換えを使う
+        gsession = StandInGsheetSession()
+        line_notifiyer = StandInLineNotifiyer()
+    else:
+        gsession = GsheetSession(Path(google_json_key).expanduser(), gsheet_id)
+        line_notifiyer = LineNotifiyer(line_access_token)
+
+    # 通知時刻ちょうどに送るため、シートの予定はタイマーに入れておく
+    due_timer = DueTimer()
+
+    def notify() -> None:
+        _notify_due_schedule(gsession, line_notifiyer, due_timer)
+
+    due_job = Job("due", notify, timedelta(0))
+    job_list = []
+    if not dry_run:
+        job_list.append(Job("notify", notify, timedelta(minutes=notify_interval)))
+    job_list.append(
+        _build_realtime_job(
+            gsession,
+            line_notifiyer,
+            timedelta(minutes=realtime_interval),
+            timedelta(minutes=max_interval),
+            adaptive=adaptive,
+            dry_run=dry_run,
+        )
+    )
+    job_list.append(
+        _build_fetch_job(
+            gsession,
+            due_timer,
+            timedelta(minutes=fetch_interval),
+            use_cache=archive is None,
+            dry_run=dry_run,
+        )
+    )
+    if metrics_file is not None:
+        path = Path(metrics_file).expanduser()
+        job_list.append(
+            Job("metrics", lambda: REGISTRY.write_textfile(path), timedelta(minutes=1))
+        )
+    if metrics_port is not None:
+        start_http_server(metrics_port)
+        logger.info("metrics server", extra={"port": metrics_port})
+    logger.info("jobs", extra={"jobs": [repr(j) for j in job_list]})
+    if dry_run:
+        run_service(job_list, once=once)
+    else:
+        run_service(job_list, due_timer=due_timer, due_job=due_job, once=once)
+
+
+def _notify_due_schedule(
+    gsession: GsheetSession, line_notifiyer: LineNotifiyer, due_timer: DueTimer
+) -> None:
+    """
+    通知時刻を過ぎた予定を送り、シートに残った今後の予定をタイマーに入れる
+    送れなかった予定は次の定期実行で送り直す
+    """
+    schedule_list = notify_due_schedule(gsession, lambda: line_notifiyer)
+    now = datetime.now()
+    due_timer.add_all(s for s in schedule_list if s.get_date() >= now)
+
+
+def _build_realtime_job(
+    gsession: GsheetSession,
+    line_notifiyer: LineNotifiyer,
+    interval: timedelta,
+    max_interval: timedelta,
+    adaptive: bool = False,
+    dry_run: bool = False,
+) -> Job:
+    fingerprint_store = FingerprintStore()
+    poll_scheduler = AdaptivePollScheduler(
+        min_interval=interval, max_interval=max(interval, max_interval)
+    )
+
+    def realtime() -> None:
+        # アダプターは取得結果を持つので毎回作り直す
+        run_realtime(
+            get_all_adapter(),
+            lambda: gsession,
+            lambda: line_notifiyer,
+            fingerprint_store,
+            poll_scheduler,
+            adaptive=adaptive,
+            dry_run=dry_run,
+        )
+
+    return Job("realtime", realtime, interval)
+
+
+def _build_fetch_job(
+    gsession: GsheetSession,
+    due_timer: DueTimer,
+    interval: timedelta,
+    use_cache: bool = True,
+    dry_run: bool = False,
+) -> Job:
+    # 記録・再生時は全てのリクエストがアーカイブを通るようにキャッシュを使わない
+    osession = OfficialSession(
+        cache=HttpCache() if use_cache else None, parse_cache=ParseCache()
+    )
+    category_list = [OfficialSession.THEATER_CATEGORY, OfficialSession.ALL_CATEGORY]
+    seen_index_dict = {c: SeenUrlIndex(c) for c in category_list}
+
+    def fetch() -> None:
+        # シートに追加した予定から順にタイマーに入れる
+        regist_news_schedule(
+            osession,
+            category_list,
+            seen_index_dict,
+            lambda: gsession,
+            no_regist=dry_run,
+            on_schedule=due_timer.add,
+        )
+
+    return Job("fetch-schedule", fetch, interval)
@@ -0,0 +1,71 @@
+import time
+from typing import Callable, Optional, Union
+
+# requestsのtimeoutと同じ形、Noneは無制限
+Timeout = Union[None, float, tuple[Optional[float], Optional[float]]]
+
+# 期限を過ぎても、結果の保存などで始めた通信はこの秒数までは待つ
+MIN_TIMEOUT = 1.0
+
+
+class Deadline:
+    """
+    1回の実行に使える時間
+    期限を過ぎたら新しい処理を始めず、それまでの結果を保存して終える
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self._end = clock() + seconds
+
+    def __repr__(self):
+        return f"Deadline({self.seconds}, remaining={self.remaining():.1f})"
+
+    def remaining(self) -> float:
+        return max(self._end - self.clock(), 0.0)
+
+    def is_expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clamp_timeout(self, timeout: Timeout) -> Timeout:
+        """
+        通信のタイムアウトを残り時間までに縮める、Noneは残り時間にする
+        """
+        limit = max(self.remaining(), MIN_TIMEOUT)
+        if isinstance(timeout, tuple):
+            return (_clamp(timeout[0], limit), _clamp(timeout[1], limit))
+        return _clamp(timeout, limit)
+
+
+def _clamp(timeout: Optional[float], limit: float) -> float:
+    if timeout is None:
+        return limit
+    return min(timeout, limit)
+
+
+_deadline: Optional[Deadline] = None
+
+
+def get_deadline() -> Optional[Deadline]:
+    return _deadline
+
+
+def set_deadline(deadline: Optional[Deadline]) -> None:
+    """
+    実行全体の期限を設定する、Noneで期限なし
+    """
+    global _deadline
+    _deadline = deadline
+
+
+def is_expired() -> bool:
+    deadline = _deadline
+    return deadline is not None and deadline.is_expired()
+
+
+def clamp_timeout(timeout: Timeout) -> Timeout:
+    deadline = _deadline
+    if deadline is None:
+        return timeout
+    return deadline.clamp_timeout(timeout)
@@ -0,0 +1,69 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from opime_notify.schedule import NotifySchedule
+
+
+class DueTimer:
+    """
+    通知予定を通知時刻の順に持つヒープ
+    同じ予定(タイトルと時刻が同じもの)は1度だけ入る
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int, NotifySchedule]] = []
+        self._schedule_set: set[NotifySchedule] = set()
+        # 時刻が同じ場合は追加した順に取り出す
+        self._counter = itertools.count()
+        self.listener_list: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """
+        予定が追加された時に呼ばれる、追加したスレッドで実行される
+        """
+        self.listener_list.append(listener)
+
+    def add(self, schedule: NotifySchedule) -> bool:
+        return self.add_all([schedule]) == 1
+
+    def add_all(self, schedule_list: Iterable[NotifySchedule]) -> int:
+        count = 0
+        with self._lock:
+            for schedule in schedule_list:
+                if schedule in self._schedule_set:
+                    continue
+                entry = (schedule.get_date(), next(self._counter), schedule)
+                heapq.heappush(self._heap, entry)
+                self._schedule_set.add(schedule)
+                count += 1
+        if count > 0:
+            for listener in self.listener_list:
+                listener()
+        return count
+
+    def next_due(self) -> Optional[datetime]:
+        with self._lock:
+            if len(self._heap) == 0:
+                return None
+            return self._heap[0][0]
+
+    def pop_due(self, now: Optional[datetime] = None) -> list[NotifySchedule]:
+        """
+        通知時刻を過ぎた予定を時刻順に取り出す
+        """
+        if now is None:
+            now = datetime.now()
+        due_list = []
+        with self._lock:
+            while len(self._heap) > 0 and self._heap[0][0] < now:
+                _, _, schedule = heapq.heappop(self._heap)
+                self._schedule_set.discard(schedule)
+                due_list.append(schedule)
+        return due_list
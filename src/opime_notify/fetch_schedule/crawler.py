@@ -0,0 +1,87 @@
+from pathlib import Path
+from typing import Any, Optional
+
+from opime_notify.cache import get_state_file
+from opime_notify.fetch_schedule.session import OfficialSession
+
+
+class SeenUrlIndex:
+    """
+    処理済みの記事URLをカテゴリ毎に保持する
+    """
+
+    def __init__(
+        self, category: int, cache_dir: Optional[Path] = None, max_size: int = 1000
+    ):
+        self.category = category
+        self.max_size = max_size
+        self.state_file = get_state_file(f"seen_news_url_{category}.json", cache_dir)
+        url_list: Any = self.state_file.load()
+        if not isinstance(url_list, list):
+            url_list = []
+        self.url_list: list[str] = url_list
+        self.url_set = set(url_list)
+
+    def __len__(self) -> int:
+        return len(self.url_list)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.url_set
+
+    def update(self, url_list: list[str]) -> None:
+        for url in url_list:
+            if url in self.url_set:
+                continue
+            self.url_list.append(url)
+            self.url_set.add(url)
+
+    def save(self) -> None:
+        if len(self.url_list) > self.max_size:
+            del self.url_list[: len(self.url_list) - self.max_size]
+            self.url_set = set(self.url_list)
+        self.state_file.save(self.url_list)
+
+
+class IncrementalCrawler:
+    """
+    処理済みの記事が出てくるまでニュース一覧のページを辿る
+    """
+
+    def __init__(
+        self,
+        session: OfficialSession,
+        seen_index: SeenUrlIndex,
+        max_pages: int = 5,
+    ):
+        self.session = session
+        self.seen_index = seen_index
+        self.max_pages = max_pages
+
+    def crawl(self, verbose: bool = False) -> list[str]:
+        """
+        未処理の記事URLを新しい順に返す
+        """
+        max_pages = self.max_pages
+        if len(self.seen_index) == 0:
+            # 初回は止まる目印が無いので1ページ目のみ
+            max_pages = 1
+        new_url_list: list[str] = []
+        for page in range(1, max_pages + 1):
+            url_list = self.session.fetch_detail_url_list(
+                page=page, category=self.seen_index.category, verbose=verbose
+            )
+            if len(url_list) == 0:
+                break
+            found_seen = False
+            for url in url_list:
+                # 固定表示の記事があっても取りこぼさないようページ内は全て確認する
+                if url in self.seen_index:
+                    found_seen = True
+                    continue
+                if url not in new_url_list:
+                    new_url_list.append(url)
+            if found_seen:
+                break
+        if verbose:
+            print(f"{len(new_url_list)=}")
+        return new_url_list
@@ -0,0 +1,78 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+# 2022年11月25日(金)12:00, 12月1日, 12月1日(木)18:30 など、曜日と時刻は省略可
+JP_DATETIME_PATTERN = re.compile(
+    r"(?:(\d{4})年)?(\d{1,2})月(\d{1,2})日(?:\((.)\))?(?:(\d{1,2}):(\d{1,2}))?"
+)
+# 12/3(土)15:00, 12/3 15:00 など
+SLASH_DATETIME_PATTERN = re.compile(
+    r"(\d{1,2})/(\d{1,2})(?:\((.)\))? ?(?:(\d{1,2}):(\d{1,2}))?"
+)
+# 2022.12.01
+DOT_DATE_PATTERN = re.compile(r"(\d{4})\.(\d{2})\.(\d{2})")
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{1,2})")
+
+
+def _build_datetime(
+    text: str,
+    year: Optional[str],
+    default_year: Optional[int],
+    month: str,
+    day: str,
+    hour: Optional[str],
+    minute: Optional[str],
+) -> datetime:
+    if year is not None:
+        _year = int(year)
+    elif default_year is not None:
+        _year = default_year
+    else:
+        raise ValueError(f"year is missing in {text!r}")
+    return datetime(_year, int(month), int(day), int(hour or 0), int(minute or 0))
+
+
+@lru_cache(maxsize=1024)
+def parse_jp_datetime(text: str, year: Optional[int] = None) -> datetime:
+    """
+    年が無い場合はyearを使う、曜日は無視する
+    """
+    mobj = JP_DATETIME_PATTERN.fullmatch(text)
+    if mobj is None:
+        raise ValueError(f"unknown date format {text!r}")
+    _year, month, day, _, hour, minute = mobj.groups()
+    return _build_datetime(text, _year, year, month, day, hour, minute)
+
+
+@lru_cache(maxsize=1024)
+def parse_slash_datetime(text: str, year: int) -> datetime:
+    mobj = SLASH_DATETIME_PATTERN.fullmatch(text)
+    if mobj is None:
+        raise ValueError(f"unknown date format {text!r}")
+    month, day, _, hour, minute = mobj.groups()
+    return _build_datetime(text, None, year, month, day, hour, minute)
+
+
+@lru_cache(maxsize=1024)
+def parse_dot_date(text: str) -> datetime:
+    mobj = DOT_DATE_PATTERN.fullmatch(text)
+    if mobj is None:
+        raise ValueError(f"unknown date format {text!r}")
+    year, month, day = mobj.groups()
+    return datetime(int(year), int(month), int(day))
+
+
+@lru_cache(maxsize=1024)
+def parse_time(text: str) -> tuple[int, int]:
+    """
+    (時, 分) を返す
+    """
+    mobj = TIME_PATTERN.fullmatch(text)
+    if mobj is None:
+        raise ValueError(f"unknown time format {text!r}")
+    hour, minute = int(mobj.group(1)), int(mobj.group(2))
+    if hour > 23 or minute > 59:
+        raise ValueError(f"time out of range {text!r}")
+    return (hour, minute)
@@ -0,0 +1,52 @@
+import re
+from typing import Iterable, Optional
+
+
+class KeywordMatcher:
+    """
+    複数のキーワードを1つの正規表現にまとめ、1回の走査で含まれているか判定する
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # 重なるキーワードは長い方を優先する
+        self.keyword_list = sorted(set(keywords), key=lambda k: (-len(k), k))
+        self.pattern: Optional[re.Pattern[str]] = None
+        # 1つだけなら正規表現より部分文字列の検索の方が速い
+        self.single: Optional[str] = None
+        if len(self.keyword_list) == 1:
+            self.single = self.keyword_list[0]
+        if len(self.keyword_list) > 0:
+            self.pattern = re.compile("|".join(map(re.escape, self.keyword_list)))
+
+    def __len__(self) -> int:
+        return len(self.keyword_list)
+
+    def search(self, *text_list: str) -> bool:
+        """
+        いずれかの文字列にキーワードが含まれていればTrue
+        """
+        single = self.single
+        if single is not None:
+            for text in text_list:
+                if single in text:
+                    return True
+            return False
+        if self.pattern is None:
+            return False
+        search = self.pattern.search
+        for text in text_list:
+            if search(text) is not None:
+                return True
+        return False
+
+    def findall(self, *text_list: str) -> set[str]:
+        """
+        含まれているキーワードを返す
+        """
+        if self.pattern is None:
+            return set()
+        found_set = set()
+        for text in text_list:
+            found_set.update(self.pattern.findall(text))
+        found_set.discard("")
+        return found_set
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from opime_notify.fetch_schedule import Parser, Schedule
+from opime_notify.fetch_schedule.dateparse import parse_jp_datetime
 from opime_notify.schedule import NotifySchedule
 
 
@@ -44,16 +45,21 @@ class MonthlyPhotoSchedule(Schedule):
 
 
 class MonthlyPhotoParser(Parser):
+    # 解析結果が変わる修正をした場合は上げる(ParseCacheのキーに使う)
+    VERSION = 1
+
     def __init__(self, schedule: MonthlyPhotoSchedule):
         self.schedule = schedule
 
-    def parse(self) -> list[MonthlyPhotoSchedule]:
+    def parse(self, verbose: bool = False) -> list[MonthlyPhotoSchedule]:
         _title = self.schedule.title
         title = _title.split("予約")[0]
         body_text = self.schedule.description
         norm_body_text = unicodedata.normalize("NFKC", body_text)
         norm_body_text = norm_body_text.replace(" ", "")
         start_date = self.parse_start_date(norm_body_text)
+        if verbose:
+            print(f"{start_date=}")
         if start_date is None:
             return []
         return [
@@ -71,11 +77,8 @@ class MonthlyPhotoParser(Parser):
         mobj = re.search(date_pattern, body_text)
         if mobj is None:
             return None
-        date_text = self._trim_week_str(mobj.group(1))
-        date_format = "%m月%d日%H:%M"
-        date = datetime.strptime(date_text, date_format)
         now_year = datetime.now().year
-        return date.replace(year=now_year)
+        return parse_jp_datetime(mobj.group(1), year=now_year)
 
 
 def schedule_to_monthly_photo_schedule(schedule: Schedule) -> MonthlyPhotoSchedule:
@@ -88,7 +91,7 @@ def schedule_to_monthly_photo_schedule(schedule: Schedule) -> MonthlyPhotoSchedu
 
 
 def filter_mpschedule_list(
-    schedule_list: list[MonthlyPhotoSchedule], start_date: datetime = None
+    schedule_list: list[MonthlyPhotoSchedule], start_date: Optional[datetime] = None
 ) -> list[MonthlyPhotoSchedule]:
     if start_date is None:
         return schedule_list
@@ -0,0 +1,189 @@
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Optional
+
+from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.dateparse import parse_dot_date
+
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+SKIP_TAGS = {"script", "style", "template"}
+CHUNK_SIZE = 16 * 1024
+
+
+def parse_news_date(text: str) -> Optional[datetime]:
+    pattern = r"\d{4}\.\d{2}\.\d{2}"
+    mobj = re.match(pattern, text.strip())
+    if mobj is None:
+        return None
+    return parse_dot_date(mobj.group(0))
+
+
+class NewsPageExtractor(HTMLParser):
+    """
+    DOMを作らずにニュースページから必要な値だけを取り出す
+    BeautifulSoupでdiv.news-block-innerを探した場合と同じ結果になるようにしている
+    """
+
+    def __init__(self, link_pattern: Optional[re.Pattern[str]] = None):
+        super().__init__(convert_charrefs=True)
+        self.link_pattern = link_pattern
+        self.stack: list[str] = []
+        # 各要素を開いた時点のstackの長さ、閉じたら-1
+        self.region_dict: dict[str, Optional[int]] = {
+            "body": None,
+            "title": None,
+            "span": None,
+            "date": None,
+            "content": None,
+        }
+        self.text_dict: dict[str, list[str]] = {
+            "title": [],
+            "span": [],
+            "date": [],
+            "content": [],
+        }
+        self.span_sibling: Optional[str] = None
+        # None: span未処理, "pending": span直後, "done": 兄弟ノードを確認済み
+        self.span_state: Optional[str] = None
+        self.skip_depth: Optional[int] = None
+        self.link_list: list[str] = []
+        self.finished = False
+
+    def is_open(self, name: str) -> bool:
+        depth = self.region_dict[name]
+        return depth is not None and depth >= 0
+
+    def _open_region(self, name: str) -> None:
+        if self.region_dict[name] is None:
+            self.region_dict[name] = len(self.stack)
+
+    def _close_regions(self) -> None:
+        for name, depth in self.region_dict.items():
+            if depth is not None and depth > len(self.stack):
+                self.region_dict[name] = -1
+                if name == "span":
+                    self.span_state = "pending"
+                elif name == "body":
+                    self.finished = True
+
+    def _after_span_event(self) -> None:
+        if self.span_state == "pending":
+            self.span_state = "done"
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self._after_span_event()
+        if self.finished:
+            return None
+        attr_dict = dict(attrs)
+        if self.skip_depth is None and tag in SKIP_TAGS:
+            self.skip_depth = len(self.stack)
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+        class_list = (attr_dict.get("class") or "").split()
+        if not self.is_open("body"):
+            if tag == "div" and "news-block-inner" in class_list:
+                self._open_region("body")
+            return None
+        self._handle_body_starttag(tag, attr_dict, class_list)
+
+    def _handle_body_starttag(
+        self, tag: str, attr_dict: dict, class_list: list[str]
+    ) -> None:
+        if tag == "a" and self.link_pattern is not None:
+            href = attr_dict.get("href")
+            if isinstance(href, str) and self.link_pattern.search(href):
+                self.link_list.append(href)
+        if tag == "div":
+            for name in ["title", "date", "content"]:
+                if name in class_list:
+                    self._open_region(name)
+        elif tag == "span" and self.is_open("title"):
+            self._open_region("span")
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and not self.finished:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        self._after_span_event()
+        if self.finished or tag not in self.stack:
+            return None
+        # 閉じ忘れの要素もまとめて閉じる
+        while len(self.stack) > 0:
+            if self.stack.pop() == tag:
+                break
+        if self.skip_depth is not None and self.skip_depth >= len(self.stack):
+            self.skip_depth = None
+        self._close_regions()
+
+    def handle_data(self, data: str) -> None:
+        if self.finished or self.skip_depth is not None:
+            return None
+        if self.span_state == "pending":
+            self.span_sibling = (self.span_sibling or "") + data
+        for name in ["title", "span", "date", "content"]:
+            if self.is_open(name):
+                self.text_dict[name].append(data)
+
+    def handle_comment(self, data: str) -> None:
+        # BeautifulSoupではコメントも文字列ノードとして扱われる
+        if self.span_state == "pending" and self.span_sibling is None:
+            self.span_sibling = data
+        self._after_span_event()
+
+    def get_text(self, name: str) -> str:
+        return "".join(self.text_dict[name])
+
+    def feed_text(self, htmltext: str) -> None:
+        for start in range(0, len(htmltext), CHUNK_SIZE):
+            if self.finished:
+                break
+            end = start + CHUNK_SIZE
+            self.feed(htmltext[start:end])
+        self.close()
+
+    def get_schedule(self) -> Optional[Schedule]:
+        if self.region_dict["body"] is None:
+            return None
+        if self.region_dict["title"] is None or self.region_dict["date"] is None:
+            return None
+        if self.region_dict["span"] is not None:
+            tagname = self.get_text("span").strip()
+            title = ""
+            if self.span_sibling is not None:
+                title = self.span_sibling.strip()
+        else:
+            tagname = ""
+            title = self.get_text("title").strip()
+        date = parse_news_date(self.get_text("date"))
+        body_text = self.get_text("content").strip()
+        return Schedule(title=title, date=date, type=tagname, description=body_text)
+
+
+def extract_news_detail(htmltext: str) -> Optional[Schedule]:
+    extractor = NewsPageExtractor()
+    extractor.feed_text(htmltext)
+    return extractor.get_schedule()
+
+
+def extract_news_url_list(htmltext: str, link_pattern: re.Pattern[str]) -> list[str]:
+    extractor = NewsPageExtractor(link_pattern=link_pattern)
+    extractor.feed_text(htmltext)
+    return extractor.link_list
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from opime_notify.fetch_schedule import Parser, Schedule
+from opime_notify.fetch_schedule.dateparse import parse_slash_datetime
 from opime_notify.schedule import NotifySchedule
 
 
@@ -73,6 +74,9 @@ def schedule_to_otsale_schedule(schedule: Schedule) -> OTSaleSchedule:
 
 
 class OTSaleNewsParser(Parser):
+    # 解析結果が変わる修正をした場合は上げる(ParseCacheのキーに使う)
+    VERSION = 1
+
     def __init__(self, schedule: OTSaleSchedule):
         self.schedule = schedule
         self.cdtitle = self._parse_cdtitle(self.schedule.title)
@@ -86,7 +90,7 @@ class OTSaleNewsParser(Parser):
             return mobj.group(1)
         return title
 
-    def parse(self) -> list[OTSaleSchedule]:
+    def parse(self, verbose: bool = False) -> list[OTSaleSchedule]:
         # ご予約受付日程 -> 空行
         body_str = self.schedule.description
         over_keyword = "ご予約受付日程"
@@ -101,6 +105,8 @@ class OTSaleNewsParser(Parser):
             if otsale_schedule is None:
                 continue
             otsale_schedule_list.append(otsale_schedule)
+        if verbose:
+            print(f"{len(otsale_schedule_list)=}")
         return otsale_schedule_list
 
     def parse_one_sale(self, one_sale_text) -> Optional[OTSaleSchedule]:
@@ -110,12 +116,8 @@ class OTSaleNewsParser(Parser):
             return None
         now_year = datetime.now().year
         zi = int(mobj.group(1))
-        sale_start_str = self._trim_week_str(mobj.group(2), " ")
-        sale_end_str = self._trim_week_str(mobj.group(3), " ")
-        sale_start = datetime.strptime(sale_start_str, "%m/%d %H:%M")
-        sale_start = sale_start.replace(year=now_year)
-        sale_end = datetime.strptime(sale_end_str, "%m/%d %H:%M")
-        sale_end = sale_end.replace(year=now_year)
+        sale_start = parse_slash_datetime(mobj.group(2), year=now_year)
+        sale_end = parse_slash_datetime(mobj.group(3), year=now_year)
         description = one_sale_text.strip().split("\n")[-1]
         return OTSaleSchedule(
             title=self.schedule.title,
@@ -130,7 +132,7 @@ class OTSaleNewsParser(Parser):
 
 
 def filter_otsale_schedule_list(
-    otsale_schedule_list: list[OTSaleSchedule], start_date: datetime = None
+    otsale_schedule_list: list[OTSaleSchedule], start_date: Optional[datetime] = None
 ) -> list[OTSaleSchedule]:
     slist = []
     for otsale_schedule in otsale_schedule_list:
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from opime_notify.cache import get_state_file
+from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.monthly_photo_parser import MonthlyPhotoSchedule
+from opime_notify.fetch_schedule.otsale_parser import OTSaleSchedule
+from opime_notify.fetch_schedule.theater_parser import TheaterSchedule
+from opime_notify.profiling import span
+
+# 保存する属性、順番を変える場合は各ParserのVERSIONを上げること
+SCHEDULE_FIELD_DICT: dict[str, tuple[type, list[str]]] = {
+    "TheaterSchedule": (
+        TheaterSchedule,
+        [
+            "title",
+            "date",
+            "type",
+            "description",
+            "offer_start_date",
+            "offer_end_date",
+            "result_date",
+        ],
+    ),
+    "OTSaleSchedule": (
+        OTSaleSchedule,
+        [
+            "title",
+            "date",
+            "type",
+            "description",
+            "zi",
+            "sale_start",
+            "sale_end",
+            "cdtitle",
+        ],
+    ),
+    "MonthlyPhotoSchedule": (
+        MonthlyPhotoSchedule,
+        ["title", "date", "type", "description", "url", "start_date"],
+    ),
+}
+DATETIME_PREFIX = "\0dt:"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return f"{DATETIME_PREFIX}{value.isoformat()}"
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(DATETIME_PREFIX):
+        return datetime.fromisoformat(value.removeprefix(DATETIME_PREFIX))
+    return value
+
+
+def encode_schedule_list(schedule_list: list[Schedule]) -> Optional[list]:
+    """
+    [クラス名, [属性値, ...]] のリストに変換する
+    未対応のクラスが含まれる場合はNone
+    """
+    record_list = []
+    for schedule in schedule_list:
+        name = type(schedule).__name__
+        if name not in SCHEDULE_FIELD_DICT:
+            return None
+        _, field_list = SCHEDULE_FIELD_DICT[name]
+        values = [_encode_value(getattr(schedule, f)) for f in field_list]
+        record_list.append([name, values])
+    return record_list
+
+
+def decode_schedule_list(record_list: list) -> list[Schedule]:
+    schedule_list = []
+    for name, values in record_list:
+        schedule_cls, field_list = SCHEDULE_FIELD_DICT[name]
+        kwargs = {f: _decode_value(v) for f, v in zip(field_list, values)}
+        schedule_list.append(schedule_cls(**kwargs))
+    return schedule_list
+
+
+class ParseCache:
+    """
+    記事の内容のハッシュをキーにParserの結果を保持する
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self.state_file = get_state_file("parse_cache.json", cache_dir)
+        entry_dict: Any = self.state_file.load()
+        if not isinstance(entry_dict, dict):
+            entry_dict = {}
+        self.entry_dict: dict[str, dict] = entry_dict
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, parser_cls: type, schedule: Schedule) -> str:
+        # 正規化は決定的なので正規化前の値でハッシュを取り、ヒット時は正規化も省く
+        # Parserは年の補完に現在の年を使うのでキーに含める
+        version = getattr(parser_cls, "VERSION", 0)
+        date_str = schedule.get_date_str()
+        content = "\0".join([schedule.title, date_str, schedule.type])
+        content += "\0" + schedule.description
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        now_year = datetime.now().year
+        return f"{parser_cls.__name__}:{version}:{now_year}:{digest}"
+
+    def get(self, key: str) -> Optional[list[Schedule]]:
+        with self._lock:
+            entry = self.entry_dict.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["t"] = time.time()
+        return decode_schedule_list(entry["v"])
+
+    def set(self, key: str, schedule_list: list[Schedule]) -> None:
+        record_list = encode_schedule_list(schedule_list)
+        if record_list is None:
+            return None
+        with self._lock:
+            self.entry_dict[key] = {"t": time.time(), "v": record_list}
+
+    def save(self) -> None:
+        with self._lock:
+            if len(self.entry_dict) > self.max_entries:
+                key_list = sorted(
+                    self.entry_dict, key=lambda k: self.entry_dict[k]["t"]
+                )
+                for key in key_list[: len(key_list) - self.max_entries]:
+                    del self.entry_dict[key]
+            self.state_file.save(self.entry_dict)
+
+
+@span("parse.news")
+def cached_parse(
+    cache: Optional[ParseCache], parser_cls: Any, schedule: Schedule, **kwargs: Any
+) -> list:
+    """
+    キャッシュがあればそれを返し、無ければparser_cls(schedule).parse()を実行する
+    """
+    if cache is None:
+        return parser_cls(schedule).parse(**kwargs)
+    # Parserは生成時にscheduleを書き換えるので先にキーを作る
+    key = cache.make_key(parser_cls, schedule)
+    schedule_list = cache.get(key)
+    if schedule_list is not None:
+        return schedule_list
+    schedule_list = parser_cls(schedule).parse(**kwargs)
+    cache.set(key, schedule_list)
+    return schedule_list
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional, Sequence, TypeVar, Union
+
+from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.keyword_matcher import KeywordMatcher
+from opime_notify.fetch_schedule.monthly_photo_parser import (
+    MonthlyPhotoSchedule,
+    filter_mpschedule_list,
+)
+from opime_notify.fetch_schedule.otsale_parser import (
+    OTSaleSchedule,
+    filter_otsale_schedule_list,
+)
+from opime_notify.fetch_schedule.theater_parser import (
+    TheaterSchedule,
+    filter_theater_schedule_list,
+)
+from opime_notify.metrics import ITEMS
+from opime_notify.profiling import span
+from opime_notify.schedule import NotifySchedule
+
+NewsSchedule = Union[TheaterSchedule, OTSaleSchedule, MonthlyPhotoSchedule]
+T = TypeVar("T")
+
+# 取得 -> 解析 -> 絞り込み -> 通知の各段をジェネレーターで繋ぎ、1件ずつ流す
+# 取得は OfficialSession.iter_schedule_detail が一定数しか先読みしないので、
+# 後段の処理が遅ければ取得も待つ
+
+
+def filter_news_schedule(
+    schedule_iter: Iterable[Schedule],
+    keywords: Union[list[str], KeywordMatcher, None] = None,
+    start_date: Optional[datetime] = None,
+) -> Iterator[NewsSchedule]:
+    """
+    劇場公演はキーワードと日付、それ以外は日付で絞り込む
+    """
+    matcher = keywords
+    if not isinstance(matcher, KeywordMatcher):
+        matcher = KeywordMatcher(matcher or [])
+    for schedule in schedule_iter:
+        # 後段の処理時間を含めないように、絞り込んでから渡す
+        with span("filter"):
+            target_list = _filter_one(schedule, matcher, start_date)
+        ITEMS.inc(stage="parsed")
+        ITEMS.inc(len(target_list), stage="filtered")
+        yield from target_list
+
+
+def _filter_one(
+    schedule: Schedule, matcher: KeywordMatcher, start_date: Optional[datetime]
+) -> Sequence[NewsSchedule]:
+    if isinstance(schedule, TheaterSchedule):
+        return filter_theater_schedule_list(
+            [schedule], keywords=matcher, start_date=start_date
+        )
+    elif isinstance(schedule, OTSaleSchedule):
+        return filter_otsale_schedule_list([schedule], start_date=start_date)
+    elif isinstance(schedule, MonthlyPhotoSchedule):
+        return filter_mpschedule_list([schedule], start_date=start_date)
+    return []
+
+
+def iter_notify_schedule(
+    schedule_iter: Iterable[NewsSchedule],
+) -> Iterator[NotifySchedule]:
+    for schedule in schedule_iter:
+        yield from schedule.get_notify_schedule_list()
+
+
+def tap(item_iter: Iterable[T], func: Callable[[T], None]) -> Iterator[T]:
+    """
+    流れている値をそのまま渡しつつfuncを呼ぶ、途中経過の表示用
+    """
+    for item in item_iter:
+        func(item)
+        yield item
+
+
+def take_until(item_iter: Iterable[T], stop: Callable[[], bool]) -> Iterator[T]:
+    """
+    次の値を渡す前にstopを確認し、Trueなら残りは流さない
+    """
+    for item in item_iter:
+        if stop():
+            return
+        yield item
@@ -1,24 +1,114 @@
+import logging
 import re
+import unicodedata
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, TypedDict, Union
+from typing import Any, Callable, Iterable, Iterator, Optional, TypedDict, Union
 
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from bs4.element import NavigableString, Tag
 
 from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.monthly_photo_parser import (
+    MonthlyPhotoParser,
+    schedule_to_monthly_photo_schedule,
+)
+from opime_notify.fetch_schedule.news_extractor import (
+    extract_news_detail,
+    extract_news_url_list,
+    parse_news_date,
+)
+from opime_notify.fetch_schedule.otsale_parser import (
+    OTSaleNewsParser,
+    schedule_to_otsale_schedule,
+)
+from opime_notify.fetch_schedule.parse_cache import ParseCache, cached_parse
 from opime_notify.fetch_schedule.theater_parser import (
     TheaterNewsParser,
     TheaterSchedule,
     schedule_to_theater_schedule,
 )
+from opime_notify.fingerprint import fingerprint_body
+from opime_notify.http_cache import HttpCache
+from opime_notify.http_client import HttpClient, get_default_client
+from opime_notify.metrics import ITEMS
+from opime_notify.profiling import span
+
+EXTRACTOR_LIST = ["soup", "stream"]
+# lxmlは依存関係に含めていないので、別途インストールして指定した時だけ使う
+HTML_PARSER_LIST = ["html.parser", "lxml"]
+NEWS_BODY_STRAINER = SoupStrainer("div", class_="news-block-inner")
+# タイトルに含まれる文字列で記事を振り分ける (キーワード, Parser, 変換関数)
+NEWS_PARSER_LIST: list[tuple[str, Any, Callable[[Schedule], Schedule]]] = [
+    ("劇場公演スケジュール", TheaterNewsParser, schedule_to_theater_schedule),
+    ("オンラインおしゃべり会", OTSaleNewsParser, schedule_to_otsale_schedule),
+    ("個別生写真", MonthlyPhotoParser, schedule_to_monthly_photo_schedule),
+]
+
+logger = logging.getLogger(__name__)
+
+
+def release_tree(el: Union[Tag, NavigableString, None]) -> None:
+    """
+    抽出後のツリーを破棄し、循環参照を切ってすぐに解放されるようにする
+    """
+    if not isinstance(el, Tag):
+        return None
+    root = el
+    while root.parent is not None:
+        root = root.parent
+    for child in list(root.contents):
+        if isinstance(child, Tag):
+            child.decompose()
+
+
+def get_news_parser(
+    schedule: Schedule,
+) -> Optional[tuple[Any, Callable[[Schedule], Schedule]]]:
+    """
+    記事のタイトルから対応するParserと変換関数を返す
+    """
+    title = unicodedata.normalize("NFKC", schedule.title).replace(" ", "")
+    for keyword, parser_cls, convert in NEWS_PARSER_LIST:
+        if keyword in title:
+            return (parser_cls, convert)
+    return None
 
 
 class OfficialSession:
     NEWS_URL = "https://ngt48.jp/news"
+    ALL_CATEGORY = 0
+    THEATER_CATEGORY = 1
+    CATEGORY_DICT = {"all": ALL_CATEGORY, "theater": THEATER_CATEGORY}
+
+    def __init__(
+        self,
+        client: Optional[HttpClient] = None,
+        max_workers: int = 4,
+        cache: Optional[HttpCache] = None,
+        html_parser: str = "html.parser",
+        extractor: str = "soup",
+        parse_cache: Optional[ParseCache] = None,
+    ):
+        if client is None:
+            client = get_default_client()
+        if html_parser not in HTML_PARSER_LIST:
+            raise ValueError(f"unknown html parser {html_parser}")
+        self.client = client
+        self.html_parser = html_parser
+        if extractor not in EXTRACTOR_LIST:
+            raise ValueError(f"unknown extractor {extractor}")
+        # soup: BeautifulSoup, stream: DOMを作らないHTMLParser
+        self.extractor = extractor
+        self.parse_cache = parse_cache
+        self.max_workers = max_workers
+        # 公開済みの記事は基本的に変わらないので詳細ページのみキャッシュする
+        self.cache = cache
 
     def _find_news_body(self, htmltext: str) -> Union[Tag, NavigableString, None]:
-        soup = BeautifulSoup(htmltext, "html.parser")
+        # news-block-inner以外は木を作らない
+        soup = BeautifulSoup(htmltext, self.html_parser, parse_only=NEWS_BODY_STRAINER)
         news_body_el = soup.find("div", "news-block-inner")
         return news_body_el
 
@@ -36,33 +126,53 @@ class OfficialSession:
         return (tagname, title)
 
     def _parse_datetime(self, date_el: Tag) -> Optional[datetime]:
-        _datestr = date_el.text.strip()
-        pattern = r"\d{4}\.\d{2}\.\d{2}"
-        mobj = re.match(pattern, _datestr)
-        if mobj is None:
-            return None
-        datestr = mobj.group(0)
-        datetime_pattern = "%Y.%m.%d"
-        return datetime.strptime(datestr, datetime_pattern)
+        return parse_news_date(date_el.text)
+
+    def _get_link_pattern(self) -> re.Pattern[str]:
+        return re.compile(f"{self.NEWS_URL}/detail/*")
 
     def fetch_schedule_list(
         self, page: int = 1, category: int = 0, verbose: bool = False
     ) -> list[Union[Tag, NavigableString, None]]:
-        url = f"{self.NEWS_URL}/articles/{page}/0/{category}"
-        res = requests.get(url)
-        res.raise_for_status()
-        news_body_el = self._find_news_body(res.text)
+        htmltext = self._fetch_list_text(page=page, category=category)
+        news_body_el = self._find_news_body(htmltext)
         if not isinstance(news_body_el, Tag):
             return []
-        news_list_el = news_body_el("a", href=re.compile(f"{self.NEWS_URL}/detail/*"))
+        news_list_el = news_body_el("a", href=self._get_link_pattern())
         return news_list_el
 
+    def _fetch_list_text(self, page: int = 1, category: int = 0) -> str:
+        url = f"{self.NEWS_URL}/articles/{page}/0/{category}"
+        res = self.client.get(url)
+        res.raise_for_status()
+        return res.text
+
     def fetch_schedule_detail(
         self, url: str, verbose: bool = False
     ) -> Optional[Schedule]:
-        res = requests.get(url)
-        res.raise_for_status()
-        news_body_el = self._find_news_body(res.text)
+        if self.cache is not None:
+            htmltext = self.cache.fetch_text(self.client, url)
+        else:
+            res = self.client.get(url)
+            res.raise_for_status()
+            htmltext = res.text
+        ITEMS.inc(stage="fetched")
+        with span("parse.html"):
+            if self.extractor == "stream":
+                schedule = extract_news_detail(htmltext)
+            else:
+                news_body_el = self._find_news_body(htmltext)
+                try:
+                    schedule = self._parse_news_body(news_body_el)
+                finally:
+                    release_tree(news_body_el)
+        if verbose and schedule is not None:
+            print(f"{schedule.title=}, {schedule.date=}, {schedule.type=}")
+        return schedule
+
+    def _parse_news_body(
+        self, news_body_el: Union[Tag, NavigableString, None]
+    ) -> Optional[Schedule]:
         if not isinstance(news_body_el, Tag):
             return None
         title_el = news_body_el.find("div", "title")
@@ -77,30 +187,116 @@ class OfficialSession:
         body_text = ""
         if isinstance(body_el, Tag):
             body_text = body_el.text.strip()
-        if verbose:
-            print(f"{title=}, {date=}, {tagname=}")
         return Schedule(title=title, date=date, type=tagname, description=body_text)
 
+    def iter_schedule_detail(
+        self, url_list: Iterable[str], verbose: bool = False
+    ) -> Iterator[Optional[Schedule]]:
+        """
+        詳細ページを並列に取得し、url_listの順番で返す
+        呼び出し側で処理している間も次のページの取得を進める
+        """
+        if self.max_workers <= 1:
+            for url in url_list:
+                yield self.fetch_schedule_detail(url, verbose=verbose)
+            return
+        url_iter = iter(url_list)
+        future_queue: deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            def submit_next() -> None:
+                url = next(url_iter, None)
+                if url is not None:
+                    future = executor.submit(self.fetch_schedule_detail, url, verbose)
+                    future_queue.append(future)
+
+            try:
+                # 先読みは一定数に留める
+                for _ in range(self.max_workers * 2):
+                    submit_next()
+                while len(future_queue) > 0:
+                    schedule = future_queue.popleft().result()
+                    submit_next()
+                    yield schedule
+            finally:
+                for future in future_queue:
+                    future.cancel()
+
+    def get_detail_url_list(
+        self, news_list_el: list[Union[Tag, NavigableString, None]]
+    ) -> list[str]:
+        url_list = []
+        for news_el in news_list_el:
+            if not isinstance(news_el, Tag):
+                continue
+            url = news_el.attrs.get("href", None)
+            if isinstance(url, str):
+                url_list.append(url)
+        return url_list
+
+    def fetch_detail_url_list(
+        self, page: int = 1, category: int = 0, verbose: bool = False
+    ) -> list[str]:
+        if self.extractor == "stream":
+            htmltext = self._fetch_list_text(page=page, category=category)
+            return extract_news_url_list(htmltext, self._get_link_pattern())
+        news_list_el = self.fetch_schedule_list(
+            page=page, category=category, verbose=verbose
+        )
+        url_list = self.get_detail_url_list(news_list_el)
+        if len(news_list_el) > 0:
+            release_tree(news_list_el[0])
+        return url_list
+
     def fetch_schedule_theater(
         self,
         page: int = 1,
         verbose: bool = False,
     ) -> list[TheaterSchedule]:
-        news_list_el = self.fetch_schedule_list(page=page, category=1, verbose=verbose)
-        theater_schedule_list = []
-        for news_el in news_list_el:
-            if not isinstance(news_el, Tag):
+        url_list = self.fetch_detail_url_list(
+            page=page, category=self.THEATER_CATEGORY, verbose=verbose
+        )
+        return self.fetch_schedule_theater_detail(url_list, verbose=verbose)
+
+    def fetch_schedule_theater_detail(
+        self, url_list: list[str], verbose: bool = False
+    ) -> list[TheaterSchedule]:
+        return list(self.iter_schedule_theater_detail(url_list, verbose=verbose))
+
+    def iter_schedule_theater_detail(
+        self, url_list: list[str], verbose: bool = False
+    ) -> Iterator[TheaterSchedule]:
+        for schedule in self.iter_schedule_detail(url_list, verbose=verbose):
+            if schedule is None:
                 continue
-            url = news_el.attrs.get("href", None)
-            if isinstance(url, str):
-                schedule = self.fetch_schedule_detail(url, verbose=verbose)
-                if schedule is None:
-                    continue
-                _schedule = schedule_to_theater_schedule(schedule)
-                parser = TheaterNewsParser(_schedule)
-                theater_schedule = parser.parse(verbose=verbose)
-                theater_schedule_list += theater_schedule
-        return theater_schedule_list
+            _schedule = schedule_to_theater_schedule(schedule)
+            yield from cached_parse(
+                self.parse_cache, TheaterNewsParser, _schedule, verbose=verbose
+            )
+
+    def fetch_news_schedule_detail(
+        self, url_list: list[str], verbose: bool = False
+    ) -> list[Schedule]:
+        return list(self.iter_news_schedule_detail(url_list, verbose=verbose))
+
+    def iter_news_schedule_detail(
+        self, url_list: Iterable[str], verbose: bool = False
+    ) -> Iterator[Schedule]:
+        """
+        記事毎に対応するParserで解析し、解析できたものから順に返す
+        """
+        for schedule in self.iter_schedule_detail(url_list, verbose=verbose):
+            if schedule is None:
+                continue
+            news_parser = get_news_parser(schedule)
+            if news_parser is None:
+                if verbose:
+                    print(f"skip {schedule.title=}")
+                continue
+            parser_cls, convert = news_parser
+            yield from cached_parse(
+                self.parse_cache, parser_cls, convert(schedule), verbose=verbose
+            )
 
 
 class TagDict(TypedDict):
@@ -114,13 +310,20 @@ class ShopSession:
     BASE_URL = "https://official-goods-store.jp/ngt48/"
     TAGLIST_URL = f"{BASE_URL}api/tag/lists.json?shop_id=279"
 
+    def __init__(self, client: Optional[HttpClient] = None):
+        if client is None:
+            client = get_default_client()
+        self.client = client
+        self.fingerprint: Optional[str] = None
+
     def fetch_tag_list(self) -> list[TagDict]:
         """
         news記事のようなものが無くなってしまったのでタグ一覧で新商品を推測する
         """
         url = self.TAGLIST_URL
-        res = requests.get(url)
+        res = self.client.get(url)
         res.raise_for_status()
+        self.fingerprint = fingerprint_body(res.content)
         resdict = res.json()
         taglist: list[TagDict] = resdict.get("tags", [])
         return taglist
@@ -133,13 +336,19 @@ class CDShopSession:
     BASE_URL = "https://ngt48cd.shop/"
     NEWS_URL = f"{BASE_URL}api/v1/news?group_id=5"
 
+    def __init__(self, client: Optional[HttpClient] = None):
+        if client is None:
+            client = get_default_client()
+        self.client = client
+        self.fingerprint: Optional[str] = None
+
     def fetch_article_list(self) -> list:
         url = self.NEWS_URL
-        res = requests.get(url)
+        res = self.client.get(url)
         res.raise_for_status()
+        self.fingerprint = fingerprint_body(res.content)
         resdict = res.json()
         if isinstance(resdict, list):
             return resdict
-        print("fetch error")
-        print(resdict)
+        logger.warning("fetch error %r", resdict)
         return []
@@ -1,10 +1,29 @@
+import logging
 import re
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 
 from opime_notify.fetch_schedule import Parser, Schedule
+from opime_notify.fetch_schedule.dateparse import parse_jp_datetime, parse_time
+from opime_notify.fetch_schedule.keyword_matcher import KeywordMatcher
 from opime_notify.schedule import NotifySchedule
 
+OFFER_KEYWORD = "申込期間"
+SCHEDULE_END_KEYWORD = "【チケット申込について】"
+DATE_SEPARATOR = "●"
+CLOSED_KEYWORD = "休館日"
+DAY = "昼公演"
+NIGHT = "夜公演"
+OFFER_PATTERN = re.compile(
+    r"(\d{4}年\d+月\d+日\(.\)\d{2}:\d{2})~(\d+月\d+日\(.\)\d{2}:\d{2})まで"
+)
+RESULT_PATTERN = re.compile(r"当落発表[は:](\d+月\d+日\(.\)\d{2}:\d{2})まで")
+DATE_PATTERN = re.compile(r"\d+月\d+日")
+NEW_DATE_PATTERN = re.compile(r"\d+月\d+日\(.\)(\d+:\d+)")
+TIME_PATTERN = re.compile(r"\d+:\d+")
+
+logger = logging.getLogger(__name__)
+
 
 class TheaterSchedule(Schedule):
     def __init__(
@@ -105,7 +124,65 @@ def schedule_to_theater_schedule(schedule: Schedule) -> TheaterSchedule:
     )
 
 
+class TheaterSection:
+    """
+    空行で区切られた1公演分の行を分類して値を保持する
+    """
+
+    def __init__(self):
+        self.title = ""
+        self.suffix = ""
+        self.description = ""
+        # 開演時刻は後から出てきたものを使う
+        self.time_list: list[str] = []
+        self.empty = True
+
+    def feed(self, line: str) -> None:
+        self.empty = False
+        new_date_match = NEW_DATE_PATTERN.search(line)
+        if new_date_match:
+            self.time_list.append(new_date_match.group(1))
+        elif DAY in line or NIGHT in line:
+            self.suffix = DAY if DAY in line else NIGHT
+            m = TIME_PATTERN.search(line)
+            if m is not None:
+                self.time_list.append(m.group(0))
+        elif "演目" in line:
+            self.title = line.split(":")[-1]
+        elif "出演メンバー" in line or self.description != "":
+            self.description += line
+
+
+class TheaterDateBlock:
+    """
+    ●で区切られた1日分の行を保持する
+    日付は最初に見つかったもの、休館日を含む場合は公演無し
+    """
+
+    def __init__(self):
+        self.closed = False
+        self.date_str: Optional[str] = None
+        self.section_list = [TheaterSection()]
+
+    def feed(self, line: str) -> None:
+        if line == "":
+            if not self.section_list[-1].empty:
+                self.section_list.append(TheaterSection())
+            return None
+        if CLOSED_KEYWORD in line:
+            self.closed = True
+        if self.date_str is None:
+            m = DATE_PATTERN.search(line)
+            if m is not None:
+                self.date_str = m.group(0)
+        if not self.closed:
+            self.section_list[-1].feed(line)
+
+
 class TheaterNewsParser(Parser):
+    # 解析結果が変わる修正をした場合は上げる(ParseCacheのキーに使う)
+    VERSION = 1
+
     def __init__(self, schedule: TheaterSchedule):
         self.schedule = schedule
         self.schedule.title = self._text_normalize(schedule.title)
@@ -129,7 +206,7 @@ class TheaterNewsParser(Parser):
                     if self.schedule.date is not None:
                         self.schedule.date = self.schedule.date.replace(year=year)
                 except ValueError as error:
-                    print(f"WARNING {error=}")
+                    logger.warning("invalid year %r", error)
                 type = "normal"
                 break
         return type
@@ -142,112 +219,86 @@ class TheaterNewsParser(Parser):
         return []
 
     def parse_normal(self) -> list[TheaterSchedule]:
-        body_str = self.schedule.description
-        self.parse_offer_date(body_str)
-        under_keyword = "【チケット申込について】"
-        body_str = body_str.split(under_keyword)[0]
-        date_separator = "●"
-        body_date_list = body_str.split(date_separator)
+        # 本文を1行ずつ1回だけ走査し、●毎の日付ブロックと申込期間の行を集める
+        block_list = [TheaterDateBlock()]
+        offer_line_list: list[str] = []
+        offer_open = True
+        in_schedule = True
+        for line in self.schedule.description.split("\n"):
+            # 申込期間 -> 空行まで、複数ある場合は最後のもの
+            if OFFER_KEYWORD in line:
+                offer_line_list = [line.rsplit(OFFER_KEYWORD, 1)[1]]
+                offer_open = True
+            elif offer_open:
+                if line == "" and len(offer_line_list) > 0:
+                    offer_open = False
+                else:
+                    offer_line_list.append(line)
+            if not in_schedule:
+                continue
+            if SCHEDULE_END_KEYWORD in line:
+                line = line.split(SCHEDULE_END_KEYWORD, 1)[0]
+                in_schedule = False
+            if DATE_SEPARATOR not in line:
+                block_list[-1].feed(line)
+                continue
+            part_list = line.split(DATE_SEPARATOR)
+            block_list[-1].feed(part_list[0])
+            for part in part_list[1:]:
+                block_list.append(TheaterDateBlock())
+                block_list[-1].feed(part)
+        self.parse_offer_date("\n".join(offer_line_list))
         schedule_list = []
-        for body_onedate in body_date_list:
-            schedule_list += self.parse_body_onedate(body_onedate)
+        for block in block_list:
+            schedule_list += self._build_block_schedule_list(block)
         return schedule_list
 
     def parse_offer_date(self, text: str) -> None:
-        # 申込み期間 -> 空行まで
-        over_keyword = "申込期間"
-        text = text.split(over_keyword)[-1]
-        under_keyword = "\n\n"
-        text = text.split(under_keyword)[0]
-        offer_pattern = r"(\d{4}年\d+月\d+日\(.\)\d{2}:\d{2})~(\d+月\d+日\(.\)\d{2}:\d{2})まで"
-        result_pattern = r"当落発表[は:](\d+月\d+日\(.\)\d{2}:\d{2})まで"
         now_year = datetime.now().year
-        moffer = re.search(offer_pattern, text)
+        moffer = OFFER_PATTERN.search(text)
         if moffer:
-            offer_start_str = self._trim_week_str(moffer.group(1))
-            offer_end_str = self._trim_week_str(moffer.group(2))
-            self.offer_start = datetime.strptime(offer_start_str, "%Y年%m月%d日%H:%M")
-            self.offer_end = datetime.strptime(offer_end_str, "%m月%d日%H:%M")
-            self.offer_end = self.offer_end.replace(year=now_year)
+            self.offer_start = parse_jp_datetime(moffer.group(1))
+            self.offer_end = parse_jp_datetime(moffer.group(2), year=now_year)
 
-        mresult = re.search(result_pattern, text)
+        mresult = RESULT_PATTERN.search(text)
         if mresult:
-            result_date_str = self._trim_week_str(mresult.group(1))
-            self.result_date = datetime.strptime(result_date_str, "%m月%d日%H:%M")
-            self.result_date = self.result_date.replace(year=now_year)
+            self.result_date = parse_jp_datetime(mresult.group(1), year=now_year)
 
-    def parse_body_onedate(self, onedate_text: str) -> list[TheaterSchedule]:
-        closed_keyword = "休館日"
-        if closed_keyword in onedate_text:
-            return []
-        # 先頭行は日付であるとする
-        date_pattern = r"\d+月\d+日"
-        date_format = "%m月%d日"
-        m = re.search(date_pattern, onedate_text)
-        if m is None:
+    def _build_block_schedule_list(
+        self, block: TheaterDateBlock
+    ) -> list[TheaterSchedule]:
+        if block.closed or block.date_str is None:
             return []
-        date_str = m.group(0)
-        onedate = datetime.strptime(date_str, date_format)
         _date = self.schedule.date
         year = datetime.now().year
         if isinstance(_date, datetime):
             year = _date.year
-        onedate = onedate.replace(year=year)
-        sections = onedate_text.split("\n\n")
+        onedate = parse_jp_datetime(block.date_str, year=year)
         schedule_list = []
-        for section in sections:
-            schedule = self.parse_section_onedate(section, onedate)
+        for section in block.section_list:
+            schedule = self._build_section_schedule(section, onedate)
             if schedule is None:
                 continue
             schedule_list.append(schedule)
         return schedule_list
 
-    def parse_section_onedate(  # noqa: C901
-        self, section_text: str, onedate: datetime
+    def _build_section_schedule(
+        self, section: TheaterSection, onedate: datetime
     ) -> Optional[TheaterSchedule]:
-        section_lines = section_text.split("\n")
-        title = ""
         date = onedate
-        type = "theater"
-        description = ""
-        suffix = ""
-        DAY = "昼公演"
-        NIGHT = "夜公演"
-        for line in section_lines:
-            new_date_pattern = r"\d+月\d+日\(.\)(\d+:\d+)"
-            new_date_format = "%H:%M"
-            new_date_match = re.search(new_date_pattern, line)
-            if new_date_match:
-                date_str = new_date_match.group(1)
-                open_date = datetime.strptime(date_str, new_date_format)
-                date = date.replace(hour=open_date.hour, minute=open_date.minute)
-            elif DAY in line or NIGHT in line:
-                if DAY in line:
-                    suffix = DAY
-                elif NIGHT in line:
-                    suffix = NIGHT
-                pattern = r"\d+:\d+"
-                date_format = "%H:%M"
-                m = re.search(pattern, line)
-                if m is None:
-                    continue
-                date_str = m.group(0)
-                open_date = datetime.strptime(date_str, date_format)
-                date = date.replace(hour=open_date.hour, minute=open_date.minute)
-            elif "演目" in line:
-                separator = ":"
-                title = line.split(separator)[-1]
-            elif "出演メンバー" in line or description != "":
-                description += line
+        for time_str in section.time_list:
+            hour, minute = parse_time(time_str)
+            date = date.replace(hour=hour, minute=minute)
+        title = section.title
         if title == "" or date == onedate:
             return None
-        if suffix != "":
-            title = f"{title}【{suffix}】"
+        if section.suffix != "":
+            title = f"{title}【{section.suffix}】"
         return TheaterSchedule(
             title=title,
             date=date,
-            type=type,
-            description=description,
+            type="theater",
+            description=section.description,
             offer_start_date=self.offer_start,
             offer_end_date=self.offer_end,
             result_date=self.result_date,
@@ -256,20 +307,23 @@ class TheaterNewsParser(Parser):
 
 def filter_theater_schedule_list(
     theater_schedule_list: list[TheaterSchedule],
-    keywords: Optional[list[str]] = None,
+    keywords: Union[list[str], KeywordMatcher, None] = None,
     start_date: Optional[datetime] = None,
 ) -> list[TheaterSchedule]:
+    """
+    タイトルか出演メンバーにいずれかのキーワードを含む公演を返す
+    複数のキーワードに一致しても1度だけ返す
+    """
     if keywords is None:
         keywords = []
+    matcher = keywords
+    if not isinstance(matcher, KeywordMatcher):
+        matcher = KeywordMatcher(matcher)
     _theater_schedule_list = []
     for theater_schedule in theater_schedule_list:
         if start_date is not None and theater_schedule.date is not None:
             if theater_schedule.date < start_date:
                 continue
-        for keyword in keywords:
-            if (
-                keyword in theater_schedule.description
-                or keyword in theater_schedule.title
-            ):
-                _theater_schedule_list.append(theater_schedule)
+        if matcher.search(theater_schedule.description, theater_schedule.title):
+            _theater_schedule_list.append(theater_schedule)
     return _theater_schedule_list
@@ -0,0 +1,42 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Optional
+
+from opime_notify.cache import get_state_file
+
+FingerprintDict = dict[str, str]
+
+
+def fingerprint_body(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def fingerprint_projection(
+    items: Iterable[Mapping[str, Any]], keys: Iterable[str]
+) -> str:
+    """
+    必要なキーだけを取り出して正規化したJSONのハッシュ
+    """
+    _keys = list(keys)
+    projection = [[item.get(key) for key in _keys] for item in items]
+    text = json.dumps(projection, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.state_file = get_state_file("fingerprint.json", cache_dir)
+        data: Any = self.state_file.load()
+        if not isinstance(data, dict):
+            data = {}
+        self.fingerprint_dict: dict[str, FingerprintDict] = data
+
+    def get(self, key: str) -> FingerprintDict:
+        return self.fingerprint_dict.get(key, {})
+
+    def set(self, key: str, fingerprint: FingerprintDict) -> None:
+        self.fingerprint_dict[key] = fingerprint
+
+    def save(self) -> None:
+        self.state_file.save(self.fingerprint_dict)
@@ -1,12 +1,42 @@
+import threading
+import time
 from pathlib import Path
 
 import gspread
-from gspread.exceptions import WorksheetNotFound
+from gspread.exceptions import APIError, WorksheetNotFound
 from gspread.utils import rowcol_to_a1
 from oauth2client.service_account import ServiceAccountCredentials
 
+from opime_notify.circuit_breaker import get_circuit_breaker
+from opime_notify.metrics import observe_sheet_call
+from opime_notify.profiling import span
 from opime_notify.schedule import NotifySchedule
 
+SHEETS_HOST = "sheets.googleapis.com"
+# (connect timeout, read timeout)
+SHEET_TIMEOUT = (5.0, 60.0)
+
+
+def _is_sheet_failure(error: Exception) -> bool:
+    # 権限やシート名の誤りはSheetsが応答しているので失敗に数えない
+    if isinstance(error, APIError):
+        return error.response.status_code >= 500
+    return True
+
+
+class GuardedClient(gspread.Client):
+    """
+    Sheetsへのリクエスト毎に回路遮断器を通し、回数と時間を記録する
+    """
+
+    def request(self, method, *args, **kwargs):
+        with get_circuit_breaker(SHEETS_HOST).guard(_is_sheet_failure):
+            start = time.perf_counter()
+            try:
+                return super().request(method, *args, **kwargs)
+            finally:
+                observe_sheet_call(method, time.perf_counter() - start)
+
 
 class GsheetSession:
     def __init__(
@@ -17,17 +47,31 @@ class GsheetSession:
         sheet = self.get_spreadsheets_obj()
         self.sheet = sheet
         self.sheet_name = sheet_name
+        self._lock_dict: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def lock(self, sheet_name: str = "") -> threading.Lock:
+        """
+        同じシートの読み込みから書き込みまでが他の処理と重ならないようにするロック
+        """
+        if sheet_name == "":
+            sheet_name = self.sheet_name
+        with self._lock:
+            return self._lock_dict.setdefault(sheet_name, threading.Lock())
 
+    @span("sheet.auth")
     def get_spreadsheets_obj(self):
         scope = [
             "https://spreadsheets.google.com/feeds",
             "https://www.googleapis.com/auth/drive",
         ]
         cred = ServiceAccountCredentials.from_json_keyfile_name(self.json_key, scope)
-        gc = gspread.authorize(cred)
+        gc = gspread.authorize(cred, client_factory=GuardedClient)
+        gc.set_timeout(SHEET_TIMEOUT)
         worksheet = gc.open_by_key(self.sheet_id)
         return worksheet
 
+    @span("sheet.read")
     def read_all_schedule(self):
         wsheet = self.sheet.worksheet(self.sheet_name)
         all_values = wsheet.get_all_records()
@@ -46,6 +90,7 @@ class GsheetSession:
 
         return schedule_list
 
+    @span("sheet.read")
     def fetch_curr_article(self, sheet_name: str) -> list[dict]:
         headers = ["id", "title", "date"]
         try:
@@ -55,6 +100,7 @@ class GsheetSession:
         all_values = wsheet.get_all_records()
         return all_values
 
+    @span("sheet.read")
     def fetch_curr_tag(self, sheet_name: str) -> list[dict]:
         """
         for ShopSession
@@ -67,6 +113,7 @@ class GsheetSession:
         all_values = wsheet.get_all_records()
         return all_values
 
+    @span("sheet.write")
     def init_wsheet(
         self, sheet_name: str, headers: list[str], rows: int = 100, cols: int = 20
     ):
@@ -77,6 +124,7 @@ class GsheetSession:
         wsheet.update(range_str, [headers], value_input_option="USER_ENTERED")
         return wsheet
 
+    @span("sheet.read")
     def fetch_headers(self, sheet_name: str = "", wsheet=None) -> list[str]:
         if sheet_name == "":
             sheet_name = self.sheet_name
@@ -85,18 +133,40 @@ class GsheetSession:
         header = wsheet.row_values(1)
         return header
 
+    @span("sheet.write")
+    def write_headers(self, headers: list[str], sheet_name: str = "") -> None:
+        if sheet_name == "":
+            sheet_name = self.sheet_name
+        wsheet = self.sheet.worksheet(sheet_name)
+        end_range = rowcol_to_a1(1, len(headers))
+        range_str = f"A1:{end_range}"
+        wsheet.update(range_str, [headers], value_input_option="USER_ENTERED")
+
+    @span("sheet.write")
     def write_all_schedule(self, schedule_list: list[NotifySchedule]) -> None:
-        wsheet = self.sheet.worksheet(self.sheet_name)
-        header = self.fetch_headers(wsheet=wsheet)
+        """
+        重複を除いて並べ替え、2行目から1回のupdateでまとめて書き込む
+        """
+        header = self.fetch_headers()
         nodup_schedule_list = list(set(schedule_list))
         sorted_schedule_list = sorted(nodup_schedule_list)
-        for index, schedule in enumerate(sorted_schedule_list):
-            self.write_schedule(wsheet, schedule, index, header)
+        table = [self.schedule_row(s, header) for s in sorted_schedule_list]
+        self.write_table(table)
 
-    def write_schedule(
-        self, wsheet, schedule: NotifySchedule, index: int, header: list[str]
-    ) -> None:
-        # index 0 is row 2
+    @span("sheet.write")
+    def append_schedule_list(self, schedule_list: list[NotifySchedule]) -> None:
+        """
+        予定をシートの末尾に1回のappend_rowsでまとめて追加する
+        並び替えは次に全体を書き直す時に行う
+        """
+        if len(schedule_list) == 0:
+            return None
+        wsheet = self.sheet.worksheet(self.sheet_name)
+        header = self.fetch_headers(wsheet=wsheet)
+        table = [self.schedule_row(s, header) for s in schedule_list]
+        wsheet.append_rows(table, value_input_option="USER_ENTERED", table_range="A1")
+
+    def schedule_row(self, schedule: NotifySchedule, header: list[str]) -> list:
         row_value = []
         for key in header:
             if key == "id":
@@ -108,12 +178,9 @@ class GsheetSession:
             if key == "status" and value == "":
                 value = "BEFORE"
             row_value.append(value)
-        end_col = len(header)
-        row = index + 2
-        end_range = rowcol_to_a1(row, end_col)
-        range_str = f"A{row}:{end_range}"
-        wsheet.update(range_str, [row_value], value_input_option="USER_ENTERED")
+        return row_value
 
+    @span("sheet.write")
     def write_table(self, table: list[list[str]], sheet_name: str = "") -> None:
         if sheet_name == "":
             sheet_name = self.sheet_name
@@ -124,14 +191,18 @@ class GsheetSession:
         end_range_str = rowcol_to_a1(row_len, col_len)
         range_str = f"A2:{end_range_str}"
         wsheet = self.sheet.worksheet(sheet_name)
+        if wsheet.row_count < row_len:
+            wsheet.add_rows(row_len - wsheet.row_count)
         wsheet.update(range_str, table, value_input_option="USER_ENTERED")
 
+    @span("sheet.write")
     def clear_schedule(self, sheet_name: str = ""):
         if sheet_name == "":
             sheet_name = self.sheet_name
         wsheet = self.sheet.worksheet(sheet_name)
         header = self.fetch_headers(wsheet=wsheet)
         end_col = len(header)
-        end_range = rowcol_to_a1(100, end_col)
+        # 100行を超えて書き込まれていても全て消す
+        end_range = rowcol_to_a1(max(wsheet.row_count, 2), end_col)
         range_str = f"A2:{end_range}"
         wsheet.batch_clear([range_str])
@@ -0,0 +1,83 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+ARCHIVE_MODE_LIST = ["record", "replay"]
+# 本文は展開済みのものを保存するので転送時のヘッダーは残さない
+SKIP_HEADER_SET = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+class ArchiveMissError(requests.exceptions.ConnectionError):
+    """
+    再生時にアーカイブに無いリクエストが来た
+    """
+
+
+class HttpArchive:
+    """
+    リクエストとレスポンスをディレクトリに保存し、ネットワークを使わずに再生する
+    record: 実際に通信し、レスポンスを保存する
+    replay: 保存したレスポンスを返す、latencyで通信時間を模擬する
+    """
+
+    def __init__(self, directory: Path, mode: str = "replay", latency: float = 0.0):
+        if mode not in ARCHIVE_MODE_LIST:
+            raise ValueError(f"unknown archive mode {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+
+    @property
+    def is_replay(self) -> bool:
+        return self.mode == "replay"
+
+    def _get_path(self, method: str, url: str) -> Path:
+        key = hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json"
+
+    def record(self, method: str, url: str, res: requests.Response) -> None:
+        entry = {
+            "method": method,
+            "url": url,
+            "status": res.status_code,
+            "reason": res.reason,
+            "headers": {
+                k: v for k, v in res.headers.items() if k.lower() not in SKIP_HEADER_SET
+            },
+            "encoding": res.encoding,
+            "body": base64.b64encode(res.content).decode("ascii"),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            json.dump(entry, fp, ensure_ascii=False)
+        os.replace(tmp_name, self._get_path(method, url))
+
+    def replay(self, method: str, url: str) -> requests.Response:
+        path = self._get_path(method, url)
+        try:
+            with path.open("r", encoding="utf-8") as fp:
+                entry: dict[str, Any] = json.load(fp)
+        except FileNotFoundError:
+            raise ArchiveMissError(
+                f"{method} {url} is not in {self.directory}"
+            ) from None
+        if self.latency > 0:
+            time.sleep(self.latency)
+        res = requests.Response()
+        res.status_code = entry["status"]
+        res.reason = entry.get("reason") or ""
+        res.headers = CaseInsensitiveDict(entry["headers"])
+        res.encoding = entry["encoding"]
+        res.url = entry["url"]
+        res._content = base64.b64decode(entry["body"])
+        res.request = requests.Request(method, url).prepare()
+        return res
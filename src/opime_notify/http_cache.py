@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from opime_notify.cache import get_cache_dir
+from opime_notify.http_client import HttpClient
+
+
+class HttpCache:
+    """
+    URLをキーにしたレスポンス本文のディスクキャッシュ
+    ttlを過ぎたものは再取得し、合計サイズがmax_bytesを超えたら古いものから消す
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        ttl: timedelta = timedelta(days=7),
+        max_bytes: int = 50 * 1024 * 1024,
+        revalidate: bool = False,
+    ):
+        if directory is None:
+            directory = get_cache_dir() / "http"
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json"
+
+    def load(self, url: str) -> Optional[dict[str, Any]]:
+        path = self._get_path(url)
+        try:
+            with path.open("r", encoding="utf-8") as fp:
+                entry = json.load(fp)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("url") != url:
+            return None
+        return entry
+
+    def store(self, url: str, entry: dict[str, Any]) -> None:
+        path = self._get_path(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            json.dump(entry, fp, ensure_ascii=False)
+        with self._lock:
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_name, path)
+            if self._size is not None:
+                self._size += path.stat().st_size - old_size
+        self.evict()
+
+    def is_fresh(self, entry: dict[str, Any], now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        return now - entry.get("fetched_at", 0) < self.ttl.total_seconds()
+
+    def fetch_text(self, client: HttpClient, url: str) -> str:
+        entry = self.load(url)
+        if entry is not None and self.is_fresh(entry):
+            # 詳細ページの並列取得で複数のスレッドから呼ばれる
+            with self._lock:
+                self.hits += 1
+            self._touch(url)
+            return entry["text"]
+        with self._lock:
+            self.misses += 1
+        headers = {}
+        if entry is not None and self.revalidate:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        res = client.get(url, headers=headers)
+        if res.status_code == 304 and entry is not None:
+            entry["fetched_at"] = time.time()
+            self.store(url, entry)
+            return entry["text"]
+        res.raise_for_status()
+        text = res.text
+        self.store(
+            url,
+            {
+                "url": url,
+                "fetched_at": time.time(),
+                "etag": res.headers.get("ETag"),
+                "last_modified": res.headers.get("Last-Modified"),
+                "text": text,
+            },
+        )
+        return text
+
+    def _touch(self, url: str) -> None:
+        # 最終利用日時としてmtimeを更新する
+        try:
+            os.utime(self._get_path(url))
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        with self._lock:
+            if self._size is not None and self._size <= self.max_bytes:
+                return
+            entry_list = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entry_list.append((stat.st_mtime, stat.st_size, path))
+            size = sum(e[1] for e in entry_list)
+            for _, entry_size, path in sorted(entry_list):
+                if size <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                size -= entry_size
+            self._size = size
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, NamedTuple, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from opime_notify.circuit_breaker import CircuitBreaker
+from opime_notify.deadline import clamp_timeout
+from opime_notify.http_archive import HttpArchive
+from opime_notify.metrics import observe_http
+
+# (connect timeout, read timeout)
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+TimeoutType = Union[float, tuple[float, float]]
+
+
+class RequestTiming(NamedTuple):
+    method: str
+    url: str
+    host: str
+    status: Optional[int]
+    elapsed: float
+
+
+class HttpClient:
+    """
+    全てのセッションで共有するHTTPクライアント
+    ホスト毎にコネクションを使い回し、同時接続数を制限する
+    応答しないホストには、続けて失敗したらしばらくリクエストを送らない
+    """
+
+    def __init__(
+        self,
+        timeout: TimeoutType = DEFAULT_TIMEOUT,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_maxsize: int = 10,
+        max_per_host: int = 4,
+        timing_size: int = 1000,
+        archive: Optional[HttpArchive] = None,
+        failure_threshold: int = 5,
+        cooldown: float = 60.0,
+    ):
+        self.timeout = timeout
+        self.archive = archive
+        self.max_per_host = max_per_host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timing_list: deque[RequestTiming] = deque(maxlen=timing_size)
+        self.listener_list: list[Callable[[RequestTiming], None]] = []
+        self._host_semaphore_dict: dict[str, threading.BoundedSemaphore] = {}
+        self._circuit_breaker_dict: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        # 実行の期限があれば残り時間までしか待たない
+        kwargs["timeout"] = clamp_timeout(kwargs.get("timeout", self.timeout))
+        host = urlsplit(url).netloc
+        breaker = self.get_circuit_breaker(host)
+        breaker.before_call()
+        with self._get_host_semaphore(host):
+            status: Optional[int] = None
+            start = time.perf_counter()
+            try:
+                if self.archive is not None and self.archive.is_replay:
+                    res = self.archive.replay(method, url)
+                else:
+                    res = self.session.request(method, url, **kwargs)
+                    if self.archive is not None:
+                        self.archive.record(method, url, res)
+                status = res.status_code
+                return res
+            finally:
+                elapsed = time.perf_counter() - start
+                # 応答が無いかサーバーエラーの場合だけ失敗として数える
+                if status is None or status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                self._record(RequestTiming(method, url, host, status, elapsed))
+
+    def add_listener(self, listener: Callable[[RequestTiming], None]) -> None:
+        """
+        リクエスト毎に計測結果を受け取る関数を登録する
+        """
+        self.listener_list.append(listener)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def get_circuit_breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._circuit_breaker_dict.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    host,
+                    failure_threshold=self.failure_threshold,
+                    cooldown=self.cooldown,
+                )
+                self._circuit_breaker_dict[host] = breaker
+            return breaker
+
+    def _get_host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._host_semaphore_dict.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._host_semaphore_dict[host] = semaphore
+            return semaphore
+
+    def _record(self, timing: RequestTiming) -> None:
+        self.timing_list.append(timing)
+        observe_http(timing)
+        for listener in self.listener_list:
+            listener(timing)
+
+
+_default_client: Optional[HttpClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> HttpClient:
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def set_default_client(client: Optional[HttpClient]) -> None:
+    """
+    各セッションが共有するクライアントを差し替える、Noneで初期化する
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
@@ -0,0 +1,69 @@
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Any, Optional
+
+LOGGER_NAME = "opime_notify"
+# LogRecordが元から持つ属性、これ以外はextraで渡された値としてJSONに含める
+_RECORD_ATTR_SET = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    1行1つのJSONにする、extraで渡した値はそのままキーになる
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTR_SET:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class StderrHandler(logging.StreamHandler):
+    """
+    書き出す時点のsys.stderrに書く、CliRunnerなどで差し替えられても追従する
+    """
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.stream = sys.stderr
+        super().emit(record)
+
+
+_handler: Optional[logging.Handler] = None
+
+
+def setup_logging(verbose: int = 0) -> logging.Logger:
+    """
+    opime_notifyのロガーをJSONでstderrに出すようにする
+    verboseが1以上ならDEBUG(一覧の中身など)も出す
+    何度呼んでもハンドラーは1つだけになる
+    """
+    global _handler
+    logger = logging.getLogger(LOGGER_NAME)
+    if _handler is not None:
+        logger.removeHandler(_handler)
+    _handler = StderrHandler()
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(logging.DEBUG if verbose > 0 else logging.INFO)
+    # rootに設定されたハンドラーで二重に出さない
+    logger.propagate = False
+    return logger
@@ -1,19 +1,47 @@
+import logging
+from datetime import timedelta
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
 
 import click
-from dotenv import load_dotenv
-from rich import print
 
-from opime_notify.gsheet import GsheetSession
-from opime_notify.notify import LineNotifiyer
-from opime_notify.realtime.cdshop_adapter import CDShopAdapter
-from opime_notify.realtime.mpadapter import MPAdapter
-from opime_notify.schedule import filter_notify_schedule, marge_result_schedule
+from opime_notify.circuit_breaker import CircuitOpenError
+from opime_notify.cli.options import (
+    EnvCommand,
+    archive_options,
+    deadline_options,
+    install_archive,
+    install_deadline,
+    install_logging,
+    install_metrics,
+    install_profiler,
+    log_options,
+    metrics_options,
+    profile_options,
+)
+from opime_notify.deadline import is_expired
+from opime_notify.fingerprint import FingerprintStore
+from opime_notify.metrics import ITEMS
+from opime_notify.profiling import span
+from opime_notify.realtime import BaseAdapter, BaseArticle
+from opime_notify.realtime.poll_scheduler import AdaptivePollScheduler
+from opime_notify.schedule import (
+    NotifySchedule,
+    filter_notify_schedule,
+    marge_result_schedule,
+)
+
+# gspread, linebot, bs4, requestsは読み込みが重いので使う処理の中でimportする
+# .envはコマンドの引数を読む前に読まれる
+if TYPE_CHECKING:
+    from opime_notify.gsheet import GsheetSession
+    from opime_notify.notify import LineNotifiyer
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 
-@click.command()
+@click.command(cls=EnvCommand)
 @click.option(
     "--line-access-token", help="line access token", envvar="LINE_ACCESS_TOKEN"
 )
@@ -24,28 +52,80 @@ load_dotenv()
     type=click.Path(),
     envvar="GOOGLE_JSON_KEY_FILE",
 )
-def cli(line_access_token, gsheet_id, google_json_key):
+@deadline_options
+@profile_options
+@metrics_options
+@log_options
+def cli(
+    line_access_token,
+    gsheet_id,
+    google_json_key,
+    deadline,
+    profile_path,
+    profile_cpu,
+    profile_memory,
+    metrics_file,
+    verbose,
+):
+    install_logging(verbose)
+    install_deadline(deadline)
+    install_profiler(profile_path, profile_cpu, profile_memory)
+    install_metrics(metrics_file)
+    from opime_notify.gsheet import GsheetSession
+
     json_key_file = Path(google_json_key).expanduser()
     gsession = GsheetSession(json_key_file, gsheet_id)
-    all_schedule = gsession.read_all_schedule()
-    print("all_schedule")
-    print(f"{all_schedule}")
-    notify_schedule_list = filter_notify_schedule(all_schedule)
-    if len(notify_schedule_list) == 0:
-        print("notify_schedule_list is empty")
-        return
-    print("notify_schedule_list")
-    print(f"{notify_schedule_list}")
-    line_notifiyer = LineNotifiyer(line_access_token)
-    result_list = line_notifiyer.notify_line_all(notify_schedule_list)
-    new_schedule_list = marge_result_schedule(all_schedule, result_list)
-    print("new_schedule_list")
-    print(f"{new_schedule_list}")
-    gsession.clear_schedule()
-    gsession.write_all_schedule(new_schedule_list)
-
-
-@click.command()
+
+    notify_due_schedule(gsession, lambda: _build_line_notifiyer(line_access_token))
+
+
+def _build_line_notifiyer(access_token: str, standin: bool = False) -> "LineNotifiyer":
+    if standin:
+        from opime_notify.standin import StandInLineNotifiyer
+
+        return StandInLineNotifiyer()
+    from opime_notify.notify import LineNotifiyer
+
+    return LineNotifiyer(access_token)
+
+
+def notify_due_schedule(
+    gsession: "GsheetSession", get_line_notifiyer: Callable[[], "LineNotifiyer"]
+) -> list[NotifySchedule]:
+    """
+    通知する時間になった予定を通知し、結果をシートに書き戻す
+    シートに残った予定を返す
+    """
+    with gsession.lock():
+        all_schedule = gsession.read_all_schedule()
+        logger.debug("all_schedule %r", all_schedule)
+        notify_schedule_list = filter_notify_schedule(all_schedule)
+        ITEMS.inc(len(notify_schedule_list), stage="due")
+        logger.info(
+            "due schedule",
+            extra={"count": len(notify_schedule_list), "total": len(all_schedule)},
+        )
+        if len(notify_schedule_list) == 0:
+            return all_schedule
+        logger.debug("notify_schedule_list %r", notify_schedule_list)
+        line_notifiyer = get_line_notifiyer()
+        # 期限までに送れなかった予定はシートに残して次の実行で送る
+        result_list = line_notifiyer.notify_line_all(
+            notify_schedule_list, stop=is_expired
+        )
+        if len(result_list) == 0:
+            # 1件も送っていなければシートは変わらないので書き直さない
+            return all_schedule
+        new_schedule_list = marge_result_schedule(all_schedule, result_list)
+        extra = _count_result(result_list)
+        logger.info("notified", extra={**extra, "remaining": len(new_schedule_list)})
+        logger.debug("new_schedule_list %r", new_schedule_list)
+        gsession.clear_schedule()
+        gsession.write_all_schedule(new_schedule_list)
+    return new_schedule_list
+
+
+@click.command(cls=EnvCommand)
 @click.option(
     "--line-access-token", help="line access token", envvar="LINE_ACCESS_TOKEN"
 )
@@ -62,38 +142,183 @@ def cli(line_access_token, gsheet_id, google_json_key):
     is_flag=True,
     default=False,
 )
-def realtime(line_access_token, gsheet_id, google_json_key, dry_run):
-    json_key_file = Path(google_json_key).expanduser()
-    gsession = GsheetSession(json_key_file, gsheet_id)
+@click.option(
+    "--adaptive",
+    help="skip adapters that are not due by the adaptive polling schedule",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--min-interval",
+    help="minimum polling interval in minutes for --adaptive",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+)
+@click.option(
+    "--max-interval",
+    help="maximum polling interval in minutes for --adaptive",
+    type=click.IntRange(min=1),
+    default=120,
+    show_default=True,
+)
+@archive_options
+@deadline_options
+@profile_options
+@metrics_options
+@log_options
+def realtime(
+    line_access_token,
+    gsheet_id,
+    google_json_key,
+    dry_run,
+    adaptive,
+    min_interval,
+    max_interval,
+    record_dir,
+    replay_dir,
+    replay_latency,
+    deadline,
+    profile_path,
+    profile_cpu,
+    profile_memory,
+    metrics_file,
+    verbose,
+):
+    if max_interval < min_interval:
+        raise click.BadParameter(
+            "must be greater than --min-interval", param_hint="--max-interval"
+        )
+    install_logging(verbose)
+    install_deadline(deadline)
+    archive = install_archive(record_dir, replay_dir, replay_latency)
+    # 再生時はSheetsとLINEに接続せず手元の置き換えを使う
+    standin = archive is not None and archive.mode == "replay"
+    install_profiler(profile_path, profile_cpu, profile_memory)
+    install_metrics(metrics_file)
+    poll_scheduler = AdaptivePollScheduler(
+        min_interval=timedelta(minutes=min_interval),
+        max_interval=timedelta(minutes=max_interval),
+    )
+
+    @lru_cache(maxsize=None)
+    def get_gsession() -> "GsheetSession":
+        # 変更が無い場合はシートを読まないので、必要になるまで接続しない
+        if standin:
+            from opime_notify.standin import StandInGsheetSession
+
+            return StandInGsheetSession()
+        from opime_notify.gsheet import GsheetSession
+
+        json_key_file = Path(google_json_key).expanduser()
+        return GsheetSession(json_key_file, gsheet_id)
 
-    all_adapter = []
+    run_realtime(
+        get_all_adapter(),
+        get_gsession,
+        lambda: _build_line_notifiyer(line_access_token, standin=standin),
+        FingerprintStore(),
+        poll_scheduler,
+        adaptive=adaptive,
+        dry_run=dry_run,
+    )
+
+
+def get_all_adapter() -> list[BaseAdapter]:
+    from opime_notify.realtime.cdshop_adapter import CDShopAdapter
+    from opime_notify.realtime.mpadapter import MPAdapter
+
+    all_adapter: list[BaseAdapter] = []
     all_adapter.append(MPAdapter())
     all_adapter.append(CDShopAdapter())
+    return all_adapter
 
+
+def run_realtime(
+    all_adapter: list[BaseAdapter],
+    get_gsession: Callable[[], "GsheetSession"],
+    get_line_notifiyer: Callable[[], "LineNotifiyer"],
+    fingerprint_store: FingerprintStore,
+    poll_scheduler: AdaptivePollScheduler,
+    adaptive: bool = False,
+    dry_run: bool = False,
+) -> None:
+    """
+    各アダプターの新着を確認し、新着があれば通知する
+    """
     notify_article_list = []
-    for adapter in all_adapter:
-        curr_article_list = adapter.fetch_curr_article(gsession)
-        print("curr_article_list")
-        print(curr_article_list)
-        _notify_article_list = adapter.fetch_notify_article_list(curr_article_list)
-        if len(_notify_article_list) == 0:
+    for index, adapter in enumerate(all_adapter):
+        if is_expired():
+            # 確認済みのアダプターの状態は下で保存する
+            skip_list = [a.type for a in all_adapter[index:]]
+            logger.warning("deadline exceeded", extra={"skipped": skip_list})
+            break
+        if adaptive and not poll_scheduler.is_due(adapter.type):
+            logger.info("not due", extra={"adapter": adapter.type})
             continue
-        print("notify_article_list")
-        print(_notify_article_list)
-        if dry_run is False:
-            adapter.regist_article(_notify_article_list + curr_article_list, gsession)
-        notify_article_list += _notify_article_list
+        try:
+            notify_article_list += _fetch_adapter_notify_article_list(
+                adapter, get_gsession, fingerprint_store, poll_scheduler, dry_run
+            )
+        except CircuitOpenError as error:
+            # 応答しないホストのアダプターだけ飛ばす
+            logger.warning(
+                "circuit open", extra={"adapter": adapter.type, "error": str(error)}
+            )
+    if dry_run is False:
+        fingerprint_store.save()
+        poll_scheduler.save()
+    ITEMS.inc(len(notify_article_list), stage="realtime")
+    logger.info("realtime article", extra={"count": len(notify_article_list)})
     if len(notify_article_list) == 0:
-        print("notify_article is empty")
         return
-    print("notify_article_list")
-    print(notify_article_list)
+    logger.debug("notify_article_list %r", notify_article_list)
     notify_list = []
     for notify_article in notify_article_list:
         notify_list += notify_article.get_notify_list()
     if dry_run is True:
         return
-    line_notifiyer = LineNotifiyer(line_access_token)
+    line_notifiyer = get_line_notifiyer()
     result_list = line_notifiyer.notify_line_all(notify_list)
-    print("result_list")
-    print(result_list)
+    logger.info("notified", extra=_count_result(result_list))
+
+
+def _count_result(result_list: list[NotifySchedule]) -> dict[str, int]:
+    success = len([r for r in result_list if r.status == "SUCCESS"])
+    return {"success": success, "failure": len(result_list) - success}
+
+
+def _fetch_adapter_notify_article_list(
+    adapter: BaseAdapter,
+    get_gsession: Callable[[], "GsheetSession"],
+    fingerprint_store: FingerprintStore,
+    poll_scheduler: AdaptivePollScheduler,
+    dry_run: bool,
+) -> list[BaseArticle]:
+    if adapter.is_unchanged(fingerprint_store):
+        logger.info("unchanged", extra={"adapter": adapter.type})
+        adapter.regist_fingerprint(fingerprint_store)
+        poll_scheduler.record(adapter.type, changed=False)
+        return []
+    gsession = get_gsession()
+    curr_article_list = adapter.fetch_curr_article(gsession)
+    logger.debug("curr_article_list %r", curr_article_list)
+    with span("filter", adapter=adapter.type):
+        notify_article_list = adapter.fetch_notify_article_list(curr_article_list)
+    poll_scheduler.record(adapter.type, changed=len(notify_article_list) > 0)
+    logger.info(
+        "new article",
+        extra={
+            "adapter": adapter.type,
+            "count": len(notify_article_list),
+            "current": len(curr_article_list),
+        },
+    )
+    if len(notify_article_list) == 0:
+        adapter.regist_fingerprint(fingerprint_store)
+        return []
+    logger.debug("notify_article_list %r", notify_article_list)
+    if dry_run is False:
+        adapter.regist_article(notify_article_list + curr_article_list, gsession)
+        adapter.regist_fingerprint(fingerprint_store)
+    return notify_article_list
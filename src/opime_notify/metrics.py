@@ -0,0 +1,266 @@
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar, Union
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+    from opime_notify.http_client import RequestTiming
+
+PREFIX = "opime_notify_"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelKey = tuple[tuple[str, str], ...]
+M = TypeVar("M", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(label_key: LabelKey, extra: str = "") -> str:
+    item_list = [f'{k}="{_escape(v)}"' for k, v in label_key]
+    if extra != "":
+        item_list.append(extra)
+    if len(item_list) == 0:
+        return ""
+    return "{" + ",".join(item_list) + "}"
+
+
+def _format_value(value: Union[int, float]) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = PREFIX + name
+        self.help = help
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    def _get_label_key(self, labels: dict[str, Any]) -> LabelKey:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} needs labels {self.label_names}")
+        return tuple((k, str(labels[k])) for k in self.label_names)
+
+    def render(self) -> list[str]:
+        line_list = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        return line_list + self._render_samples()
+
+    def _render_samples(self) -> list[str]:
+        return []
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, help, label_names)
+        self._value_dict: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._get_label_key(labels)
+        with self._lock:
+            self._value_dict[key] = self._value_dict.get(key, 0) + amount
+
+    def get(self, **labels: Any) -> float:
+        with self._lock:
+            return self._value_dict.get(self._get_label_key(labels), 0)
+
+    def get_all(self) -> dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._value_dict)
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            item_list = sorted(self._value_dict.items())
+        return [
+            f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in item_list
+        ]
+
+
+class Histogram(Metric):
+    """
+    bucketsは上限値の昇順、+Infは自動で追加する
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, label_names)
+        self.buckets = buckets
+        # ラベル毎に [各bucketの件数..., +Infの件数], 合計
+        self._count_dict: dict[LabelKey, list[int]] = {}
+        self._sum_dict: dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._get_label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            count_list = self._count_dict.get(key)
+            if count_list is None:
+                count_list = [0] * (len(self.buckets) + 1)
+                self._count_dict[key] = count_list
+            count_list[index] += 1
+            self._sum_dict[key] = self._sum_dict.get(key, 0.0) + value
+
+    def get_count(self, **labels: Any) -> int:
+        with self._lock:
+            return sum(self._count_dict.get(self._get_label_key(labels), []))
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            item_list = [
+                (k, list(v), self._sum_dict[k])
+                for k, v in sorted(self._count_dict.items())
+            ]
+        line_list = []
+        for key, count_list, total in item_list:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), count_list):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                line_list.append(
+                    f"{self.name}_bucket{_format_labels(key, le)} {cumulative}"
+                )
+            labels = _format_labels(key)
+            line_list.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            line_list.append(f"{self.name}_count{labels} {cumulative}")
+        return line_list
+
+
+class Registry:
+    def __init__(self):
+        self.metric_list: list[Metric] = []
+
+    def register(self, metric: M) -> M:
+        self.metric_list.append(metric)
+        return metric
+
+    def render(self) -> str:
+        line_list = []
+        for metric in self.metric_list:
+            line_list += metric.render()
+        return "\n".join(line_list) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """
+        node_exporterのtextfile collectorが途中の状態を読まないように置き換える
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            fp.write(self.render())
+        os.replace(tmp_name, path)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests by host", ("host", "status"))
+)
+HTTP_DURATION = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency", ("host",))
+)
+SHEET_CALLS = REGISTRY.register(
+    Counter("sheet_calls_total", "Google Sheets API requests", ("operation",))
+)
+SHEET_DURATION = REGISTRY.register(
+    Histogram(
+        "sheet_call_duration_seconds", "Google Sheets API latency", ("operation",)
+    )
+)
+LINE_SENDS = REGISTRY.register(
+    Counter("line_sends_total", "LINE messages by result", ("result",))
+)
+PARSE_DURATION = REGISTRY.register(
+    Histogram("parse_duration_seconds", "news parse duration", ("stage",))
+)
+ITEMS = REGISTRY.register(
+    Counter("items_total", "items processed by each stage", ("stage",))
+)
+JOB_RUNS = REGISTRY.register(
+    Counter("job_runs_total", "service job runs by result", ("job", "result"))
+)
+JOB_DURATION = REGISTRY.register(
+    Histogram(
+        "job_duration_seconds",
+        "service job duration",
+        ("job",),
+        buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+    )
+)
+
+
+def observe_http(timing: "RequestTiming") -> None:
+    status = "error" if timing.status is None else str(timing.status)
+    HTTP_REQUESTS.inc(host=timing.host, status=status)
+    HTTP_DURATION.observe(timing.elapsed, host=timing.host)
+
+
+def observe_sheet_call(method: str, elapsed: float) -> None:
+    """
+    Sheets APIへのリクエスト1回を記録する、GETは読み込みでそれ以外は書き込み
+    """
+    operation = "read" if method.lower() == "get" else "write"
+    SHEET_CALLS.inc(operation=operation)
+    SHEET_DURATION.observe(elapsed, operation=operation)
+
+
+def observe_span(name: str, elapsed: float) -> None:
+    """
+    profiling.spanの計測結果を対応するメトリクスに振り分ける
+    Sheetsはspanが入れ子になり呼び出し回数とも合わないので、ここでは記録しない
+    """
+    stage, _, operation = name.partition(".")
+    if stage == "parse":
+        PARSE_DURATION.observe(elapsed, stage=operation)
+
+
+def start_http_server(
+    port: int, addr: str = "127.0.0.1", registry: Registry = REGISTRY
+) -> "ThreadingHTTPServer":
+    """
+    /metrics でメトリクスを返すサーバーを別スレッドで起動する
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path not in ["/", "/metrics"]:
+                self.send_error(404)
+                return None
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # アクセスログは出さない
+            return None
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    )
+    thread.start()
+    return server
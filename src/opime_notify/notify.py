@@ -1,3 +1,7 @@
+import logging
+from typing import Callable, Optional
+
+import requests
 from linebot import LineBotApi
 from linebot.exceptions import LineBotApiError
 from linebot.models import (
@@ -7,32 +11,65 @@ from linebot.models import (
     URIAction,
 )
 
+from opime_notify.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from opime_notify.deadline import clamp_timeout
+from opime_notify.metrics import LINE_SENDS
+from opime_notify.profiling import span
 from opime_notify.schedule import NotifySchedule
 
+LINE_HOST = "api.line.me"
+# (connect timeout, read timeout)
+LINE_TIMEOUT = (5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+def _is_line_failure(error: Exception) -> bool:
+    # 4xxはLINEが応答しているので失敗に数えない
+    if isinstance(error, LineBotApiError):
+        return error.status_code >= 500
+    return True
+
 
 class LineNotifiyer:
     def __init__(self, access_token: str):
         self.access_token = access_token
+        # 複数の通知で使い回す
+        self.line_bot_api = LineBotApi(access_token)
 
     def notify_line_all(
-        self, schedule_list: list[NotifySchedule]
+        self,
+        schedule_list: list[NotifySchedule],
+        stop: Optional[Callable[[], bool]] = None,
     ) -> list[NotifySchedule]:
-        result_list = []
+        """
+        stopがTrueを返したら残りは送らない、送っていない予定は結果に含めない
+        """
+        result_list: list[NotifySchedule] = []
         for schedule in schedule_list:
+            if stop is not None and stop():
+                skip_count = len(schedule_list) - len(result_list)
+                logger.warning("deadline exceeded", extra={"skipped": skip_count})
+                break
             result = self.notify_line(schedule)
             result_list.append(result)
         return result_list
 
+    @span("notify")
     def notify_line(self, schedule: NotifySchedule) -> NotifySchedule:
-        line_bot_api = LineBotApi(self.access_token)
         schedule.normalize()
         message = self.generate_message(schedule)
         result_schedule = schedule
         try:
-            line_bot_api.broadcast(message)
+            with get_circuit_breaker(LINE_HOST).guard(_is_line_failure):
+                self.line_bot_api.broadcast(
+                    message, timeout=clamp_timeout(LINE_TIMEOUT)
+                )
             result_schedule.status = "SUCCESS"
-        except LineBotApiError as error:
+            LINE_SENDS.inc(result="success")
+        except (LineBotApiError, CircuitOpenError, requests.RequestException) as error:
             result_schedule.status = f"{error}"
+            LINE_SENDS.inc(result="failure")
         return result_schedule
 
     def generate_message(self, schedule: NotifySchedule):
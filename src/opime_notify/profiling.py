@@ -0,0 +1,201 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, NamedTuple, Optional
+
+from opime_notify.metrics import observe_span
+
+if TYPE_CHECKING:
+    from opime_notify.http_client import RequestTiming
+
+TOP_COUNT = 30
+
+
+class Span(NamedTuple):
+    name: str
+    # 計測開始からの秒数
+    start: float
+    elapsed: float
+    thread: str
+    attrs: dict[str, Any]
+
+
+class Profiler:
+    """
+    処理の段階(シートの読み書き、HTTP、パース、通知など)毎の経過時間を記録する
+    cpu: cProfileで呼び出したスレッドの関数毎の時間も記録する
+    memory: tracemallocでメモリの確保位置も記録する
+    """
+
+    def __init__(self, command: str = "", cpu: bool = False, memory: bool = False):
+        self.command = command
+        self.cpu = cpu
+        self.memory = memory
+        self.span_list: list[Span] = []
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self._cprofile: Any = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.cpu:
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if self.memory:
+            tracemalloc.start()
+
+    def stop(self) -> None:
+        if self._elapsed is not None:
+            return None
+        self._elapsed = time.perf_counter() - self._start
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self.memory and tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def record(self, name: str, start: float, elapsed: float, **attrs: Any) -> None:
+        """
+        startはtime.perf_counter()の値
+        """
+        if self._elapsed is not None:
+            return None
+        thread = threading.current_thread().name
+        span = Span(name, start - self._start, elapsed, thread, attrs)
+        with self._lock:
+            self.span_list.append(span)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **attrs)
+
+    def record_http(self, timing: "RequestTiming") -> None:
+        """
+        HttpClientのリスナーとして登録する
+        """
+        start = time.perf_counter() - timing.elapsed
+        self.record(
+            "http", start, timing.elapsed, host=timing.host, status=timing.status
+        )
+
+    def get_stage_dict(self) -> dict[str, dict[str, Any]]:
+        stage_dict: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            span_list = list(self.span_list)
+        for s in span_list:
+            stage = stage_dict.setdefault(
+                s.name, {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            stage["count"] += 1
+            stage["total"] += s.elapsed
+            stage["max"] = max(stage["max"], s.elapsed)
+        return stage_dict
+
+    def build_report(self) -> dict[str, Any]:
+        elapsed = self._elapsed
+        if elapsed is None:
+            elapsed = time.perf_counter() - self._start
+        with self._lock:
+            span_list = [s._asdict() for s in self.span_list]
+        report: dict[str, Any] = {
+            "command": self.command,
+            "started_at": self.started_at.isoformat(),
+            "elapsed": elapsed,
+            "stages": self.get_stage_dict(),
+            "spans": span_list,
+        }
+        if self._cprofile is not None:
+            report["cpu"] = self._build_cpu_report()
+        if self._snapshot is not None:
+            report["memory"] = self._build_memory_report(self._snapshot)
+        return report
+
+    def _build_cpu_report(self) -> list[dict[str, Any]]:
+        import pstats
+
+        stats: Any = pstats.Stats(self._cprofile)
+        entry_list = []
+        for func, (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            filename, lineno, funcname = func
+            entry_list.append(
+                {
+                    "function": f"{filename}:{lineno}({funcname})",
+                    "calls": ncalls,
+                    "total": tottime,
+                    "cumulative": cumtime,
+                }
+            )
+        entry_list.sort(key=lambda e: e["cumulative"], reverse=True)
+        return entry_list[:TOP_COUNT]
+
+    def _build_memory_report(
+        self, snapshot: tracemalloc.Snapshot
+    ) -> list[dict[str, Any]]:
+        entry_list = []
+        for stat in snapshot.statistics("lineno")[:TOP_COUNT]:
+            frame = stat.traceback[0]
+            entry_list.append(
+                {
+                    "location": f"{frame.filename}:{frame.lineno}",
+                    "size": stat.size,
+                    "count": stat.count,
+                }
+            )
+        return entry_list
+
+    def write_report(self, path: Path) -> None:
+        """
+        pathにJSONのレポートを書き、cProfileとtracemallocの結果は
+        拡張子を.prof, .tracemallocにしたファイルに書き出す
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as fp:
+            json.dump(self.build_report(), fp, ensure_ascii=False, indent=2)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(path.with_suffix(".prof"))
+        if self._snapshot is not None:
+            self._snapshot.dump(str(path.with_suffix(".tracemalloc")))
+
+
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+def set_profiler(profiler: Optional[Profiler]) -> None:
+    """
+    spanで記録するProfilerを設定する、Noneで記録しない
+    """
+    global _profiler
+    _profiler = profiler
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """
+    経過時間をメトリクスに記録し、Profilerが設定されていればそちらにも記録する
+    デコレーターとしても使える
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_span(name, elapsed)
+        profiler = _profiler
+        if profiler is not None:
+            profiler.record(name, start, elapsed, **attrs)
@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from opime_notify.gsheet import GsheetSession
+from opime_notify.fingerprint import FingerprintDict, FingerprintStore
 from opime_notify.schedule import NotifySchedule
 
+if TYPE_CHECKING:
+    from opime_notify.gsheet import GsheetSession
+
 
 class BaseArticle(ABC):
     def __init__(self):
@@ -26,6 +29,7 @@ class BaseArticle(ABC):
 class BaseAdapter(ABC):
     def __init__(self):
         self.type = "BaseAdapter"
+        self.fingerprint: FingerprintDict = {}
 
     def __str__(self):
         return f"{self.type=}"
@@ -33,7 +37,7 @@ class BaseAdapter(ABC):
     def __repr__(self):
         return f"{self.type}()"
 
-    def fetch_curr_article(self, gsession: GsheetSession) -> list[BaseArticle]:
+    def fetch_curr_article(self, gsession: "GsheetSession") -> list[BaseArticle]:
         return []
 
     @abstractmethod
@@ -43,10 +47,44 @@ class BaseAdapter(ABC):
         return []
 
     def regist_article(
-        self, article_list: list[BaseArticle], gsession: GsheetSession
+        self, article_list: list[BaseArticle], gsession: "GsheetSession"
     ) -> None:
         return None
 
+    def fetch_fingerprint(self) -> Optional[str]:
+        """
+        取得したレスポンス本文のフィンガープリント
+        Noneの場合は毎回変更ありとして扱う
+        """
+        return None
+
+    def projection_fingerprint(self) -> Optional[str]:
+        """
+        通知判定に必要な項目だけのフィンガープリント
+        """
+        return None
+
+    def is_unchanged(self, store: FingerprintStore) -> bool:
+        last_fingerprint = store.get(self.type)
+        body = self.fetch_fingerprint()
+        if body is None:
+            return False
+        self.fingerprint = {"body": body}
+        if last_fingerprint.get("body") == body:
+            if "projection" in last_fingerprint:
+                self.fingerprint["projection"] = last_fingerprint["projection"]
+            return True
+        projection = self.projection_fingerprint()
+        if projection is None:
+            return False
+        self.fingerprint["projection"] = projection
+        return last_fingerprint.get("projection") == projection
+
+    def regist_fingerprint(self, store: FingerprintStore) -> None:
+        if len(self.fingerprint) == 0:
+            return None
+        store.set(self.type, self.fingerprint)
+
     def max_date_article(self, article_list: list[BaseArticle]) -> Optional[datetime]:
         if len(article_list) == 0:
             return None
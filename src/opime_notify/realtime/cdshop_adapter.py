@@ -1,11 +1,14 @@
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from opime_notify.fetch_schedule.session import CDShopSession
-from opime_notify.gsheet import GsheetSession
+from opime_notify.fingerprint import fingerprint_projection
 from opime_notify.realtime import BaseAdapter, BaseArticle
 from opime_notify.schedule import NotifySchedule
 
+if TYPE_CHECKING:
+    from opime_notify.gsheet import GsheetSession
+
 
 class CDShopArticle(BaseArticle):
     def __init__(self, title: str = "", date: Optional[datetime] = None):
@@ -49,9 +52,28 @@ class CDShopArticle(BaseArticle):
 
 class CDShopAdapter(BaseAdapter):
     def __init__(self):
+        super().__init__()
         self.type = "CDShopAdapter"
         self.sheet_name = "cdshop_curr_article_list"
-        super()
+        self.resdict_list: Optional[list] = None
+
+    def fetch_fingerprint(self) -> Optional[str]:
+        session = CDShopSession()
+        self.resdict_list = session.fetch_article_list()
+        return session.fingerprint
+
+    def projection_fingerprint(self) -> Optional[str]:
+        if self.resdict_list is None:
+            return None
+        items = []
+        for resdict in self.resdict_list:
+            if not isinstance(resdict, dict):
+                continue
+            published = None
+            if isinstance(resdict.get("date"), dict):
+                published = resdict["date"].get("published")
+            items.append({"title": resdict.get("title"), "published": published})
+        return fingerprint_projection(items, ["title", "published"])
 
     def convert_resdict_to_article(self, resdict: dict) -> Optional[BaseArticle]:
         if "title" not in resdict:
@@ -68,7 +90,7 @@ class CDShopAdapter(BaseAdapter):
         date = date.replace(tzinfo=None)
         return CDShopArticle(title=title, date=date)
 
-    def fetch_curr_article(self, gsession: GsheetSession) -> list[BaseArticle]:
+    def fetch_curr_article(self, gsession: "GsheetSession") -> list[BaseArticle]:
         curr_record_list = gsession.fetch_curr_article(self.sheet_name)
         curr_article_list: list[BaseArticle] = []
         for curr_record in curr_record_list:
@@ -86,9 +108,12 @@ class CDShopAdapter(BaseAdapter):
     def fetch_notify_article_list(
         self, curr_article_list: list[BaseArticle] = None
     ) -> list[BaseArticle]:
-        session = CDShopSession()
+        resdict_list = self.resdict_list
+        if resdict_list is None:
+            session = CDShopSession()
+            resdict_list = session.fetch_article_list()
         _article_list: list[Optional[BaseArticle]] = [
-            self.convert_resdict_to_article(a) for a in session.fetch_article_list()
+            self.convert_resdict_to_article(a) for a in resdict_list
         ]
         article_list: list[BaseArticle] = [a for a in _article_list if a is not None]
         if curr_article_list is None:
@@ -132,7 +157,7 @@ class CDShopAdapter(BaseAdapter):
         return max([a.date for a in _article_list if a.date is not None])
 
     def regist_article(
-        self, article_list: list[BaseArticle], gsession: GsheetSession
+        self, article_list: list[BaseArticle], gsession: "GsheetSession"
     ) -> None:
         gsession.clear_schedule(self.sheet_name)
         headers = gsession.fetch_headers(self.sheet_name)
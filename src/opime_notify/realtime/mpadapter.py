@@ -1,12 +1,19 @@
 import re
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from opime_notify.fetch_schedule.session import ShopSession, TagDict
-from opime_notify.gsheet import GsheetSession
+from opime_notify.fingerprint import fingerprint_projection
 from opime_notify.realtime import BaseAdapter, BaseArticle
+from opime_notify.realtime.seen_index import SeenIdIndex
 from opime_notify.schedule import NotifySchedule
 
+if TYPE_CHECKING:
+    from opime_notify.gsheet import GsheetSession
+
+# 確認済みIDをSeenIdIndex.encode()の形で保存する列
+SEEN_KEY = "seen"
+
 
 class MPArticle(BaseArticle):
     def __init__(
@@ -69,11 +76,25 @@ class MPArticle(BaseArticle):
 
 class MPAdapter(BaseAdapter):
     def __init__(self):
+        super().__init__()
         self.type = "MPAdapter"
         self.sheet_name = "monthly_photo_curr_tag_list"
-        super()
+        self.fetched_article_list: list[BaseArticle] = []
+        self.tag_list: Optional[list[TagDict]] = None
+        self.seen_index: Optional[SeenIdIndex] = None
+
+    def fetch_fingerprint(self) -> Optional[str]:
+        session = ShopSession()
+        self.tag_list = session.fetch_tag_list()
+        return session.fingerprint
 
-    def fetch_curr_article(self, gsession: GsheetSession) -> list[BaseArticle]:
+    def projection_fingerprint(self) -> Optional[str]:
+        if self.tag_list is None:
+            return None
+        keys = ["id", "code", "name", "name_kana"]
+        return fingerprint_projection(self.filter_mptags(self.tag_list), keys)
+
+    def fetch_curr_article(self, gsession: "GsheetSession") -> list[BaseArticle]:
         curr_record_list = gsession.fetch_curr_article(self.sheet_name)
         curr_article_list: list[BaseArticle] = []
         for curr_record in curr_record_list:
@@ -98,6 +119,7 @@ class MPAdapter(BaseAdapter):
                     name_kana=name_kana,
                 )
             )
+        self.seen_index = self.build_seen_index(curr_record_list)
         return curr_article_list
 
     def fetch_notify_article_list(
@@ -105,7 +127,9 @@ class MPAdapter(BaseAdapter):
     ) -> list[BaseArticle]:
         # mpadapterで取得するのは記事ではないが、互換性のために記事のように保存する
         session = ShopSession()
-        tag_list = session.fetch_tag_list()
+        tag_list = self.tag_list
+        if tag_list is None:
+            tag_list = session.fetch_tag_list()
         tag_list = self.filter_mptags(tag_list)
         date = datetime.now()
         article_list: list[BaseArticle] = []
@@ -121,6 +145,7 @@ class MPAdapter(BaseAdapter):
                     name_kana=tag["name_kana"],
                 )
             )
+        self.fetched_article_list = article_list
         if curr_article_list is None:
             return article_list
         notify_article_list: list[BaseArticle] = self.filter_notify_article_list(
@@ -131,60 +156,74 @@ class MPAdapter(BaseAdapter):
     def filter_notify_article_list(
         self, curr_article_list: list[BaseArticle], article_list: list[BaseArticle]
     ) -> list[BaseArticle]:
-        # idは加算され続けていいくことが前提
-        max_id = self.get_max_id(curr_article_list)
         if len(curr_article_list) < 1:
             return article_list
-        code_list: list[str] = []
-        for curr_article in curr_article_list:
-            if not isinstance(curr_article, MPArticle):
-                continue
-            code_list.append(curr_article.code)
-        notify_article_list: list[BaseArticle] = []
-        for article in article_list:
+        seen_index = self.seen_index
+        if seen_index is None:
+            seen_index = SeenIdIndex(
+                [a.id for a in curr_article_list if isinstance(a, MPArticle)]
+            )
+        mparticle_list = [
+            a
+            for a in article_list
+            if isinstance(a, MPArticle) and a.date is not None and a.title != ""
+        ]
+        new_id_set = set(seen_index.difference([a.id for a in mparticle_list]))
+        return [a for a in mparticle_list if a.id in new_id_set]
+
+    def build_seen_index(self, curr_record_list: list[dict]) -> SeenIdIndex:
+        """
+        seen列があれば区間表記から戻す
+        seen列のないシートは最大IDの1行のみ保存していた以前の形式なので、
+        その行のID以下を確認済みとみなす
+        """
+        if len(curr_record_list) == 0:
+            return SeenIdIndex()
+        if SEEN_KEY in curr_record_list[0]:
+            # 数字1つだけの場合はget_all_recordsで数値になっている
+            return SeenIdIndex.decode(str(curr_record_list[0][SEEN_KEY]))
+        id_list = [int(r["id"]) for r in curr_record_list]
+        return SeenIdIndex(floor=max(id_list))
+
+    def filter_seen_article(self, article_list: list[BaseArticle]) -> list[MPArticle]:
+        """
+        確認済みのタグを重複なしでID順に返す
+        """
+        seen_article_dict: dict[int, MPArticle] = {}
+        for article in article_list + self.fetched_article_list:
             if not isinstance(article, MPArticle):
                 continue
-            date = article.date
-            title = article.title
-            id = article.id
-            if date is None or title == "":
-                continue
-            if max_id < id:
-                notify_article_list.append(article)
-        return notify_article_list
-
-    def get_max_id(self, article_list: list[BaseArticle]) -> int:
-        _article_list = [a for a in article_list if isinstance(a, MPArticle)]
-        if len(_article_list) == 0:
-            return 0
-        return max([a.id for a in _article_list])
-
-    def filter_max_date_article(
-        self, article_list: list[BaseArticle]
-    ) -> list[BaseArticle]:
-        max_id = self.get_max_id(article_list)
-        max_id_article_list: list[BaseArticle] = []
-        for article in article_list:
-            if isinstance(article, MPArticle):
-                if article.id == max_id:
-                    max_id_article_list.append(article)
-        return max_id_article_list
+            seen_article_dict.setdefault(article.id, article)
+        return [seen_article_dict[id] for id in sorted(seen_article_dict)]
 
     def regist_article(
-        self, article_list: list[BaseArticle], gsession: GsheetSession
+        self, article_list: list[BaseArticle], gsession: "GsheetSession"
     ) -> None:
-        gsession.clear_schedule(self.sheet_name)
+        """
+        最大IDのタグ1行に、確認済みIDの区間表記をseen列として保存する
+        """
+        seen_article_list = self.filter_seen_article(article_list)
+        if len(seen_article_list) == 0:
+            return None
+        seen_index = self.seen_index
+        if seen_index is None:
+            seen_index = SeenIdIndex()
+        seen_index.update([a.id for a in seen_article_list])
         headers = gsession.fetch_headers(self.sheet_name)
-        table = []
-        _article_list = self.filter_max_date_article(article_list)
-        for article in _article_list:
-            if not isinstance(article, MPArticle):
+        if SEEN_KEY not in headers:
+            # 以前の形式のシートはここでseen列を足して移行する
+            headers = headers + [SEEN_KEY]
+            gsession.write_headers(headers, self.sheet_name)
+        gsession.clear_schedule(self.sheet_name)
+        max_id_article = seen_article_list[-1]
+        row = []
+        for key in headers:
+            if key == SEEN_KEY:
+                # "1-3"などが日付として解釈されないよう文字列として書き込む
+                row.append(f"'{seen_index.encode()}")
                 continue
-            row = []
-            for key in headers:
-                row.append(article.get(key))
-            table.append(row)
-        gsession.write_table(table, self.sheet_name)
+            row.append(max_id_article.get(key))
+        gsession.write_table([row], self.sheet_name)
 
     def filter_mptags(self, tags: list[TagDict]) -> list[TagDict]:
         mppattern = r"\d{4}年\d{1,2}月度個別生写真"
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from opime_notify.cache import get_state_file
+
+
+class AdaptivePollScheduler:
+    """
+    過去に更新があった時間帯は短い間隔で、更新が無ければ指数的に間隔を伸ばす
+    """
+
+    date_format = "%Y/%m/%d %H:%M:%S"
+
+    def __init__(
+        self,
+        min_interval: timedelta = timedelta(minutes=5),
+        max_interval: timedelta = timedelta(hours=2),
+        backoff: float = 2.0,
+        hot_window: timedelta = timedelta(hours=1),
+        hot_count: int = 3,
+        history_size: int = 50,
+        cache_dir: Optional[Path] = None,
+    ):
+        if max_interval < min_interval:
+            raise ValueError("max_interval must be greater than min_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.hot_window = hot_window
+        self.hot_count = hot_count
+        self.history_size = history_size
+        self.state_file = get_state_file("poll_schedule.json", cache_dir)
+        state: Any = self.state_file.load()
+        if not isinstance(state, dict):
+            state = {}
+        self.state: dict[str, dict] = state
+
+    def is_due(self, key: str, now: Optional[datetime] = None) -> bool:
+        if now is None:
+            now = datetime.now()
+        next_poll = self.get_next_poll(key)
+        if next_poll is None:
+            return True
+        return next_poll <= now or self.is_hot(key, now)
+
+    def get_next_poll(self, key: str) -> Optional[datetime]:
+        next_poll_str = self.state.get(key, {}).get("next_poll")
+        if next_poll_str is None:
+            return None
+        return datetime.strptime(next_poll_str, self.date_format)
+
+    def get_history(self, key: str) -> list[datetime]:
+        history = self.state.get(key, {}).get("history", [])
+        return [datetime.strptime(d, self.date_format) for d in history]
+
+    def is_hot(self, key: str, now: datetime) -> bool:
+        """
+        同じ曜日・時刻、または同じ日付・時刻の近辺にhot_count回以上の更新があればTrue
+        1回だけの一致では履歴が多いとほとんどの時刻が当てはまるため、繰り返しを求める
+        """
+        window = self.hot_window.total_seconds()
+        now_sec = self._seconds_of_day(now)
+        weekday_count = 0
+        day_count = 0
+        for changed_at in self.get_history(key):
+            time_diff = abs(now_sec - self._seconds_of_day(changed_at))
+            time_diff = min(time_diff, 86400 - time_diff)
+            if time_diff > window:
+                continue
+            weekday_count += changed_at.weekday() == now.weekday()
+            day_count += changed_at.day == now.day
+        return max(weekday_count, day_count) >= self.hot_count
+
+    @staticmethod
+    def _seconds_of_day(date: datetime) -> int:
+        return date.hour * 3600 + date.minute * 60 + date.second
+
+    def get_interval(self, key: str) -> timedelta:
+        interval = self.state.get(key, {}).get("interval")
+        if interval is None:
+            return self.min_interval
+        return timedelta(seconds=interval)
+
+    def record(self, key: str, changed: bool, now: Optional[datetime] = None) -> None:
+        if now is None:
+            now = datetime.now()
+        history = self.state.get(key, {}).get("history", [])
+        if changed:
+            history = history + [now.strftime(self.date_format)]
+            if len(history) > self.history_size:
+                history = history[1:]
+            interval = self.min_interval
+        else:
+            interval = self.get_interval(key) * self.backoff
+        interval = max(self.min_interval, min(self.max_interval, interval))
+        self.state[key] = {"interval": interval.total_seconds(), "history": history}
+        if self.is_hot(key, now + interval):
+            # 次回の予定が更新の多い時間帯にかかる場合は間隔を戻す
+            interval = self.min_interval
+        next_poll = now + interval
+        self.state[key]["next_poll"] = next_poll.strftime(self.date_format)
+
+    def save(self) -> None:
+        self.state_file.save(self.state)
@@ -0,0 +1,93 @@
+from array import array
+from bisect import bisect_left, insort
+from typing import Iterable
+
+
+class SeenIdIndex:
+    """
+    既に確認済みのIDを昇順の整数配列で保持する
+    """
+
+    def __init__(self, ids: Iterable[int] = (), floor: int = 0):
+        # floor以下のIDは全て確認済みとして扱う
+        self.floor = floor
+        self.ids = array("q", sorted(set(i for i in ids if i > floor)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id: int) -> bool:
+        if id <= self.floor:
+            return True
+        pos = bisect_left(self.ids, id)
+        return pos < len(self.ids) and self.ids[pos] == id
+
+    def __repr__(self):
+        return f"SeenIdIndex({self.encode()!r})"
+
+    def add(self, id: int) -> None:
+        if id in self:
+            return
+        insort(self.ids, id)
+
+    def update(self, ids: Iterable[int]) -> None:
+        new_ids = [i for i in set(ids) if i not in self]
+        if len(new_ids) == 0:
+            return
+        self.ids = array("q", sorted(self.ids.tolist() + new_ids))
+
+    def difference(self, ids: Iterable[int]) -> list[int]:
+        """
+        idsのうち未確認のIDを出現順に返す
+        """
+        diff: list[int] = []
+        found: set[int] = set()
+        for id in ids:
+            if id in found or id in self:
+                continue
+            found.add(id)
+            diff.append(id)
+        return diff
+
+    def encode(self) -> str:
+        """
+        "1-5,8,10-12" のような連続区間表記に変換する
+        """
+        ranges: list[str] = []
+        if self.floor > 0:
+            ranges.append(f"-{self.floor}")
+        start = prev = None
+        for id in self.ids:
+            if prev is not None and id == prev + 1:
+                prev = id
+                continue
+            if start is not None:
+                ranges.append(self._range_str(start, prev))
+            start = prev = id
+        if start is not None:
+            ranges.append(self._range_str(start, prev))
+        return ",".join(ranges)
+
+    @classmethod
+    def decode(cls, text: str) -> "SeenIdIndex":
+        """
+        encode()の区間表記から戻す
+        """
+        floor = 0
+        ids: list[int] = []
+        for part in text.split(","):
+            part = part.strip()
+            if part == "":
+                continue
+            if part.startswith("-"):
+                floor = int(part[1:])
+                continue
+            start, _, end = part.partition("-")
+            ids.extend(range(int(start), int(end or start) + 1))
+        return cls(ids, floor=floor)
+
+    @staticmethod
+    def _range_str(start, end) -> str:
+        if start == end:
+            return f"{start}"
+        return f"{start}-{end}"
@@ -2,6 +2,8 @@ import unicodedata
 from datetime import datetime
 from typing import Optional
 
+from opime_notify.profiling import span
+
 
 class NotifySchedule:
     date_format = "%Y/%m/%d %H:%M:%S"
@@ -75,6 +77,7 @@ class NotifySchedule:
         self.description = unicodedata.normalize("NFKC", self.description)
 
 
+@span("filter")
 def filter_notify_schedule(
     schedule_list: list[NotifySchedule], basetime: datetime = None
 ) -> list[NotifySchedule]:
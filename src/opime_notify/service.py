@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import signal
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from opime_notify.due_timer import DueTimer
+from opime_notify.metrics import JOB_DURATION, JOB_RUNS
+
+# 時計の変更に追従するため、次の通知までが長くてもこの秒数ごとに確認し直す
+MAX_TIMER_WAIT = 60.0
+# 通知時刻より少しだけ後に起きて、時刻を過ぎたことを確実にする
+TIMER_MARGIN = 0.01
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    サービスで定期的に実行する処理
+    funcは同期処理なので、イベントループを止めないようにスレッドで実行する
+    """
+
+    def __init__(self, name: str, func: Callable[[], None], interval: timedelta):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_count = 0
+        self.error_count = 0
+
+    def __repr__(self):
+        return f"Job({self.name!r}, interval={self.interval})"
+
+    async def run_once(self) -> None:
+        start = time.perf_counter()
+        result = "success"
+        try:
+            await asyncio.to_thread(self.func)
+        except Exception as error:
+            # 1つのジョブの失敗でサービス全体を止めない
+            self.error_count += 1
+            result = "failure"
+            logger.error("job failed", extra={"job": self.name, "error": repr(error)})
+        finally:
+            self.run_count += 1
+        elapsed = time.perf_counter() - start
+        JOB_RUNS.inc(job=self.name, result=result)
+        JOB_DURATION.observe(elapsed, job=self.name)
+        extra = {"job": self.name, "result": result, "elapsed": round(elapsed, 3)}
+        logger.info("job finished", extra=extra)
+
+
+class Service:
+    """
+    複数のジョブを1つのイベントループで実行する
+    同じジョブが重なって実行されることは無い
+    due_timerを渡した場合は、予定の通知時刻になった時にdue_jobを実行する
+    """
+
+    def __init__(
+        self,
+        job_list: list[Job],
+        due_timer: Optional[DueTimer] = None,
+        due_job: Optional[Job] = None,
+    ):
+        self.job_list = job_list
+        self.due_timer = due_timer
+        self.due_job = due_job
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._wake_event: Optional[asyncio.Event] = None
+
+    async def run(self, once: bool = False) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._wake_event = asyncio.Event()
+        task_list = [self._run_job(job, once) for job in self.job_list]
+        if self.due_timer is not None and self.due_job is not None and not once:
+            self.due_timer.add_listener(self.wake)
+            task_list.append(self._run_timer(self.due_timer, self.due_job))
+        await asyncio.gather(*task_list)
+
+    async def _run_job(self, job: Job, once: bool) -> None:
+        assert self._loop is not None and self._stop_event is not None
+        while not self._stop_event.is_set():
+            start = self._loop.time()
+            await job.run_once()
+            if once:
+                break
+            # 開始時刻から数えて次の実行まで待つ、停止されたらすぐに抜ける
+            wait = job.interval.total_seconds() - (self._loop.time() - start)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=max(wait, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_timer(self, due_timer: DueTimer, due_job: Job) -> None:
+        assert self._stop_event is not None and self._wake_event is not None
+        while not self._stop_event.is_set():
+            self._wake_event.clear()
+            due_list = due_timer.pop_due()
+            if len(due_list) > 0:
+                logger.info("due", extra={"count": len(due_list)})
+                logger.debug("due_list %r", due_list)
+                await due_job.run_once()
+                continue
+            wait = MAX_TIMER_WAIT
+            next_due = due_timer.next_due()
+            if next_due is not None:
+                seconds = (next_due - datetime.now()).total_seconds() + TIMER_MARGIN
+                wait = min(max(seconds, 0), MAX_TIMER_WAIT)
+            # 予定の追加か停止で起こされたら待ち時間を計算し直す
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def wake(self) -> None:
+        """
+        タイマーの待ち時間を計算し直させる、どのスレッドから呼んでもよい
+        """
+        if self._loop is None or self._wake_event is None:
+            return None
+        self._loop.call_soon_threadsafe(self._wake_event.set)
+
+    def stop(self) -> None:
+        """
+        実行中のジョブが終わったら停止する、どのスレッドから呼んでもよい
+        """
+        if self._loop is None or self._stop_event is None:
+            return None
+        self._loop.call_soon_threadsafe(self._stop_event.set)
+        self.wake()
+
+
+def run_service(
+    job_list: list[Job],
+    due_timer: Optional[DueTimer] = None,
+    due_job: Optional[Job] = None,
+    once: bool = False,
+) -> Service:
+    service = Service(job_list, due_timer=due_timer, due_job=due_job)
+
+    async def main() -> None:
+        loop = asyncio.get_running_loop()
+        for signum in [signal.SIGINT, signal.SIGTERM]:
+            try:
+                loop.add_signal_handler(signum, service.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windowsやメインスレッド以外では使えない
+                pass
+        await service.run(once=once)
+
+    asyncio.run(main())
+    return service
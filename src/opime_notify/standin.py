@@ -0,0 +1,138 @@
+"""
+--replay で実行する時にSheetsとLINEの代わりに使う手元の置き換え
+外部には接続せず、書き込みはメモリ上に残し、送信はログに出すだけにする
+"""
+
+import logging
+from pathlib import Path
+from typing import Any
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+
+from opime_notify.gsheet import GsheetSession
+from opime_notify.notify import LineNotifiyer
+
+SCHEDULE_HEADER = ["id", "title", "date", "description", "url", "status"]
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryWorksheet:
+    """
+    GsheetSessionが使うgspreadのWorksheetの操作だけを持つ
+    """
+
+    def __init__(self, title: str, header: list[str], rows: int = 100):
+        self.title = title
+        # 1行目が見出し
+        self.row_list: list[list[Any]] = [list(header)]
+        self.row_count = rows
+
+    def get_all_records(self) -> list[dict[str, Any]]:
+        header = self.row_list[0]
+        row_list = self.row_list[1:]
+        # 末尾の空行は返さない
+        while len(row_list) > 0 and all(v == "" for v in row_list[-1]):
+            row_list = row_list[:-1]
+        return [dict(zip(header, row)) for row in row_list]
+
+    def row_values(self, row: int) -> list[Any]:
+        if row > len(self.row_list):
+            return []
+        return list(self.row_list[row - 1])
+
+    def update(self, range_str: str, values: list[list[Any]], **kwargs: Any) -> None:
+        start_row, start_col = a1_to_rowcol(range_str.split(":")[0])
+        self._write(start_row, start_col, values)
+
+    def append_rows(self, values: list[list[Any]], **kwargs: Any) -> None:
+        # 値のある最後の行の次に書く
+        index = len(self.row_list)
+        while index > 1 and all(v == "" for v in self.row_list[index - 1]):
+            index -= 1
+        self._write(index + 1, 1, values)
+
+    def _write(self, start_row: int, start_col: int, values: list[list[Any]]) -> None:
+        for offset, value_list in enumerate(values):
+            index = start_row - 1 + offset
+            while len(self.row_list) <= index:
+                self.row_list.append([""] * len(self.row_list[0]))
+            row = self.row_list[index]
+            for col, value in enumerate(value_list, start=start_col - 1):
+                if col >= len(row):
+                    row.extend([""] * (col + 1 - len(row)))
+                if value == "=ROW()-1":
+                    value = index
+                elif isinstance(value, str) and value.startswith("'"):
+                    # 先頭の'は文字列として入力する印で、値には残らない
+                    value = value[1:]
+                row[col] = value
+
+    def batch_clear(self, range_list: list[str]) -> None:
+        for range_str in range_list:
+            start, end = range_str.split(":")
+            start_row, _ = a1_to_rowcol(start)
+            end_row, _ = a1_to_rowcol(end)
+            for index in range(start_row - 1, min(end_row, len(self.row_list))):
+                self.row_list[index] = [""] * len(self.row_list[index])
+
+    def add_rows(self, rows: int) -> None:
+        self.row_count += rows
+
+    def count_rows(self) -> int:
+        return len([r for r in self.row_list[1:] if any(v != "" for v in r)])
+
+
+class MemorySpreadsheet:
+    def __init__(self):
+        self.worksheet_dict: dict[str, MemoryWorksheet] = {}
+
+    def worksheet(self, title: str) -> MemoryWorksheet:
+        if title not in self.worksheet_dict:
+            raise WorksheetNotFound(title)
+        return self.worksheet_dict[title]
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> MemoryWorksheet:
+        self.worksheet_dict[title] = MemoryWorksheet(title, [], rows=rows)
+        return self.worksheet_dict[title]
+
+
+class StandInGsheetSession(GsheetSession):
+    """
+    空の通知予定のシートだけがあるメモリ上のスプレッドシートを使う
+    """
+
+    def __init__(self, sheet_name: str = "schedule_list"):
+        # get_spreadsheets_objは親の__init__の中で呼ばれる
+        self.sheet_name = sheet_name
+        super().__init__(Path(), "", sheet_name)
+
+    def get_spreadsheets_obj(self):
+        spreadsheet = MemorySpreadsheet()
+        spreadsheet.worksheet_dict[self.sheet_name] = MemoryWorksheet(
+            self.sheet_name, SCHEDULE_HEADER
+        )
+        return spreadsheet
+
+
+class StandInLineBotApi:
+    def __init__(self):
+        self.sent_list: list[Any] = []
+
+    def broadcast(self, messages: Any, **kwargs: Any) -> None:
+        title = getattr(messages, "alt_text", None)
+        if title is None:
+            title = messages.text.split("\n")[0]
+        self.sent_list.append(messages)
+        logger.info("stand-in broadcast", extra={"title": title})
+
+
+class StandInLineNotifiyer(LineNotifiyer):
+    """
+    LINEには送らず、送ったことにしてログに出す
+    """
+
+    def __init__(self):
+        self.access_token = ""
+        self.line_bot_api = StandInLineBotApi()
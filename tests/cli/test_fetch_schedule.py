@@ -1,9 +1,153 @@
+from pathlib import Path
+
 from click.testing import CliRunner
 
-from opime_notify.cli.fetch_schedule import cli
+from opime_notify.cli.fetch_schedule import (
+    ScheduleAppender,
+    _fetch_news_schedule_list,
+    cli,
+    regist_news_schedule,
+)
+from opime_notify.deadline import Deadline, set_deadline
+from opime_notify.fetch_schedule.crawler import SeenUrlIndex
+from opime_notify.fetch_schedule.session import OfficialSession
+from opime_notify.schedule import NotifySchedule
+from opime_notify.standin import StandInGsheetSession
+
+FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "ngt48"
 
 
 def test_cli_send_line_help():
     runner = CliRunner()
     result = runner.invoke(cli, ["--help"])
     assert result.exit_code == 0
+
+
+def mock_news(requests_mock, s: OfficialSession) -> dict[int, list[str]]:
+    page_dict = {
+        s.THEATER_CATEGORY: ["detail_theater"],
+        s.ALL_CATEGORY: ["detail_otsale", "detail_theater", "detail_monthly_photo"],
+    }
+    for category, name_list in page_dict.items():
+        links = "".join(f'<a href="{s.NEWS_URL}/detail/{n}"></a>' for n in name_list)
+        requests_mock.get(
+            f"{s.NEWS_URL}/articles/1/0/{category}",
+            text=f'<div class="news-block-inner">{links}</div>',
+        )
+    for name in page_dict[s.ALL_CATEGORY]:
+        text = (FIXTURE_DIR / f"{name}.html").read_text(encoding="utf-8")
+        requests_mock.get(f"{s.NEWS_URL}/detail/{name}", text=text)
+    return page_dict
+
+
+def test_fetch_news_schedule_list(tmp_path, requests_mock):
+    s = OfficialSession()
+    page_dict = mock_news(requests_mock, s)
+    seen_index_dict = {c: SeenUrlIndex(c, cache_dir=tmp_path) for c in page_dict}
+
+    result = _fetch_news_schedule_list(s, list(page_dict), seen_index_dict)
+    assert all(isinstance(n, NotifySchedule) for n in result)
+    detail_count = sum(1 for r in requests_mock.request_history if "/detail/" in r.url)
+    assert detail_count == 3
+    for category, name_list in page_dict.items():
+        for name in name_list:
+            assert f"{s.NEWS_URL}/detail/{name}" in seen_index_dict[category]
+
+
+def test_fetch_news_schedule_list_deadline(tmp_path, requests_mock):
+    s = OfficialSession()
+    page_dict = mock_news(requests_mock, s)
+    seen_index_dict = {c: SeenUrlIndex(c, cache_dir=tmp_path) for c in page_dict}
+    # 一覧の取得は行い、記事の取得は始めない
+    set_deadline(Deadline(0))
+    try:
+        result = _fetch_news_schedule_list(s, list(page_dict), seen_index_dict)
+    finally:
+        set_deadline(None)
+    assert result == []
+    assert not any("/detail/" in r.url for r in requests_mock.request_history)
+    # 取得していない記事は次の実行で処理する
+    assert all(len(seen_index) == 0 for seen_index in seen_index_dict.values())
+
+
+def watch_append_rows(monkeypatch, gsession: StandInGsheetSession) -> list[list]:
+    append_list = []
+    wsheet = gsession.sheet.worksheet(gsession.sheet_name)
+    append_rows = wsheet.append_rows
+
+    def wrapper(values, **kwargs):
+        append_list.append(values)
+        return append_rows(values, **kwargs)
+
+    monkeypatch.setattr(wsheet, "append_rows", wrapper)
+    return append_list
+
+
+def test_regist_news_schedule(tmp_path, requests_mock, monkeypatch):
+    s = OfficialSession()
+    page_dict = mock_news(requests_mock, s)
+    seen_index_dict = {c: SeenUrlIndex(c, cache_dir=tmp_path) for c in page_dict}
+    gsession = StandInGsheetSession()
+    append_list = watch_append_rows(monkeypatch, gsession)
+    appended_list = []
+
+    result = regist_news_schedule(
+        s,
+        list(page_dict),
+        seen_index_dict,
+        lambda: gsession,
+        on_schedule=appended_list.append,
+    )
+    assert len(result) > 0
+    assert appended_list == result
+    assert sorted(gsession.read_all_schedule()) == sorted(result)
+    # シートへの追加は1回のappend_rowsにまとめる
+    assert [len(rows) for rows in append_list] == [len(result)]
+
+    # 全ての記事を処理し直しても、既にシートにある予定は追加しない
+    appended_list.clear()
+    append_list.clear()
+    result = regist_news_schedule(
+        s, list(page_dict), {}, lambda: gsession, on_schedule=appended_list.append
+    )
+    assert len(result) > 0
+    assert appended_list == []
+    assert append_list == []
+    assert len(gsession.read_all_schedule()) == len(result)
+
+
+def test_schedule_appender_chunk(monkeypatch):
+    gsession = StandInGsheetSession()
+    append_list = watch_append_rows(monkeypatch, gsession)
+    appended_list = []
+    appender = ScheduleAppender(
+        lambda: gsession, on_schedule=appended_list.append, chunk_size=2
+    )
+    schedule_list = [
+        NotifySchedule(id=0, title=f"title{i}", date="2022/12/01 12:00:00")
+        for i in range(5)
+    ]
+    for schedule in schedule_list:
+        appender.append(schedule)
+    # on_scheduleにはすぐ渡し、シートにはchunk_size件ずつ追加する
+    assert appended_list == schedule_list
+    assert [len(rows) for rows in append_list] == [2, 2]
+    appender.flush()
+    assert [len(rows) for rows in append_list] == [2, 2, 1]
+    assert sorted(gsession.read_all_schedule()) == sorted(schedule_list)
+    assert appender.count == 5
+
+
+def test_regist_news_schedule_no_regist(tmp_path, requests_mock):
+    s = OfficialSession()
+    page_dict = mock_news(requests_mock, s)
+    seen_index_dict = {c: SeenUrlIndex(c, cache_dir=tmp_path) for c in page_dict}
+
+    def get_gsession():
+        raise AssertionError("must not connect to the sheet with --no-regist")
+
+    result = regist_news_schedule(
+        s, list(page_dict), seen_index_dict, get_gsession, no_regist=True
+    )
+    assert len(result) > 0
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,135 @@
+import json
+import logging
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from opime_notify.cli.fetch_schedule import cli
+from opime_notify.cli.options import (
+    EnvCommand,
+    ensure_env,
+    install_archive,
+    install_logging,
+    install_metrics,
+    install_profiler,
+    log_options,
+    metrics_options,
+    profile_options,
+)
+from opime_notify.http_client import get_default_client
+from opime_notify.log import setup_logging
+from opime_notify.profiling import get_profiler, span
+
+
+def test_install_archive(tmp_path):
+    assert install_archive(None, None) is None
+    archive = install_archive(None, str(tmp_path), replay_latency=20)
+    assert archive is not None
+    assert archive.is_replay
+    assert archive.latency == pytest.approx(0.02)
+    assert get_default_client().archive is archive
+
+
+def test_install_archive_conflict(tmp_path):
+    with pytest.raises(click.UsageError):
+        install_archive(str(tmp_path), str(tmp_path))
+
+
+def test_cli_record_replay_conflict(tmp_path):
+    runner = CliRunner()
+    args = ["--record", str(tmp_path / "rec"), "--replay", str(tmp_path)]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 2
+
+
+def test_install_profiler(tmp_path, requests_mock):
+    report_path = tmp_path / "profile.json"
+    requests_mock.get("https://example.com/", text="ok")
+
+    @click.command()
+    @profile_options
+    def command(profile_path, profile_cpu, profile_memory):
+        profiler = install_profiler(profile_path, profile_cpu, profile_memory)
+        assert get_profiler() is profiler
+        with span("parse.news"):
+            get_default_client().get("https://example.com/")
+
+    runner = CliRunner()
+    args = ["--profile", str(report_path), "--profile-cpu", "--profile-memory"]
+    result = runner.invoke(command, args)
+    assert result.exit_code == 0, result.output
+    assert get_profiler() is None
+    with report_path.open() as fp:
+        report = json.load(fp)
+    assert report["command"] == "command"
+    assert set(report["stages"]) == {"parse.news", "http"}
+    assert report["stages"]["http"]["count"] == 1
+    assert len(report["cpu"]) > 0
+    assert len(report["memory"]) > 0
+    assert report_path.with_suffix(".prof").exists()
+    assert report_path.with_suffix(".tracemalloc").exists()
+
+
+def test_install_metrics(tmp_path):
+    metrics_path = tmp_path / "opime_notify.prom"
+
+    @click.command()
+    @metrics_options
+    def command(metrics_file):
+        install_metrics(metrics_file)
+        with span("parse.news"):
+            pass
+
+    runner = CliRunner()
+    result = runner.invoke(command, ["--metrics-file", str(metrics_path)])
+    assert result.exit_code == 0, result.output
+    assert 'opime_notify_parse_duration_seconds_count{stage="news"}' in (
+        metrics_path.read_text()
+    )
+
+
+def test_install_logging():
+    @click.command()
+    @log_options
+    def command(verbose):
+        install_logging(verbose)
+        logging.getLogger("opime_notify.test").debug("dump %r", [1])
+
+    runner = CliRunner()
+    result = runner.invoke(command, ["-v"])
+    assert result.exit_code == 0, result.output
+    data_list = [json.loads(line) for line in result.stderr.splitlines()]
+    assert [d["message"] for d in data_list] == ["start", "dump [1]", "finished"]
+    assert data_list[-1]["command"] == "command"
+    assert "elapsed" in data_list[-1]
+    setup_logging()
+
+
+def test_cli_profile_flag_without_path():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--profile-cpu"])
+    assert result.exit_code == 2
+
+
+def test_env_command(monkeypatch):
+    # .envはenvvarを読む前に読み込まれている
+    monkeypatch.delenv("OPIME_NOTIFY_TEST_TOKEN", raising=False)
+    monkeypatch.setattr(
+        "dotenv.load_dotenv",
+        lambda: monkeypatch.setenv("OPIME_NOTIFY_TEST_TOKEN", "from-dotenv"),
+    )
+    ensure_env.cache_clear()
+
+    @click.command(cls=EnvCommand)
+    @click.option("--token", envvar="OPIME_NOTIFY_TEST_TOKEN")
+    def command(token):
+        click.echo(token)
+
+    runner = CliRunner()
+    try:
+        result = runner.invoke(command, [])
+    finally:
+        ensure_env.cache_clear()
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == "from-dotenv"
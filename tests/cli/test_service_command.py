@@ -0,0 +1,9 @@
+from click.testing import CliRunner
+
+from opime_notify.cli.service import cli
+
+
+def test_cli_service_help():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--help"])
+    assert result.exit_code == 0
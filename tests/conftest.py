@@ -0,0 +1,17 @@
+import pytest
+
+from opime_notify.circuit_breaker import reset_circuit_breaker
+from opime_notify.deadline import set_deadline
+from opime_notify.http_client import set_default_client
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    """
+    プロセス全体で共有するHTTPクライアント、回路遮断器、期限をテスト毎に戻す
+    前のテストの失敗で回路が開いたままになり、後のテストが失敗しないようにする
+    """
+    yield
+    set_default_client(None)
+    reset_circuit_breaker()
+    set_deadline(None)
@@ -0,0 +1,65 @@
+from opime_notify.fetch_schedule.crawler import IncrementalCrawler, SeenUrlIndex
+from opime_notify.fetch_schedule.session import OfficialSession
+
+
+def _mock_pages(requests_mock, session, page_list, category=1):
+    for page, id_list in enumerate(page_list, start=1):
+        links = "".join(
+            f'<a href="{session.NEWS_URL}/detail/{id}"></a>' for id in id_list
+        )
+        requests_mock.get(
+            f"{session.NEWS_URL}/articles/{page}/0/{category}",
+            text=f'<div class="news-block-inner">{links}</div>',
+        )
+
+
+def _url(session, id):
+    return f"{session.NEWS_URL}/detail/{id}"
+
+
+class TestSeenUrlIndex:
+    def test_save_load(self, tmp_path):
+        index = SeenUrlIndex(1, cache_dir=tmp_path, max_size=2)
+        index.update(["a", "b", "a", "c"])
+        assert len(index) == 3
+        index.save()
+        index = SeenUrlIndex(1, cache_dir=tmp_path)
+        assert index.url_list == ["b", "c"]
+        assert "a" not in index
+        assert "c" in index
+        assert len(SeenUrlIndex(2, cache_dir=tmp_path)) == 0
+
+
+class TestIncrementalCrawler:
+    def test_crawl_first_run(self, tmp_path, requests_mock):
+        s = OfficialSession()
+        _mock_pages(requests_mock, s, [[3, 2], [1]])
+        index = SeenUrlIndex(1, cache_dir=tmp_path)
+        crawler = IncrementalCrawler(s, index, max_pages=5)
+        assert crawler.crawl() == [_url(s, 3), _url(s, 2)]
+        assert requests_mock.call_count == 1
+
+    def test_crawl_until_seen(self, tmp_path, requests_mock):
+        s = OfficialSession()
+        _mock_pages(requests_mock, s, [[9, 8, 7], [6, 5, 4], [3, 2, 1]])
+        index = SeenUrlIndex(1, cache_dir=tmp_path)
+        index.update([_url(s, 5), _url(s, 4)])
+        crawler = IncrementalCrawler(s, index, max_pages=5)
+        assert crawler.crawl() == [_url(s, i) for i in [9, 8, 7, 6]]
+        assert requests_mock.call_count == 2
+
+    def test_crawl_pinned(self, tmp_path, requests_mock):
+        s = OfficialSession()
+        _mock_pages(requests_mock, s, [[1, 3, 2], [0]])
+        index = SeenUrlIndex(1, cache_dir=tmp_path)
+        index.update([_url(s, 1), _url(s, 2)])
+        crawler = IncrementalCrawler(s, index, max_pages=5)
+        assert crawler.crawl() == [_url(s, 3)]
+
+    def test_crawl_max_pages(self, tmp_path, requests_mock):
+        s = OfficialSession()
+        _mock_pages(requests_mock, s, [[6, 5], [4, 3], [2, 1]])
+        index = SeenUrlIndex(1, cache_dir=tmp_path)
+        index.update(["https://ngt48.jp/news/detail/old"])
+        crawler = IncrementalCrawler(s, index, max_pages=2)
+        assert crawler.crawl() == [_url(s, i) for i in [6, 5, 4, 3]]
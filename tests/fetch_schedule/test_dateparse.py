@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+from opime_notify.fetch_schedule.dateparse import (
+    parse_dot_date,
+    parse_jp_datetime,
+    parse_slash_datetime,
+    parse_time,
+)
+
+
+@pytest.mark.parametrize(
+    "text,year,expected",
+    [
+        ("2022年11月25日(金)12:00", None, datetime(2022, 11, 25, 12, 0)),
+        ("2022年11月25日12:00", 2030, datetime(2022, 11, 25, 12, 0)),
+        ("11月27日(日)23:59", 2022, datetime(2022, 11, 27, 23, 59)),
+        ("12月1日", 2022, datetime(2022, 12, 1)),
+        ("2月29日", 2024, datetime(2024, 2, 29)),
+    ],
+)
+def test_parse_jp_datetime(text, year, expected):
+    assert parse_jp_datetime(text, year=year) == expected
+
+
+@pytest.mark.parametrize(
+    "text,year",
+    [
+        ("12月1日", None),
+        ("13月1日", 2022),
+        ("12月1日(木)24:00", 2022),
+        ("12/1", 2022),
+        ("x12月1日", 2022),
+    ],
+)
+def test_parse_jp_datetime_error(text, year):
+    with pytest.raises(ValueError):
+        parse_jp_datetime(text, year=year)
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("12/3(土)15:00", datetime(2022, 12, 3, 15, 0)),
+        ("12/3 15:00", datetime(2022, 12, 3, 15, 0)),
+        ("1/5", datetime(2022, 1, 5)),
+    ],
+)
+def test_parse_slash_datetime(text, expected):
+    assert parse_slash_datetime(text, 2022) == expected
+
+
+def test_parse_dot_date():
+    assert parse_dot_date("2022.12.01") == datetime(2022, 12, 1)
+    with pytest.raises(ValueError):
+        parse_dot_date("2022.13.01")
+
+
+@pytest.mark.parametrize(
+    "text,expected", [("18:30", (18, 30)), ("9:05", (9, 5)), ("0:00", (0, 0))]
+)
+def test_parse_time(text, expected):
+    assert parse_time(text) == expected
+
+
+@pytest.mark.parametrize("text", ["24:00", "12:60", "1230"])
+def test_parse_time_error(text):
+    with pytest.raises(ValueError):
+        parse_time(text)
@@ -0,0 +1,31 @@
+import pytest
+
+from opime_notify.fetch_schedule.keyword_matcher import KeywordMatcher
+
+
+class TestKeywordMatcher:
+    @pytest.mark.parametrize(
+        "keywords,text_list,expected",
+        [
+            (["中井りか"], ["出演メンバー:中井りか、本間日陽"], True),
+            (["中井りか", "本間日陽"], ["出演メンバー:本間日陽"], True),
+            (["中井りか"], ["出演メンバー:本間日陽", "中井りか生誕祭"], True),
+            (["中井りか"], ["出演メンバー:本間日陽"], False),
+            ([], ["中井りか"], False),
+            # 正規表現の記号はそのまま扱う
+            (["a.b"], ["axb"], False),
+            (["a.b"], ["a.b"], True),
+        ],
+    )
+    def test_search(self, keywords, text_list, expected):
+        assert KeywordMatcher(keywords).search(*text_list) is expected
+
+    def test_findall(self):
+        matcher = KeywordMatcher(["中井", "中井りか", "本間日陽", "西潟茉莉奈"])
+        text = "中井りか、本間日陽、中井りか"
+        assert matcher.findall(text, "西潟茉莉奈") == {
+            "中井りか",
+            "本間日陽",
+            "西潟茉莉奈",
+        }
+        assert len(matcher) == 4
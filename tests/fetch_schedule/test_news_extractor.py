@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pytest
+
+from opime_notify.fetch_schedule.news_extractor import (
+    extract_news_detail,
+    extract_news_url_list,
+)
+from opime_notify.fetch_schedule.session import OfficialSession
+
+FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "ngt48"
+DETAIL_FIXTURE_LIST = [
+    "detail_theater.html",
+    "detail_otsale.html",
+    "detail_monthly_photo.html",
+]
+# 抽出の結果を比べる記事本文
+BODY_LIST = [
+    '<div class="title"><span>tag</span>title</div><div class="date">2021.08.23</div>',  # noqa: E501
+    '<div class="title">title</div><div class="date">2021.08.23 12:00</div>',
+    '<div class="title"><span>tag</span></div><div class="date">bad</div>',
+    '<div class="title"><b><span>t<i>a</i>g</span></b> title <i>x</i></div>'
+    '<div class="date">2021.08.23</div>',
+    '<div class="title"><span>tag</span><!--c-->title</div>'
+    '<div class="date">2021.08.23</div>',
+    '<div class="title"><span>tag</span><br>title</div>'
+    '<div class="date">2021.08.23</div>',
+    '<div class="title">title</div>',
+    '<div class="date">2021.08.23</div>',
+    '<div class="title x">A&amp;B &lt;C&gt;</div><div class="date">2021.08.23</div>'
+    '<div class="content"><p>line1<br>\nline2<br/>\n<script>var a = "<b>";'
+    "</script><style>p {}</style>&#x4e2d;<img src=x>end</p></div>",
+    '<div class="content"><div class="title">inner</div></div>'
+    '<div class="date">2021.08.23</div><div class="title">outer</div>',
+]
+
+
+def _wrap_body(body):
+    return (
+        '<html><body><div class="title">outside</div>'
+        f'<div class="news-block-inner">{body}</div>'
+        '<div class="content">outside</div></body></html>'
+    )
+
+
+def _soup_detail(htmltext, html_parser="html.parser"):
+    s = OfficialSession(html_parser=html_parser)
+    return s._parse_news_body(s._find_news_body(htmltext))
+
+
+def _assert_same_schedule(a, b):
+    if a is None or b is None:
+        assert a is None and b is None
+        return
+    assert a.title == b.title
+    assert a.date == b.date
+    assert a.type == b.type
+    assert a.description == b.description
+
+
+@pytest.mark.parametrize("filename", DETAIL_FIXTURE_LIST)
+def test_extract_news_detail_fixture(filename):
+    htmltext = (FIXTURE_DIR / filename).read_text(encoding="utf-8")
+    schedule = extract_news_detail(htmltext)
+    assert schedule is not None
+    _assert_same_schedule(schedule, _soup_detail(htmltext))
+
+
+@pytest.mark.parametrize("body", BODY_LIST)
+def test_extract_news_detail_equivalence(body):
+    htmltext = _wrap_body(body)
+    _assert_same_schedule(extract_news_detail(htmltext), _soup_detail(htmltext))
+
+
+@pytest.mark.parametrize(
+    "htmltext",
+    [(FIXTURE_DIR / f).read_text(encoding="utf-8") for f in DETAIL_FIXTURE_LIST]
+    + [_wrap_body(b) for b in BODY_LIST],
+)
+def test_lxml_equivalence(htmltext):
+    # --html-parser lxml を指定した時もhtml.parserと同じ結果になる
+    pytest.importorskip("lxml")
+    _assert_same_schedule(_soup_detail(htmltext, "lxml"), _soup_detail(htmltext))
+
+
+def test_extract_news_detail_no_body():
+    assert extract_news_detail("<div>text</div>") is None
+
+
+def test_extract_news_url_list_fixture():
+    s = OfficialSession(html_parser="html.parser")
+    htmltext = (FIXTURE_DIR / "list_page.html").read_text(encoding="utf-8")
+    news_list_el = s._find_news_body(htmltext)("a", href=s._get_link_pattern())
+    expect_url_list = s.get_detail_url_list(news_list_el)
+    url_list = extract_news_url_list(htmltext, s._get_link_pattern())
+    assert len(url_list) == 20
+    assert url_list == expect_url_list
+
+
+def test_fetch_detail_stream(requests_mock):
+    s = OfficialSession(extractor="stream")
+    htmltext = (FIXTURE_DIR / "list_page.html").read_text(encoding="utf-8")
+    requests_mock.get(f"{s.NEWS_URL}/articles/1/0/1", text=htmltext)
+    url_list = s.fetch_detail_url_list(page=1, category=1)
+    assert len(url_list) == 20
+    htmltext = (FIXTURE_DIR / "detail_theater.html").read_text(encoding="utf-8")
+    requests_mock.get(url_list[0], text=htmltext)
+    schedule = s.fetch_schedule_detail(url_list[0])
+    _assert_same_schedule(schedule, _soup_detail(htmltext))
+
+
+def test_unknown_extractor():
+    with pytest.raises(ValueError):
+        OfficialSession(extractor="unknown")
+    with pytest.raises(ValueError):
+        OfficialSession(html_parser="unknown")
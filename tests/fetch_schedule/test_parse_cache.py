@@ -0,0 +1,101 @@
+from datetime import datetime
+from pathlib import Path
+
+from opime_notify.fetch_schedule import Schedule
+from opime_notify.fetch_schedule.news_extractor import extract_news_detail
+from opime_notify.fetch_schedule.parse_cache import (
+    ParseCache,
+    cached_parse,
+    decode_schedule_list,
+    encode_schedule_list,
+)
+from opime_notify.fetch_schedule.theater_parser import (
+    TheaterNewsParser,
+    TheaterSchedule,
+)
+
+FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "ngt48"
+
+
+def _fixture_schedule() -> Schedule:
+    htmltext = (FIXTURE_DIR / "detail_theater.html").read_text(encoding="utf-8")
+    schedule = extract_news_detail(htmltext)
+    assert schedule is not None
+    return schedule
+
+
+class CountParser:
+    VERSION = 1
+    count = 0
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+
+    def parse(self, verbose=False):
+        CountParser.count += 1
+        return [
+            TheaterSchedule(
+                title=self.schedule.title,
+                date=datetime(2022, 5, 1, 18, 0),
+                type="劇場公演",
+                description="",
+                offer_start_date=datetime(2022, 4, 20, 12, 0),
+                offer_end_date=None,
+            )
+        ]
+
+
+class TestParseCache:
+    def test_encode_decode(self):
+        schedule_list = TheaterNewsParser(_fixture_schedule()).parse()
+        record_list = encode_schedule_list(schedule_list)
+        assert record_list is not None
+        result = decode_schedule_list(record_list)
+        assert [s.__dict__ for s in result] == [s.__dict__ for s in schedule_list]
+
+    def test_encode_unknown(self):
+        schedule = Schedule(title="t", date=None, type="", description="")
+        assert encode_schedule_list([schedule]) is None
+
+    def test_cached_parse(self, tmp_path):
+        CountParser.count = 0
+        cache = ParseCache(cache_dir=tmp_path)
+        schedule = Schedule(title="t", date=None, type="", description="d")
+        first = cached_parse(cache, CountParser, schedule)
+        second = cached_parse(cache, CountParser, schedule)
+        assert CountParser.count == 1
+        assert cache.hits == 1 and cache.misses == 1
+        assert [s.__dict__ for s in first] == [s.__dict__ for s in second]
+
+        other = Schedule(title="t", date=None, type="", description="changed")
+        cached_parse(cache, CountParser, other)
+        assert CountParser.count == 2
+
+        cache.save()
+        cache = ParseCache(cache_dir=tmp_path)
+        cached_parse(cache, CountParser, schedule)
+        assert CountParser.count == 2
+
+    def test_cached_parse_theater(self, tmp_path):
+        expected = TheaterNewsParser(_fixture_schedule()).parse()
+        cache = ParseCache(cache_dir=tmp_path)
+        cached_parse(cache, TheaterNewsParser, _fixture_schedule())
+        result = cached_parse(cache, TheaterNewsParser, _fixture_schedule())
+        assert cache.hits == 1
+        assert [s.__dict__ for s in result] == [s.__dict__ for s in expected]
+
+    def test_save_max_entries(self, tmp_path):
+        cache = ParseCache(cache_dir=tmp_path, max_entries=2)
+        for i in range(3):
+            cache.set(f"key{i}", [])
+            cache.entry_dict[f"key{i}"]["t"] = i
+        cache.save()
+        cache = ParseCache(cache_dir=tmp_path)
+        assert sorted(cache.entry_dict) == ["key1", "key2"]
+
+    def test_no_cache(self):
+        CountParser.count = 0
+        schedule = Schedule(title="t", date=None, type="", description="d")
+        cached_parse(None, CountParser, schedule)
+        cached_parse(None, CountParser, schedule)
+        assert CountParser.count == 2
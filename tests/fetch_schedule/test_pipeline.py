@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from opime_notify.fetch_schedule.monthly_photo_parser import MonthlyPhotoSchedule
+from opime_notify.fetch_schedule.otsale_parser import OTSaleSchedule
+from opime_notify.fetch_schedule.pipeline import (
+    filter_news_schedule,
+    iter_notify_schedule,
+    take_until,
+    tap,
+)
+from opime_notify.fetch_schedule.session import OfficialSession
+from opime_notify.fetch_schedule.theater_parser import TheaterSchedule
+
+FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "ngt48"
+
+
+def _future(days: int) -> datetime:
+    return datetime.now() + timedelta(days=days)
+
+
+def test_filter_news_schedule():
+    schedule_list = [
+        TheaterSchedule("A", _future(3), "theater", "中井りか"),
+        TheaterSchedule("B", _future(3), "theater", "本間日陽"),
+        TheaterSchedule("C", _future(-3), "theater", "中井りか"),
+        OTSaleSchedule("D", None, "リリース", "", sale_end=_future(3)),
+        OTSaleSchedule("E", None, "リリース", "", sale_end=_future(-3)),
+        MonthlyPhotoSchedule("F", None, "グッズ", "", start_date=_future(3)),
+        MonthlyPhotoSchedule("G", None, "グッズ", "", start_date=None),
+    ]
+    result = filter_news_schedule(
+        schedule_list, keywords=["中井りか"], start_date=datetime.now()
+    )
+    assert [s.title for s in result] == ["A", "D", "F"]
+
+
+def test_pipeline_is_lazy():
+    def schedule_iter():
+        yield TheaterSchedule("A", _future(3), "theater", "中井りか")
+        raise RuntimeError("crawl is not finished")
+
+    seen = []
+    target_iter = tap(
+        filter_news_schedule(schedule_iter(), keywords=["中井りか"]), seen.append
+    )
+    notify_iter = iter_notify_schedule(target_iter)
+    notify_schedule = next(notify_iter)
+    assert notify_schedule.title == "A"
+    assert [s.title for s in seen] == ["A"]
+    with pytest.raises(RuntimeError):
+        list(notify_iter)
+
+
+def test_take_until():
+    seen: list[int] = []
+    item_iter = tap(take_until(range(10), lambda: len(seen) >= 3), seen.append)
+    assert list(item_iter) == [0, 1, 2]
+    assert seen == [0, 1, 2]
+
+
+def test_iter_news_schedule_detail_is_lazy(requests_mock):
+    s = OfficialSession(max_workers=1)
+    url_list = []
+    for name in ["detail_theater", "detail_otsale", "detail_monthly_photo"]:
+        url = f"{s.NEWS_URL}/detail/{name}"
+        text = (FIXTURE_DIR / f"{name}.html").read_text(encoding="utf-8")
+        requests_mock.get(url, text=text)
+        url_list.append(url)
+    schedule_iter = s.iter_news_schedule_detail(url_list)
+    assert isinstance(next(schedule_iter), TheaterSchedule)
+    assert requests_mock.call_count == 1
+    rest = list(schedule_iter)
+    assert len(rest) == 8
+    assert requests_mock.call_count == 3
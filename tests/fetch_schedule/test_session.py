@@ -1,4 +1,7 @@
+import re
+import time
 from datetime import datetime
+from pathlib import Path
 
 import pytest
 from bs4 import BeautifulSoup
@@ -6,18 +9,70 @@ from bs4.element import Tag
 from requests.exceptions import HTTPError
 
 from opime_notify.fetch_schedule import Schedule
-from opime_notify.fetch_schedule.session import OfficialSession
-from opime_notify.fetch_schedule.theater_parser import TheaterSchedule
+from opime_notify.fetch_schedule.monthly_photo_parser import (
+    MonthlyPhotoParser,
+    MonthlyPhotoSchedule,
+)
+from opime_notify.fetch_schedule.otsale_parser import OTSaleNewsParser, OTSaleSchedule
+from opime_notify.fetch_schedule.session import (
+    OfficialSession,
+    get_news_parser,
+    release_tree,
+)
+from opime_notify.fetch_schedule.theater_parser import (
+    TheaterNewsParser,
+    TheaterSchedule,
+)
+
+FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "ngt48"
+
+
+def _html_parser_list():
+    parser_list = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+
+        parser_list.append("lxml")
+    except ImportError:
+        parser_list.append(
+            pytest.param("lxml", marks=pytest.mark.skip("lxml is not installed"))
+        )
+    return parser_list
 
 
 class TestOfficialSession:
-    def test_find_news_body(self):
+    @pytest.mark.parametrize("html_parser", _html_parser_list())
+    def test_find_news_body(self, html_parser):
         test_text = '<div class="news-block-inner">text</div>'
-        s = OfficialSession()
+        s = OfficialSession(html_parser=html_parser)
         res = s._find_news_body(test_text)
         assert isinstance(res, Tag)
         assert res.text == "text"
 
+    @pytest.mark.parametrize("html_parser", _html_parser_list())
+    def test_find_news_body_fixture(self, html_parser):
+        test_text = (FIXTURE_DIR / "list_page.html").read_text(encoding="utf-8")
+        s = OfficialSession(html_parser=html_parser)
+        res = s._find_news_body(test_text)
+        assert isinstance(res, Tag)
+        assert len(res("a", href=re.compile(f"{s.NEWS_URL}/detail/*"))) == 20
+        # カテゴリ一覧などnews-block-inner外の要素は含まない
+        assert res.find("aside") is None
+        release_tree(res)
+        assert res.decomposed
+
+    def test_fetch_schedule_detail_fixture(self, requests_mock):
+        mock_url = "https://ngt48.jp/news/detail/100234"
+        test_text = (FIXTURE_DIR / "detail_theater.html").read_text(encoding="utf-8")
+        requests_mock.get(mock_url, text=test_text)
+        s = OfficialSession()
+        schedule = s.fetch_schedule_detail(mock_url)
+        assert isinstance(schedule, Schedule)
+        assert schedule.type == "劇場"
+        assert schedule.title.endswith("NGT48劇場公演スケジュールのご案内")
+        assert schedule.date == datetime(2022, 11, 24)
+        assert schedule.description.startswith("NGT48劇場")
+
     @pytest.mark.parametrize(
         "title_text,expect_tagname,expect_title",
         [
@@ -113,3 +168,62 @@ class TestOfficialSession:
         assert slist[0].title == "title"
         assert slist[0].date == datetime(2021, 8, 23)
         assert slist[0].type == "test"
+
+    @pytest.mark.parametrize("max_workers", [1, 3])
+    def test_iter_schedule_detail_order(self, max_workers):
+        s = OfficialSession(max_workers=max_workers)
+        url_list = [f"{s.NEWS_URL}/detail/{i}" for i in range(10)]
+
+        def dummy_schedule_detail(url, verbose=False):
+            i = int(url.split("/")[-1])
+            time.sleep(0.001 * (10 - i))
+            return Schedule(title=url, date=None, type="test")
+
+        s.fetch_schedule_detail = dummy_schedule_detail
+        slist = list(s.iter_schedule_detail(url_list))
+        assert [schedule.title for schedule in slist] == url_list
+
+    def test_iter_schedule_detail_error(self, requests_mock):
+        s = OfficialSession(max_workers=2)
+        url_list = [f"{s.NEWS_URL}/detail/{i}" for i in range(5)]
+        for url in url_list:
+            requests_mock.get(url, status_code=500)
+        with pytest.raises(HTTPError):
+            list(s.iter_schedule_detail(url_list))
+
+    def test_fetch_news_schedule_detail(self, requests_mock):
+        s = OfficialSession()
+        url_list = []
+        for name in ["detail_theater", "detail_otsale", "detail_monthly_photo"]:
+            url = f"{s.NEWS_URL}/detail/{name}"
+            text = (FIXTURE_DIR / f"{name}.html").read_text(encoding="utf-8")
+            requests_mock.get(url, text=text)
+            url_list.append(url)
+        slist = s.fetch_news_schedule_detail(url_list)
+        expected = [TheaterSchedule] * 6 + [OTSaleSchedule] * 2
+        expected.append(MonthlyPhotoSchedule)
+        assert [type(schedule) for schedule in slist] == expected
+
+
+@pytest.mark.parametrize(
+    "title,parser_cls",
+    [
+        (
+            "2022年12月1日（木）～12月6日（火）NGT48劇場公演スケジュールのご案内",
+            TheaterNewsParser,
+        ),
+        (
+            "NGT48 8thシングル「Awesome」劇場盤 オンラインおしゃべり会 追加受付のお知らせ",
+            OTSaleNewsParser,
+        ),
+        ("NGT48 2022年12月度 個別生写真 予約販売のお知らせ", MonthlyPhotoParser),
+        ("NGT48 ライブ開催決定のお知らせ", None),
+    ],
+)
+def test_get_news_parser(title, parser_cls):
+    news_parser = get_news_parser(Schedule(title=title, date=None, type=""))
+    if parser_cls is None:
+        assert news_parser is None
+    else:
+        assert news_parser is not None
+        assert news_parser[0] is parser_cls
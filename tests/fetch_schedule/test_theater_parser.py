@@ -0,0 +1,123 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from opime_notify.fetch_schedule.news_extractor import extract_news_detail
+from opime_notify.fetch_schedule.theater_parser import (
+    TheaterNewsParser,
+    TheaterSchedule,
+    filter_theater_schedule_list,
+    schedule_to_theater_schedule,
+)
+
+FIXTURE_DIR = Path(__file__).parent.parent / "fixtures" / "ngt48"
+TITLE = "2022年12月1日(木)~12月6日(火)NGT48劇場公演スケジュールのご案内"
+
+
+def _parse(description: str) -> list[TheaterSchedule]:
+    schedule = TheaterSchedule(TITLE, datetime(2022, 11, 20), "劇場", description)
+    return TheaterNewsParser(schedule).parse()
+
+
+class TestTheaterNewsParser:
+    def test_parse_fixture(self):
+        htmltext = (FIXTURE_DIR / "detail_theater.html").read_text(encoding="utf-8")
+        schedule = extract_news_detail(htmltext)
+        assert schedule is not None
+        parser = TheaterNewsParser(schedule_to_theater_schedule(schedule))
+        result = parser.parse()
+        assert [(s.title, s.date) for s in result] == [
+            ("チームNIII「パジャマドライブ」公演", datetime(2022, 12, 1, 18, 30)),
+            ("研究生「PARTYが始まるよ」公演【昼公演】", datetime(2022, 12, 3, 13, 0)),
+            ("チームG「逆上がり」公演【夜公演】", datetime(2022, 12, 3, 17, 0)),
+            (
+                "チームNIII「パジャマドライブ」公演【昼公演】",
+                datetime(2022, 12, 4, 12, 0),
+            ),
+            ("研究生「PARTYが始まるよ」公演【夜公演】", datetime(2022, 12, 4, 16, 30)),
+            ("チームG「逆上がり」公演", datetime(2022, 12, 6, 18, 30)),
+        ]
+        now_year = datetime.now().year
+        for s in result:
+            assert s.description.startswith("出演メンバー:")
+            assert s.offer_start_date == datetime(2022, 11, 25, 12, 0)
+            assert s.offer_end_date == datetime(now_year, 11, 27, 23, 59)
+            assert s.result_date == datetime(now_year, 11, 28, 18, 0)
+
+    @pytest.mark.parametrize(
+        "description,expected",
+        [
+            # 行の途中の●でも日付が区切られる
+            (
+                "●12月1日(木)\n18:30開演 夜公演\n演目:A●12月2日(金)\n昼公演 13:00\n演目:B",
+                [("A【夜公演】", 1, 18), ("B【昼公演】", 2, 13)],
+            ),
+            # 空行が続いても1つの区切りとして扱う
+            (
+                "●12月3日(土)\n昼公演 13:00\n演目:A\n\n\n\n夜公演 17:00\n演目:B",
+                [("A【昼公演】", 3, 13), ("B【夜公演】", 3, 17)],
+            ),
+            # 休館日を含む日は無視する
+            ("●12月2日(金)\n休館日\n12月2日(金)18:30開演\n演目:A", []),
+            # 開演時刻の無い公演は無視する
+            ("●12月4日(日)\n演目:A", []),
+            # 【チケット申込について】以降は公演として扱わない
+            (
+                "【チケット申込について】\n●12月5日(月)\n12月5日(月)18:30開演\n演目:A",
+                [],
+            ),
+        ],
+    )
+    def test_parse_sections(self, description, expected):
+        result = _parse(description)
+        assert [(s.title, s.date.day, s.date.hour) for s in result] == expected
+
+    def test_parse_offer_date_last(self):
+        description = """●12月1日(木)
+12月1日(木)18:30開演
+演目:A
+
+申込期間:2022年11月1日(火)12:00~11月2日(水)23:59まで
+
+申込期間:2022年11月25日(金)12:00~11月27日(日)23:59まで
+当落発表は11月28日(月)18:00まで
+"""
+        result = _parse(description)
+        assert len(result) == 1
+        assert result[0].offer_start_date == datetime(2022, 11, 25, 12, 0)
+        assert result[0].result_date is not None
+        assert result[0].result_date.day == 28
+
+    def test_parse_special(self):
+        schedule = TheaterSchedule(
+            "特別公演のお知らせ", datetime(2022, 11, 20), "劇場", ""
+        )
+        parser = TheaterNewsParser(schedule)
+        assert parser.news_type == "special"
+        assert parser.parse() == []
+
+
+class TestFilterTheaterScheduleList:
+    def _schedule(self, title, description, day=1):
+        return TheaterSchedule(title, datetime(2022, 12, day), "theater", description)
+
+    def test_filter_unique(self):
+        slist = [
+            self._schedule("A", "出演メンバー:中井りか、本間日陽"),
+            self._schedule("B", "出演メンバー:西潟茉莉奈"),
+            self._schedule("中井りか生誕祭", ""),
+        ]
+        result = filter_theater_schedule_list(slist, keywords=["中井りか", "本間日陽"])
+        assert [s.title for s in result] == ["A", "中井りか生誕祭"]
+
+    def test_filter_start_date(self):
+        slist = [
+            self._schedule("A", "中井りか", day=1),
+            self._schedule("B", "中井りか", day=3),
+        ]
+        result = filter_theater_schedule_list(
+            slist, keywords=["中井りか"], start_date=datetime(2022, 12, 2)
+        )
+        assert [s.title for s in result] == ["B"]
+        assert filter_theater_schedule_list(slist) == []
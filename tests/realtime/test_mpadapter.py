@@ -0,0 +1,135 @@
+from datetime import datetime
+
+import pytest
+
+from opime_notify.realtime.mpadapter import SEEN_KEY, MPAdapter, MPArticle
+from opime_notify.realtime.seen_index import SeenIdIndex
+
+HEADERS = ["id", "title", "date", "code", "name", "name_kana"]
+
+
+class FakeGsession:
+    def __init__(self, headers: list[str], table: list[list]):
+        self.headers = headers
+        self.table = table
+
+    def fetch_curr_article(self, sheet_name: str) -> list[dict]:
+        return [dict(zip(self.headers, row)) for row in self.table]
+
+    def fetch_headers(self, sheet_name: str) -> list[str]:
+        return list(self.headers)
+
+    def write_headers(self, headers: list[str], sheet_name: str) -> None:
+        self.headers = headers
+
+    def clear_schedule(self, sheet_name: str) -> None:
+        self.table = []
+
+    def write_table(self, table: list[list], sheet_name: str) -> None:
+        # Sheetsと同じく先頭の'は値に残らない
+        self.table = [[str(v).removeprefix("'") for v in row] for row in table]
+
+
+def _row(id: int) -> list:
+    return [id, f"[code{id}]name{id}", "2022/12/01 00:00:00", f"code{id}", "", ""]
+
+
+def _article(id: int) -> MPArticle:
+    return MPArticle(
+        title=f"[code{id}]name{id}",
+        date=datetime(2022, 12, 1),
+        code=f"code{id}",
+        id=id,
+        name=f"name{id}",
+    )
+
+
+class TestSeenIdIndex:
+    def test_contains(self):
+        index = SeenIdIndex([5, 1, 3])
+        assert 1 in index
+        assert 3 in index
+        assert 2 not in index
+        assert 6 not in index
+
+    def test_floor(self):
+        index = SeenIdIndex([10], floor=5)
+        assert 1 in index
+        assert 5 in index
+        assert 6 not in index
+        assert 10 in index
+
+    def test_update(self):
+        index = SeenIdIndex([1])
+        index.update([4, 2, 2])
+        index.add(3)
+        assert list(index.ids) == [1, 2, 3, 4]
+
+    def test_difference(self):
+        index = SeenIdIndex([1, 2, 5])
+        assert index.difference([5, 3, 1, 4, 3]) == [3, 4]
+
+    @pytest.mark.parametrize(
+        "ids,floor,expect",
+        [
+            ([], 0, ""),
+            ([1, 2, 3, 5, 7, 8], 0, "1-3,5,7-8"),
+            ([12], 10, "-10,12"),
+        ],
+    )
+    def test_encode(self, ids, floor, expect):
+        assert SeenIdIndex(ids, floor=floor).encode() == expect
+        decoded = SeenIdIndex.decode(expect)
+        assert decoded.floor == floor
+        assert list(decoded.ids) == sorted(ids)
+
+
+class TestMPAdapter:
+    def test_filter_notify_article_list_backfill(self):
+        adapter = MPAdapter()
+        gsession = FakeGsession(HEADERS + [SEEN_KEY], [_row(10) + ["1,3,10"]])
+        curr_article_list = adapter.fetch_curr_article(gsession)
+        article_list = [_article(i) for i in [1, 2, 3, 10, 11]]
+        result = adapter.filter_notify_article_list(curr_article_list, article_list)
+        assert [a.id for a in result] == [2, 11]
+
+    @pytest.mark.parametrize("id_list", [[10], [3, 10]])
+    def test_filter_notify_article_list_legacy(self, id_list):
+        # seen列のないシートは保存されているID以下を確認済みとみなす
+        adapter = MPAdapter()
+        gsession = FakeGsession(HEADERS, [_row(i) for i in id_list])
+        curr_article_list = adapter.fetch_curr_article(gsession)
+        article_list = [_article(i) for i in [2, 10, 11]]
+        result = adapter.filter_notify_article_list(curr_article_list, article_list)
+        assert [a.id for a in result] == [11]
+
+    def test_regist_article(self):
+        adapter = MPAdapter()
+        gsession = FakeGsession(HEADERS, [_row(10)])
+        curr_article_list = adapter.fetch_curr_article(gsession)
+        adapter.fetched_article_list = [_article(i) for i in [2, 10, 11, 13]]
+        notify_article_list = adapter.filter_notify_article_list(
+            curr_article_list, adapter.fetched_article_list
+        )
+        adapter.regist_article(notify_article_list + curr_article_list, gsession)
+        # 以前の形式のシートにはseen列を足し、最大IDの1行だけ残す
+        assert gsession.headers == HEADERS + [SEEN_KEY]
+        assert len(gsession.table) == 1
+        assert gsession.table[0][0] == "13"
+        assert gsession.table[0][-1] == "-10,11,13"
+
+        adapter = MPAdapter()
+        adapter.fetch_curr_article(gsession)
+        assert 12 not in adapter.seen_index
+        assert 13 in adapter.seen_index
+
+    def test_filter_notify_article_list_empty(self):
+        adapter = MPAdapter()
+        article_list = [_article(1)]
+        assert adapter.filter_notify_article_list([], article_list) == article_list
+
+    def test_filter_seen_article(self):
+        adapter = MPAdapter()
+        adapter.fetched_article_list = [_article(i) for i in [3, 1, 2]]
+        result = adapter.filter_seen_article([_article(4), _article(1)])
+        assert [a.id for a in result] == [1, 2, 3, 4]
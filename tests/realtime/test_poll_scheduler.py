@@ -0,0 +1,107 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from opime_notify.realtime.poll_scheduler import AdaptivePollScheduler
+
+
+def _scheduler(tmp_path) -> AdaptivePollScheduler:
+    return AdaptivePollScheduler(
+        min_interval=timedelta(minutes=5),
+        max_interval=timedelta(minutes=60),
+        cache_dir=tmp_path,
+    )
+
+
+class TestAdaptivePollScheduler:
+    def test_first_poll_is_due(self, tmp_path):
+        scheduler = _scheduler(tmp_path)
+        assert scheduler.is_due("key", datetime(2022, 12, 1, 3, 0))
+
+    def test_backoff(self, tmp_path):
+        scheduler = _scheduler(tmp_path)
+        now = datetime(2022, 12, 1, 3, 0)
+        intervals = []
+        for _ in range(6):
+            scheduler.record("key", changed=False, now=now)
+            intervals.append(scheduler.get_interval("key"))
+        assert intervals == [
+            timedelta(minutes=10),
+            timedelta(minutes=20),
+            timedelta(minutes=40),
+            timedelta(minutes=60),
+            timedelta(minutes=60),
+            timedelta(minutes=60),
+        ]
+        assert not scheduler.is_due("key", now + timedelta(minutes=59))
+        assert scheduler.is_due("key", now + timedelta(minutes=60))
+
+    def test_changed_resets_interval(self, tmp_path):
+        scheduler = _scheduler(tmp_path)
+        now = datetime(2022, 12, 1, 3, 0)
+        for _ in range(3):
+            scheduler.record("key", changed=False, now=now)
+        scheduler.record("key", changed=True, now=now)
+        assert scheduler.get_interval("key") == timedelta(minutes=5)
+        assert scheduler.get_history("key") == [now]
+
+    def test_hot_window(self, tmp_path):
+        scheduler = _scheduler(tmp_path)
+        # 3週続けて木曜12時頃に更新
+        for week in [2, 1, 0]:
+            changed_at = datetime(2022, 12, 1, 12, 0) - timedelta(days=7 * week)
+            scheduler.record("key", changed=True, now=changed_at)
+        for _ in range(5):
+            scheduler.record("key", changed=False, now=changed_at)
+        assert scheduler.is_hot("key", changed_at + timedelta(days=7, minutes=30))
+        assert not scheduler.is_hot("key", changed_at + timedelta(days=7, hours=3))
+        # 1回だけの一致では当てはまらない
+        assert not scheduler.is_hot("key", datetime(2023, 1, 17, 11, 30))
+        # 更新の多い時間帯は間隔に関わらず取得する
+        now = changed_at + timedelta(days=7, hours=-1)
+        scheduler.record("key", changed=False, now=now)
+        assert scheduler.get_next_poll("key") == now + timedelta(minutes=5)
+        now = changed_at + timedelta(days=7, hours=3)
+        scheduler.record("key", changed=False, now=now)
+        assert not scheduler.is_due("key", now + timedelta(minutes=30))
+
+    def test_hot_day_of_month(self, tmp_path):
+        scheduler = _scheduler(tmp_path)
+        for month in [9, 10, 11]:
+            scheduler.record("key", changed=True, now=datetime(2022, month, 1, 12, 0))
+        assert scheduler.is_hot("key", datetime(2022, 12, 1, 11, 30))
+        assert not scheduler.is_hot("key", datetime(2022, 12, 2, 11, 30))
+
+    def test_irregular_history_backoff(self, tmp_path):
+        # 1年に散らばった50回の更新では、ほとんどの時刻は更新の多い時間帯にならない
+        scheduler = _scheduler(tmp_path)
+        rand = random.Random(0)
+        start = datetime(2022, 1, 1)
+        for _ in range(50):
+            changed_at = start + timedelta(seconds=rand.randrange(365 * 86400))
+            scheduler.record("key", changed=True, now=changed_at)
+        week_start = datetime(2023, 1, 2)
+        hour_list = [week_start + timedelta(hours=h) for h in range(24 * 7)]
+        hot_list = [h for h in hour_list if scheduler.is_hot("key", h)]
+        assert len(hot_list) < len(hour_list) * 0.1
+        now = next(h for h in hour_list if not scheduler.is_hot("key", h))
+        for _ in range(2):
+            scheduler.record("key", changed=False, now=now)
+        assert scheduler.get_interval("key") == timedelta(minutes=20)
+        assert not scheduler.is_due("key", now + timedelta(minutes=10))
+
+    def test_save_load(self, tmp_path):
+        scheduler = _scheduler(tmp_path)
+        now = datetime(2022, 12, 1, 3, 0)
+        scheduler.record("key", changed=True, now=now)
+        scheduler.save()
+        assert _scheduler(tmp_path).get_next_poll("key") == now + timedelta(minutes=5)
+
+    def test_invalid_interval(self, tmp_path):
+        with pytest.raises(ValueError):
+            AdaptivePollScheduler(
+                min_interval=timedelta(hours=1),
+                max_interval=timedelta(minutes=1),
+                cache_dir=tmp_path,
+            )
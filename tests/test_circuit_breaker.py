@@ -0,0 +1,71 @@
+import pytest
+
+from opime_notify.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    get_circuit_breaker,
+    reset_circuit_breaker,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError()
+
+
+def test_circuit_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        "example.com", failure_threshold=2, cooldown=60, clock=clock
+    )
+    fail(breaker)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == 60
+
+    # cooldownの後は1回だけ試す
+    clock.now = 60
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    # 試しに失敗したらすぐに開き直す
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 120
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+    assert breaker.failure_count == 0
+
+
+def test_circuit_breaker_is_failure():
+    breaker = CircuitBreaker("example.com", failure_threshold=1)
+    with pytest.raises(KeyError):
+        with breaker.guard(lambda error: not isinstance(error, KeyError)):
+            raise KeyError()
+    assert breaker.state == CLOSED
+
+
+def test_get_circuit_breaker():
+    breaker = get_circuit_breaker("test")
+    assert get_circuit_breaker("test") is breaker
+    reset_circuit_breaker("test")
+    assert get_circuit_breaker("test") is not breaker
+    reset_circuit_breaker()
@@ -0,0 +1,44 @@
+import pytest
+
+from opime_notify.deadline import (
+    MIN_TIMEOUT,
+    Deadline,
+    clamp_timeout,
+    is_expired,
+    set_deadline,
+)
+
+
+def test_deadline():
+    now_list = [0.0]
+    deadline = Deadline(10, clock=lambda: now_list[0])
+    assert deadline.remaining() == 10
+    assert deadline.clamp_timeout((5.0, 30.0)) == (5.0, 10.0)
+    now_list[0] = 8
+    assert deadline.clamp_timeout(30.0) == pytest.approx(2.0)
+    assert not deadline.is_expired()
+    now_list[0] = 11
+    assert deadline.is_expired()
+    assert deadline.remaining() == 0
+    # 期限を過ぎても始めた通信は少しだけ待つ
+    assert deadline.clamp_timeout(30.0) == MIN_TIMEOUT
+
+
+def test_deadline_unbounded_timeout():
+    # Noneのタイムアウトは無制限なので残り時間にする
+    deadline = Deadline(10, clock=lambda: 0.0)
+    assert deadline.clamp_timeout(None) == 10
+    assert deadline.clamp_timeout((5.0, None)) == (5.0, 10.0)
+    assert deadline.clamp_timeout((None, None)) == (10.0, 10.0)
+
+
+def test_default_deadline():
+    assert not is_expired()
+    assert clamp_timeout(30.0) == 30.0
+    assert clamp_timeout(None) is None
+    set_deadline(Deadline(0))
+    try:
+        assert is_expired()
+        assert clamp_timeout(30.0) == MIN_TIMEOUT
+    finally:
+        set_deadline(None)
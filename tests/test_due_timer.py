@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from opime_notify.due_timer import DueTimer
+from opime_notify.schedule import NotifySchedule
+
+
+def _schedule(title: str, date: datetime) -> NotifySchedule:
+    return NotifySchedule(
+        id=0, title=title, date=date.strftime(NotifySchedule.date_format)
+    )
+
+
+def test_due_timer():
+    now = datetime(2022, 12, 1, 12, 0)
+    timer = DueTimer()
+    called = []
+    timer.add_listener(lambda: called.append(len(timer)))
+    count = timer.add_all(
+        [
+            _schedule("c", now + timedelta(hours=1)),
+            _schedule("a", now - timedelta(minutes=1)),
+            _schedule("b", now),
+            _schedule("a", now - timedelta(minutes=1)),
+        ]
+    )
+    assert count == 3
+    assert called == [3]
+    assert timer.add(_schedule("b", now)) is False
+    assert called == [3]
+    assert timer.next_due() == now - timedelta(minutes=1)
+
+    assert [s.title for s in timer.pop_due(now)] == ["a"]
+    assert [s.title for s in timer.pop_due(now + timedelta(seconds=1))] == ["b"]
+    assert timer.pop_due(now + timedelta(seconds=1)) == []
+    assert timer.next_due() == now + timedelta(hours=1)
+    # 取り出した予定は再び追加できる
+    assert timer.add(_schedule("a", now - timedelta(minutes=1))) is True
+    assert len(timer) == 2
+
+
+def test_due_timer_empty():
+    timer = DueTimer()
+    assert timer.next_due() is None
+    assert timer.pop_due() == []
@@ -0,0 +1,63 @@
+from typing import Optional
+
+from opime_notify.fingerprint import (
+    FingerprintStore,
+    fingerprint_body,
+    fingerprint_projection,
+)
+from opime_notify.realtime import BaseAdapter
+
+
+class DummyAdapter(BaseAdapter):
+    def __init__(self, body: str, projection: str):
+        super().__init__()
+        self.type = "DummyAdapter"
+        self.body = body
+        self.projection = projection
+        self.projection_called = False
+
+    def fetch_fingerprint(self) -> Optional[str]:
+        return fingerprint_body(self.body.encode())
+
+    def projection_fingerprint(self) -> Optional[str]:
+        self.projection_called = True
+        return fingerprint_projection([{"title": self.projection}], ["title"])
+
+    def fetch_notify_article_list(self, curr_article_list=None):
+        return []
+
+
+def test_fingerprint_projection():
+    a = fingerprint_projection([{"id": 1, "name": "a", "extra": 1}], ["id", "name"])
+    b = fingerprint_projection([{"name": "a", "id": 1, "extra": 2}], ["id", "name"])
+    c = fingerprint_projection([{"id": 2, "name": "a"}], ["id", "name"])
+    assert a == b
+    assert a != c
+
+
+def test_store_save_load(tmp_path):
+    store = FingerprintStore(tmp_path)
+    store.set("key", {"body": "abc"})
+    store.save()
+    assert FingerprintStore(tmp_path).get("key") == {"body": "abc"}
+    assert FingerprintStore(tmp_path).get("other") == {}
+
+
+def test_adapter_is_unchanged(tmp_path):
+    store = FingerprintStore(tmp_path)
+    adapter = DummyAdapter("body", "title")
+    assert adapter.is_unchanged(store) is False
+    adapter.regist_fingerprint(store)
+
+    adapter = DummyAdapter("body", "title")
+    assert adapter.is_unchanged(store) is True
+    assert adapter.projection_called is False
+
+    # 本文は変わったが必要な項目は変わっていない
+    adapter = DummyAdapter("body2", "title")
+    assert adapter.is_unchanged(store) is True
+    assert adapter.projection_called is True
+    adapter.regist_fingerprint(store)
+
+    adapter = DummyAdapter("body3", "title2")
+    assert adapter.is_unchanged(store) is False
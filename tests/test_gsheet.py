@@ -0,0 +1,25 @@
+import pytest
+import requests
+from gspread.exceptions import APIError
+
+from opime_notify.circuit_breaker import get_circuit_breaker
+from opime_notify.gsheet import SHEETS_HOST, GuardedClient
+from opime_notify.metrics import SHEET_CALLS
+
+URL = f"https://{SHEETS_HOST}/v4/spreadsheets/x"
+
+
+def test_guarded_client(requests_mock):
+    client = GuardedClient(None, session=requests.Session())
+    requests_mock.get(URL, json={})
+    requests_mock.post(f"{URL}:batchUpdate", status_code=503)
+    read_before = SHEET_CALLS.get(operation="read")
+    write_before = SHEET_CALLS.get(operation="write")
+
+    client.request("get", URL)
+    with pytest.raises(APIError):
+        client.request("post", f"{URL}:batchUpdate")
+    # APIの呼び出し1回ごとに数える
+    assert SHEET_CALLS.get(operation="read") == read_before + 1
+    assert SHEET_CALLS.get(operation="write") == write_before + 1
+    assert get_circuit_breaker(SHEETS_HOST).failure_count == 1
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from opime_notify.http_archive import ArchiveMissError, HttpArchive
+from opime_notify.http_client import HttpClient
+
+URL = "https://ngt48.jp/news/detail/1"
+
+
+class TestHttpArchive:
+    def test_record_replay(self, tmp_path, requests_mock):
+        requests_mock.get(
+            URL,
+            content="<p>ニュース</p>".encode("utf-8"),
+            headers={"Content-Type": "text/html; charset=utf-8", "ETag": '"abc"'},
+        )
+        client = HttpClient(archive=HttpArchive(tmp_path, mode="record"))
+        recorded = client.get(URL)
+        assert requests_mock.call_count == 1
+
+        client = HttpClient(archive=HttpArchive(tmp_path, mode="replay"))
+        replayed = client.get(URL)
+        assert requests_mock.call_count == 1
+        assert replayed.status_code == 200
+        assert replayed.content == recorded.content
+        assert replayed.text == "<p>ニュース</p>"
+        assert replayed.headers["etag"] == '"abc"'
+        assert [t.url for t in client.timing_list] == [URL]
+
+    def test_record_error_status(self, tmp_path, requests_mock):
+        requests_mock.get(URL, status_code=404)
+        HttpClient(archive=HttpArchive(tmp_path, mode="record")).get(URL)
+        res = HttpClient(archive=HttpArchive(tmp_path, mode="replay")).get(URL)
+        assert res.status_code == 404
+
+    def test_replay_miss(self, tmp_path):
+        client = HttpClient(archive=HttpArchive(tmp_path, mode="replay"))
+        with pytest.raises(ArchiveMissError):
+            client.get(URL)
+        assert client.timing_list[-1].status is None
+
+    def test_replay_latency(self, tmp_path, requests_mock):
+        requests_mock.get(URL, text="text")
+        HttpClient(archive=HttpArchive(tmp_path, mode="record")).get(URL)
+        archive = HttpArchive(tmp_path, mode="replay", latency=0.05)
+        start = time.perf_counter()
+        archive.replay("GET", URL)
+        assert time.perf_counter() - start >= 0.05
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            HttpArchive(tmp_path, mode="unknown")
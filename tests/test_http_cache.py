@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from requests.exceptions import HTTPError
+
+from opime_notify.http_cache import HttpCache
+from opime_notify.http_client import HttpClient
+
+
+def test_fetch_text_cached(tmp_path, requests_mock):
+    mock_url = "https://www.example.com/detail/1"
+    requests_mock.get(mock_url, text="本文")
+    cache = HttpCache(tmp_path)
+    client = HttpClient()
+    assert cache.fetch_text(client, mock_url) == "本文"
+    assert cache.fetch_text(client, mock_url) == "本文"
+    assert HttpCache(tmp_path).fetch_text(client, mock_url) == "本文"
+    assert requests_mock.call_count == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_fetch_text_threads(tmp_path, requests_mock):
+    mock_url = "https://www.example.com/detail/1"
+    requests_mock.get(mock_url, text="本文")
+    cache = HttpCache(tmp_path)
+    client = HttpClient()
+    cache.fetch_text(client, mock_url)
+    # 並列取得でも件数がずれない
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: cache.fetch_text(client, mock_url), range(200)))
+    assert cache.hits == 200
+    assert cache.misses == 1
+
+
+def test_fetch_text_expired(tmp_path, requests_mock):
+    mock_url = "https://www.example.com/detail/1"
+    requests_mock.get(mock_url, text="text")
+    cache = HttpCache(tmp_path, ttl=timedelta(0))
+    client = HttpClient()
+    cache.fetch_text(client, mock_url)
+    cache.fetch_text(client, mock_url)
+    assert requests_mock.call_count == 2
+
+
+def test_fetch_text_revalidate(tmp_path, requests_mock):
+    mock_url = "https://www.example.com/detail/1"
+    requests_mock.get(mock_url, text="text", headers={"ETag": '"abc"'})
+    cache = HttpCache(tmp_path, ttl=timedelta(0), revalidate=True)
+    client = HttpClient()
+    cache.fetch_text(client, mock_url)
+    requests_mock.get(mock_url, status_code=304)
+    assert cache.fetch_text(client, mock_url) == "text"
+    assert requests_mock.last_request.headers["If-None-Match"] == '"abc"'
+
+
+def test_fetch_text_error(tmp_path, requests_mock):
+    mock_url = "https://www.example.com/detail/1"
+    requests_mock.get(mock_url, status_code=404)
+    cache = HttpCache(tmp_path)
+    with pytest.raises(HTTPError):
+        cache.fetch_text(HttpClient(), mock_url)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_evict(tmp_path, requests_mock):
+    client = HttpClient()
+    cache = HttpCache(tmp_path)
+    for i in range(3):
+        mock_url = f"https://www.example.com/detail/{i}"
+        requests_mock.get(mock_url, text="x" * 1000)
+        cache.fetch_text(client, mock_url)
+        # mtimeの解像度に依存しないよう古い順に並べる
+        os.utime(cache._get_path(mock_url), (i, i))
+    cache.fetch_text(client, "https://www.example.com/detail/0")
+    assert cache.hits == 1
+    cache.max_bytes = 2500
+    cache.evict()
+    assert cache.load("https://www.example.com/detail/0") is not None
+    assert cache.load("https://www.example.com/detail/1") is None
+    assert cache.load("https://www.example.com/detail/2") is not None
@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from opime_notify.circuit_breaker import CircuitOpenError
+from opime_notify.deadline import MIN_TIMEOUT, Deadline, set_deadline
+from opime_notify.http_client import DEFAULT_TIMEOUT, HttpClient, get_default_client
+
+
+def test_default_client():
+    assert get_default_client() is get_default_client()
+
+
+def test_default_timeout(requests_mock):
+    mock_url = "https://www.example.com/"
+    requests_mock.get(mock_url, text="text")
+    client = HttpClient()
+    res = client.get(mock_url)
+    assert res.text == "text"
+    assert requests_mock.last_request.timeout == DEFAULT_TIMEOUT
+    client.get(mock_url, timeout=1)
+    assert requests_mock.last_request.timeout == 1
+
+
+def test_timing(requests_mock):
+    mock_url = "https://www.example.com/path"
+    requests_mock.get(mock_url, status_code=404)
+    client = HttpClient()
+    timing_list = []
+    client.add_listener(timing_list.append)
+    client.get(mock_url)
+    assert len(client.timing_list) == 1
+    assert timing_list == list(client.timing_list)
+    timing = timing_list[0]
+    assert timing.host == "www.example.com"
+    assert timing.status == 404
+    assert timing.elapsed >= 0
+
+
+def test_max_per_host(requests_mock):
+    lock = threading.Lock()
+    count = {"curr": 0, "max": 0}
+
+    def callback(request, context):
+        with lock:
+            count["curr"] += 1
+            count["max"] = max(count["max"], count["curr"])
+        time.sleep(0.02)
+        with lock:
+            count["curr"] -= 1
+        return "text"
+
+    mock_url = "https://www.example.com/"
+    requests_mock.get(mock_url, text=callback)
+    client = HttpClient(max_per_host=2)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda _: client.get(mock_url), range(6)))
+    assert count["max"] <= 2
+
+
+def test_circuit_breaker(requests_mock):
+    mock_url = "https://www.example.com/"
+    requests_mock.get(mock_url, status_code=503)
+    client = HttpClient(failure_threshold=2)
+    client.get(mock_url)
+    client.get(mock_url)
+    # 開いている間はリクエストを送らない
+    with pytest.raises(CircuitOpenError):
+        client.get(mock_url)
+    assert requests_mock.call_count == 2
+    assert client.get_circuit_breaker("www.example.com").failure_count == 2
+    # 他のホストには影響しない
+    requests_mock.get("https://other.example.com/", text="ok")
+    assert client.get("https://other.example.com/").text == "ok"
+
+
+def test_deadline_timeout(requests_mock):
+    mock_url = "https://www.example.com/"
+    requests_mock.get(mock_url, text="text")
+    client = HttpClient()
+    set_deadline(Deadline(0))
+    try:
+        client.get(mock_url)
+    finally:
+        set_deadline(None)
+    assert requests_mock.last_request.timeout == (MIN_TIMEOUT, MIN_TIMEOUT)
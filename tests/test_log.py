@@ -0,0 +1,38 @@
+import json
+import logging
+
+from opime_notify.log import LOGGER_NAME, setup_logging
+
+
+class ReprCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __repr__(self):
+        self.count += 1
+        return "ReprCounter()"
+
+
+def test_setup_logging(capsys):
+    logger = logging.getLogger(f"{LOGGER_NAME}.test")
+    setup_logging()
+    # 何度呼んでもハンドラーは増えない
+    setup_logging()
+    dump = ReprCounter()
+    logger.info("due schedule", extra={"count": 2})
+    logger.debug("all_schedule %r", dump)
+    line_list = capsys.readouterr().err.splitlines()
+    assert len(line_list) == 1
+    data = json.loads(line_list[0])
+    assert data["level"] == "info"
+    assert data["logger"] == "opime_notify.test"
+    assert data["message"] == "due schedule"
+    assert data["count"] == 2
+    # DEBUGが無効なら一覧はreprされない
+    assert dump.count == 0
+
+    setup_logging(verbose=1)
+    logger.debug("all_schedule %r", dump)
+    data = json.loads(capsys.readouterr().err)
+    assert data["message"] == "all_schedule ReprCounter()"
+    setup_logging()
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from opime_notify.main import notify_due_schedule
+from opime_notify.schedule import NotifySchedule
+from opime_notify.standin import StandInGsheetSession, StandInLineNotifiyer
+
+
+def _schedule_list(count: int, date: datetime) -> list[NotifySchedule]:
+    date_str = date.strftime(NotifySchedule.date_format)
+    return [
+        NotifySchedule(id=0, title=f"{date_str} {i}", date=date_str)
+        for i in range(count)
+    ]
+
+
+class LimitedNotifiyer(StandInLineNotifiyer):
+    """
+    先頭のlimit件だけ送り、残りは期限切れで送らなかったことにする
+    """
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+
+    def notify_line_all(self, schedule_list, stop=None):
+        return super().notify_line_all(schedule_list[: self.limit], stop=stop)
+
+
+def _titles(schedule_list: list[NotifySchedule]) -> set[str]:
+    return {s.title for s in schedule_list}
+
+
+def watch_calls(monkeypatch, obj, name: str) -> list[tuple]:
+    call_list = []
+    func = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        call_list.append(args)
+        return func(*args, **kwargs)
+
+    monkeypatch.setattr(obj, name, wrapper)
+    return call_list
+
+
+def test_notify_due_schedule(monkeypatch):
+    now = datetime.now().replace(microsecond=0)
+    gsession = StandInGsheetSession()
+    due_list = _schedule_list(120, now - timedelta(minutes=1))
+    future_list = _schedule_list(30, now + timedelta(days=1))
+    gsession.write_all_schedule(due_list + future_list)
+    wsheet = gsession.sheet.worksheet(gsession.sheet_name)
+    update_list = watch_calls(monkeypatch, wsheet, "update")
+
+    result = notify_due_schedule(gsession, StandInLineNotifiyer)
+    # 100行を超えていても送った行は残らず、書き直しは1回のupdateで行う
+    assert _titles(result) == _titles(future_list)
+    assert _titles(gsession.read_all_schedule()) == _titles(future_list)
+    assert len(update_list) == 1
+
+
+def test_notify_due_schedule_nothing_sent(monkeypatch):
+    now = datetime.now().replace(microsecond=0)
+    gsession = StandInGsheetSession()
+    due_list = _schedule_list(3, now - timedelta(minutes=1))
+    gsession.write_all_schedule(due_list)
+    wsheet = gsession.sheet.worksheet(gsession.sheet_name)
+    clear_list = watch_calls(monkeypatch, wsheet, "batch_clear")
+    update_list = watch_calls(monkeypatch, wsheet, "update")
+
+    # 期限切れなどで1件も送らなければシートは書き直さない
+    result = notify_due_schedule(gsession, lambda: LimitedNotifiyer(0))
+    assert _titles(result) == _titles(due_list)
+    assert clear_list == []
+    assert update_list == []
+
+    result = notify_due_schedule(gsession, lambda: LimitedNotifiyer(1))
+    assert len(result) == 2
+    assert len(gsession.read_all_schedule()) == 2
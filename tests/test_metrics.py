@@ -0,0 +1,95 @@
+import urllib.request
+
+import pytest
+
+from opime_notify.http_client import RequestTiming
+from opime_notify.metrics import (
+    HTTP_DURATION,
+    HTTP_REQUESTS,
+    PARSE_DURATION,
+    SHEET_CALLS,
+    SHEET_DURATION,
+    Counter,
+    Histogram,
+    Registry,
+    observe_http,
+    observe_sheet_call,
+    observe_span,
+    start_http_server,
+)
+
+
+def test_counter():
+    registry = Registry()
+    counter = registry.register(Counter("sends_total", "sends", ("result",)))
+    counter.inc(result="success")
+    counter.inc(2, result="success")
+    counter.inc(result='a"b\n')
+    assert counter.get(result="success") == 3
+    assert counter.get(result="failure") == 0
+    with pytest.raises(ValueError):
+        counter.inc(status="success")
+    assert registry.render() == (
+        "# HELP opime_notify_sends_total sends\n"
+        "# TYPE opime_notify_sends_total counter\n"
+        'opime_notify_sends_total{result="a\\"b\\n"} 1\n'
+        'opime_notify_sends_total{result="success"} 3\n'
+    )
+
+
+def test_histogram():
+    registry = Registry()
+    histogram = registry.register(Histogram("latency", "latency", buckets=(0.1, 1.0)))
+    for value in [0.05, 0.1, 0.5, 3.0]:
+        histogram.observe(value)
+    assert histogram.get_count() == 4
+    assert registry.render().splitlines()[2:] == [
+        'opime_notify_latency_bucket{le="0.1"} 2',
+        'opime_notify_latency_bucket{le="1.0"} 3',
+        'opime_notify_latency_bucket{le="+Inf"} 4',
+        "opime_notify_latency_sum 3.65",
+        "opime_notify_latency_count 4",
+    ]
+
+
+def test_write_textfile(tmp_path):
+    registry = Registry()
+    registry.register(Counter("runs_total", "runs")).inc()
+    path = tmp_path / "metrics" / "opime_notify.prom"
+    registry.write_textfile(path)
+    assert path.read_text().endswith("opime_notify_runs_total 1\n")
+    assert [p.name for p in path.parent.iterdir()] == ["opime_notify.prom"]
+
+
+def test_observe():
+    before = HTTP_REQUESTS.get(host="metrics.test", status="error")
+    observe_http(RequestTiming("GET", "url", "metrics.test", None, 0.2))
+    assert HTTP_REQUESTS.get(host="metrics.test", status="error") == before + 1
+    assert HTTP_DURATION.get_count(host="metrics.test") >= 1
+
+    before = SHEET_CALLS.get(operation="read")
+    observe_sheet_call("get", 0.1)
+    # Sheetsはリクエスト毎に記録するので、spanでは数えない
+    observe_span("sheet.read", 0.1)
+    assert SHEET_CALLS.get(operation="read") == before + 1
+    assert SHEET_DURATION.get_count(operation="read") >= 1
+
+    before = PARSE_DURATION.get_count(stage="news")
+    observe_span("parse.news", 0.1)
+    # パース以外のspanは記録しない
+    observe_span("notify", 0.1)
+    assert PARSE_DURATION.get_count(stage="news") == before + 1
+
+
+def test_start_http_server():
+    registry = Registry()
+    registry.register(Counter("runs_total", "runs")).inc()
+    server = start_http_server(0, registry=registry)
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as res:
+            assert res.headers["Content-Type"].startswith("text/plain")
+            assert b"opime_notify_runs_total 1\n" in res.read()
+    finally:
+        server.shutdown()
+        server.server_close()
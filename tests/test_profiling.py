@@ -0,0 +1,50 @@
+import time
+
+from opime_notify.http_client import RequestTiming
+from opime_notify.profiling import Profiler, get_profiler, set_profiler, span
+
+
+def test_profiler():
+    profiler = Profiler(command="test")
+    with profiler.span("sheet.read"):
+        time.sleep(0.01)
+    with profiler.span("sheet.read"):
+        pass
+    profiler.record_http(RequestTiming("GET", "url", "example.com", 200, 0.5))
+    profiler.stop()
+    # 停止後は記録しない
+    with profiler.span("notify"):
+        pass
+
+    stage_dict = profiler.get_stage_dict()
+    assert set(stage_dict) == {"sheet.read", "http"}
+    assert stage_dict["sheet.read"]["count"] == 2
+    assert stage_dict["sheet.read"]["max"] >= 0.01
+    report = profiler.build_report()
+    assert report["command"] == "test"
+    http_span = [s for s in report["spans"] if s["name"] == "http"][0]
+    assert http_span["attrs"] == {"host": "example.com", "status": 200}
+    assert "cpu" not in report and "memory" not in report
+
+
+def test_span():
+    @span("filter")
+    def func() -> int:
+        return 1
+
+    # Profilerが無い場合は何も記録しない
+    assert get_profiler() is None
+    assert func() == 1
+
+    profiler = Profiler()
+    set_profiler(profiler)
+    try:
+        assert func() == 1
+        with span("notify", count=2):
+            pass
+    finally:
+        set_profiler(None)
+    assert [(s.name, s.attrs) for s in profiler.span_list] == [
+        ("filter", {}),
+        ("notify", {"count": 2}),
+    ]
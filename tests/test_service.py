@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+from opime_notify.due_timer import DueTimer
+from opime_notify.schedule import NotifySchedule
+from opime_notify.service import Job, Service, run_service
+
+
+def test_run_service_once():
+    called = []
+
+    def fail() -> None:
+        raise RuntimeError("job failed")
+
+    job_list = [
+        Job("ok", lambda: called.append("ok"), timedelta(minutes=1)),
+        Job("fail", fail, timedelta(minutes=1)),
+    ]
+    run_service(job_list, once=True)
+    assert called == ["ok"]
+    assert [(j.run_count, j.error_count) for j in job_list] == [(1, 0), (1, 1)]
+
+
+def test_run_service_jobs_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    job_list = [
+        Job("a", barrier.wait, timedelta(minutes=1)),
+        Job("b", barrier.wait, timedelta(minutes=1)),
+    ]
+    run_service(job_list, once=True)
+    assert [j.error_count for j in job_list] == [0, 0]
+
+
+def test_service_stop():
+    def count() -> None:
+        # 2回実行済みなら、この実行が終わった所で止まる
+        if job.run_count >= 2:
+            service.stop()
+
+    job = Job("count", count, timedelta(seconds=0.01))
+    service = Service([job])
+    asyncio.run(service.run())
+    assert job.run_count == 3
+
+
+def test_service_due_timer():
+    # 通知時刻は秒単位なので次の秒の頭を使う
+    due = datetime.now().replace(microsecond=0) + timedelta(seconds=1)
+    due_timer = DueTimer()
+    called = []
+
+    def add() -> None:
+        # 動いているサービスに後から予定を追加する
+        date = due.strftime(NotifySchedule.date_format)
+        due_timer.add(NotifySchedule(id=0, title="due", date=date))
+
+    def notify() -> None:
+        called.append(datetime.now())
+        service.stop()
+
+    add_job = Job("add", add, timedelta(minutes=1))
+    service = Service(
+        [add_job], due_timer=due_timer, due_job=Job("due", notify, timedelta(0))
+    )
+    asyncio.run(service.run())
+    assert len(called) == 1
+    assert due <= called[0] < due + timedelta(seconds=0.5)
+    assert len(due_timer) == 0
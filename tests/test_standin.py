@@ -0,0 +1,64 @@
+import json
+from datetime import datetime, timedelta
+
+import requests
+from click.testing import CliRunner
+
+from opime_notify.cache import CACHE_DIR_ENV
+from opime_notify.fetch_schedule.session import CDShopSession, ShopSession
+from opime_notify.http_archive import HttpArchive
+from opime_notify.main import realtime
+from opime_notify.schedule import NotifySchedule
+from opime_notify.standin import StandInGsheetSession, StandInLineNotifiyer
+
+
+def _schedule(title: str, date: datetime) -> NotifySchedule:
+    return NotifySchedule(
+        id=0, title=title, date=date.strftime(NotifySchedule.date_format)
+    )
+
+
+def _record_json(archive: HttpArchive, url: str, data) -> None:
+    res = requests.Response()
+    res.status_code = 200
+    res.reason = "OK"
+    res.encoding = "utf-8"
+    res.headers["Content-Type"] = "application/json"
+    res._content = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    archive.record("GET", url, res)
+
+
+def test_gsheet_session():
+    gsession = StandInGsheetSession()
+    now = datetime(2022, 12, 1, 12, 0)
+    schedule_list = [_schedule("b", now + timedelta(hours=1)), _schedule("a", now)]
+    gsession.write_all_schedule(schedule_list)
+    result = gsession.read_all_schedule()
+    assert [s.title for s in result] == ["a", "b"]
+    assert [s.status for s in result] == ["BEFORE", "BEFORE"]
+    gsession.clear_schedule()
+    assert gsession.read_all_schedule() == []
+
+
+def test_line_notifiyer():
+    notifiyer = StandInLineNotifiyer()
+    result = notifiyer.notify_line(_schedule("title", datetime(2022, 12, 1)))
+    assert result.status == "SUCCESS"
+    assert len(notifiyer.line_bot_api.sent_list) == 1
+
+
+def test_realtime_replay(tmp_path, monkeypatch, requests_mock):
+    # 再生時はSheetsにもLINEにも接続しない、requests_mockで外への通信は失敗する
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    archive_dir = tmp_path / "archive"
+    archive = HttpArchive(archive_dir, mode="record")
+    tag = {"id": 1, "code": "T-1", "name": "2022年12月度個別生写真", "name_kana": ""}
+    _record_json(archive, ShopSession.TAGLIST_URL, {"tags": [tag]})
+    news = {"title": "news", "date": {"published": "2022-12-01T12:00:00+09:00"}}
+    _record_json(archive, CDShopSession.NEWS_URL, [news])
+
+    runner = CliRunner()
+    result = runner.invoke(realtime, ["--replay", str(archive_dir)])
+    assert result.exit_code == 0, result.output
+    assert requests_mock.call_count == 0
+    assert "stand-in broadcast" in result.output
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULE_LIST = ["gspread", "oauth2client", "linebot", "bs4", "requests"]
+
+
+@pytest.mark.parametrize("module", ["opime_notify.main", "opime_notify.cli.send_line"])
+def test_entry_point_does_not_import_heavy_module(module):
+    # 既に読み込まれている可能性があるので別プロセスで確認する
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {HEAVY_MODULE_LIST!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert proc.stdout.strip() == ""
+
+
+def test_package_import_does_not_load_dotenv():
+    # .envはコマンドを実行した時だけ読み込む
+    code = "import sys, opime_notify\nprint('dotenv' in sys.modules)"
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert proc.stdout.strip() == "False"